@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Cotizador.settings")
+# Exportaciones y PDF como streaming asíncrono (ver CotizadorApp/descargas_asincronas.py).
+os.environ.setdefault("DESCARGAS_ASINCRONAS", "1")
 
 application = get_asgi_application()
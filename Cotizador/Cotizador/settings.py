@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,14 +51,18 @@ INSTALLED_APPS = [
 # Configuración de Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'CotizadorApp.autenticacion.JWTAutenticacionCacheada',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    # Paginación por cursor en todos los listados (?page_size=, máximo 500).
+    'DEFAULT_PAGINATION_CLASS': 'CotizadorApp.pagination.PaginacionCursor',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
 }
 
 MIDDLEWARE = [
+    "CotizadorApp.metricas.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -104,11 +111,51 @@ WSGI_APPLICATION = "Cotizador.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DB_ENGINE=sqlite (por defecto) o mysql. Las conexiones se reutilizan
+# DB_CONN_MAX_AGE segundos y se verifican antes de cada petición.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get('DB_NAME', BASE_DIR / "db.sqlite3"),
+        }
+    }
+elif DB_ENGINE == 'mysql':
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.mysql",
+            "NAME": os.environ.get('DB_NAME', 'cotizador'),
+            "USER": os.environ.get('DB_USER', 'cotizador'),
+            "PASSWORD": os.environ.get('DB_PASSWORD', ''),
+            "HOST": os.environ.get('DB_HOST', 'localhost'),
+            "PORT": os.environ.get('DB_PORT', '3306'),
+            "OPTIONS": {
+                "charset": "utf8mb4",
+                "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
+                "isolation_level": "read committed",
+            },
+        }
     }
+else:
+    raise ImproperlyConfigured(f"DB_ENGINE desconocido: {DB_ENGINE!r} (sqlite o mysql).")
+
+DATABASES["default"].update({
+    "CONN_MAX_AGE": int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+    "CONN_HEALTH_CHECKS": os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+})
+
+# PRAGMAs de cada conexión SQLite nueva (ver CotizadorApp/base_datos.py).
+# WAL permite leer mientras otro escribe, busy_timeout (ms) espera el bloqueo
+# en lugar de fallar con "database is locked" y synchronous=NORMAL es seguro
+# con WAL y evita un fsync por transacción.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 20000)),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
 }
 
 
@@ -148,6 +195,89 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Cachés. 'catalogo' guarda las respuestas de productos y categorías (ver
+# CotizadorApp/cache_catalogo.py); al superar MAX_ENTRIES se desaloja una
+# fracción (1/CULL_FREQUENCY) de las entradas menos usadas.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogo': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalogo',
+        'TIMEOUT': int(os.environ.get('CACHE_CATALOGO_TIMEOUT', 600)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_CATALOGO_MAX_ENTRIES', 1000)),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    # Usuarios resueltos desde el JWT (ver CotizadorApp/autenticacion.py)
+    'usuarios': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'usuarios',
+        'TIMEOUT': int(os.environ.get('CACHE_USUARIOS_TIMEOUT', 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_USUARIOS_MAX_ENTRIES', 10000)),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+# Métricas por petición (ver CotizadorApp/metricas.py). /metrics solo responde
+# con METRICAS_TOKEN definido y exige `Authorization: Bearer <token>`.
+
+METRICAS = {
+    'SERVER_TIMING': os.environ.get('METRICAS_SERVER_TIMING', '1') == '1',
+    'TOKEN': os.environ.get('METRICAS_TOKEN', ''),
+}
+
+# Caché en disco de los PDF de cotizaciones (ver CotizadorApp/pdf_cache.py)
+
+PDF_CACHE = {
+    'DIRECTORIO': os.environ.get(
+        'PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'cotizador-pdf')),
+    'MAX_BYTES': int(os.environ.get('PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+}
+
+# Descarga en lote de PDF (ver CotizadorApp/pdf_lote.py). PROCESOS = 0
+# renderiza en el mismo proceso.
+
+PDF_LOTE = {
+    'PROCESOS': int(os.environ.get('PDF_LOTE_PROCESOS', os.cpu_count() or 1)),
+    'EN_VUELO': int(os.environ.get('PDF_LOTE_EN_VUELO', 4 * (os.cpu_count() or 1))),
+}
+
+# Descargas asíncronas bajo ASGI (ver CotizadorApp/descargas_asincronas.py):
+# las exportaciones y los PDF se sirven como streaming asíncrono y el trabajo
+# bloqueante corre en HILOS hilos de descarga (cada uno con su propia conexión
+# a la base de datos; CSV, NDJSON y ZIP ocupan el suyo hasta terminar de
+# enviarse). `asgi.py` las activa por defecto.
+
+DESCARGAS_ASINCRONAS = {
+    'ACTIVAS': os.environ.get('DESCARGAS_ASINCRONAS', '0') == '1',
+    'HILOS': int(os.environ.get('DESCARGAS_ASINCRONAS_HILOS', 8)),
+}
+
+# Alta masiva de usuarios (ver CotizadorApp/alta_usuarios.py): procesos para
+# calcular los hashes de las contraseñas (PROCESOS <= 1 los calcula en el
+# mismo proceso), usuarios por INSERT y máximo de usuarios por petición.
+ALTA_USUARIOS = {
+    'PROCESOS': int(os.environ.get('ALTA_USUARIOS_PROCESOS', os.cpu_count() or 1)),
+    'LOTE': int(os.environ.get('ALTA_USUARIOS_LOTE', 1000)),
+    'MAX_FILAS': int(os.environ.get('ALTA_USUARIOS_MAX_FILAS', 10000)),
+}
+
+# Exportaciones en segundo plano (ver CotizadorApp/jobs.py)
+
+EXPORT_JOBS = {
+    'MODO': os.environ.get('EXPORT_JOBS_MODO', 'hilos'),
+    'CONCURRENCIA': int(os.environ.get('EXPORT_JOBS_CONCURRENCIA', 2)),
+    'RETENCION_HORAS': int(os.environ.get('EXPORT_JOBS_RETENCION_HORAS', 24)),
+    'TIEMPO_MAXIMO_MINUTOS': int(os.environ.get('EXPORT_JOBS_TIEMPO_MAXIMO_MINUTOS', 30)),
+    'DIRECTORIO': os.environ.get('EXPORT_JOBS_DIR', BASE_DIR / 'exportaciones'),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -14,10 +14,13 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from CotizadorApp.descargas_asincronas import envolver
 from CotizadorApp.exports import ExportarCotizacionesExcel, ExportarCotizacionPDF
+from CotizadorApp.metricas import vista_metricas
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -26,4 +29,8 @@ urlpatterns = [
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('export/cotizaciones/', ExportarCotizacionesExcel.as_view(), name='export-cotizaciones'),
     path('export/cotizacion/<int:pk>/pdf/', ExportarCotizacionPDF.as_view(), name='export-cotizacion-pdf'),
+    path('metrics', vista_metricas, name='metricas'),
 ]
+
+if settings.DESCARGAS_ASINCRONAS['ACTIVAS']:
+    urlpatterns = envolver(urlpatterns, ('export-cotizaciones', 'export-cotizacion-pdf'))
@@ -0,0 +1,203 @@
+"""
+Alta masiva de usuarios.
+
+`CustomUserSerializer.create` valida la unicidad de `username`, `email` y
+`rut` con una consulta por campo y por usuario, calcula el hash PBKDF2 de la
+contraseña (cientos de milisegundos de CPU) y hace un INSERT. Aquí, para una
+lista de usuarios:
+
+- los campos se validan con una sola instancia del serializer, sin los
+  validadores de unicidad, que se reemplazan por tres consultas `__in`
+  (más la detección de repetidos dentro de la propia lista);
+- los hashes se calculan en un pool de procesos (`ALTA_USUARIOS['PROCESOS']`),
+  ya que PBKDF2 no libera el GIL;
+- los usuarios se insertan con `bulk_create` por bloques.
+
+Las filas con errores no detienen el alta: se informan con su índice.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+from .models import CustomUser
+from .serializers import CustomUserSerializer
+
+CAMPOS_UNICOS = ('username', 'email', 'rut')
+
+# Contraseñas por tarea enviada al pool, para repartir el costo de la
+# comunicación entre procesos.
+HASHES_POR_TAREA = 16
+
+# Por debajo de esta cantidad de contraseñas no compensa usar el pool.
+MINIMO_PARALELO = 32
+
+# Parámetros por consulta `__in` (SQLite admite 999 en versiones antiguas).
+MAX_PARAMETROS = 900
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _configuracion():
+    return settings.ALTA_USUARIOS
+
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' evita heredar conexiones e hilos del proceso web; cada
+            # proceso configura Django para leer los PASSWORD_HASHERS.
+            _pool = ProcessPoolExecutor(
+                max_workers=_configuracion()['PROCESOS'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup)
+        return _pool
+
+
+def _hashear(contrasenas):
+    return [make_password(contrasena) for contrasena in contrasenas]
+
+
+def hashear(contrasenas):
+    """
+    Hashes de `contrasenas`, en el mismo orden, calculados en el pool de
+    procesos si son suficientes y hay más de un proceso configurado.
+    """
+    if len(contrasenas) < MINIMO_PARALELO or _configuracion()['PROCESOS'] <= 1:
+        return _hashear(contrasenas)
+    tareas = [contrasenas[i:i + HASHES_POR_TAREA]
+              for i in range(0, len(contrasenas), HASHES_POR_TAREA)]
+    return [hash_ for bloque in _obtener_pool().map(_hashear, tareas) for hash_ in bloque]
+
+
+class AltaUsuarioSerializer(CustomUserSerializer):
+    """
+    `CustomUserSerializer` sin los validadores de unicidad, que `crear_usuarios`
+    resuelve para toda la lista a la vez.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for nombre in CAMPOS_UNICOS:
+            fields[nombre].validators = [
+                validador for validador in fields[nombre].validators
+                if not isinstance(validador, UniqueValidator)
+            ]
+        return fields
+
+
+def _existentes(campo, valores):
+    valores = sorted(valores)
+    existentes = set()
+    for i in range(0, len(valores), MAX_PARAMETROS):
+        existentes.update(CustomUser.objects.filter(
+            **{f'{campo}__in': valores[i:i + MAX_PARAMETROS]}
+        ).values_list(campo, flat=True))
+    return existentes
+
+
+class Resultado:
+    """
+    Usuarios creados y errores por índice de una alta masiva.
+    """
+
+    def __init__(self):
+        self.creados = []
+        self.errores = []
+
+    def error(self, indice, errores):
+        self.errores.append({'indice': indice, 'errores': errores})
+
+    def como_dict(self):
+        return {
+            'creados': len(self.creados),
+            'usuarios': [{'indice': indice, 'id': user.pk, 'username': user.username}
+                         for indice, user in self.creados],
+            'errores': sorted(self.errores, key=lambda error: error['indice']),
+        }
+
+
+def _validar(filas, resultado):
+    """
+    Valida los campos de cada fila y la unicidad de toda la lista. Devuelve
+    los pares `(indice, datos)` válidos.
+    """
+    serializer = AltaUsuarioSerializer()
+    validas = []
+    for indice, fila in enumerate(filas):
+        try:
+            validas.append((indice, serializer.run_validation(fila)))
+        except serializers.ValidationError as exc:
+            resultado.error(indice, exc.detail)
+
+    repetidos = {}
+    for campo in CAMPOS_UNICOS:
+        en_base = _existentes(campo, {datos[campo] for _, datos in validas})
+        vistos = set()
+        for indice, datos in validas:
+            valor = datos[campo]
+            if valor in en_base:
+                repetidos.setdefault(indice, {})[campo] = [f"Ya existe un usuario con este {campo}."]
+            elif valor in vistos:
+                repetidos.setdefault(indice, {})[campo] = ["Repetido en la lista."]
+            vistos.add(valor)
+    for indice, errores in repetidos.items():
+        resultado.error(indice, errores)
+    return [(indice, datos) for indice, datos in validas if indice not in repetidos]
+
+
+def _insertar(bloque, resultado):
+    """
+    Inserta un bloque de `(indice, user)`. Si otra transacción creó alguno de
+    los usuarios entretanto, reintenta uno por uno para informar cuáles.
+    """
+    try:
+        with transaction.atomic():
+            CustomUser.objects.bulk_create([user for _, user in bloque])
+        resultado.creados.extend(bloque)
+        return
+    except IntegrityError:
+        pass
+    for indice, user in bloque:
+        # `bulk_create` pudo asignar ids a los de un lote ya revertido.
+        user.pk = None
+        try:
+            with transaction.atomic():
+                user.save()
+            resultado.creados.append((indice, user))
+        except IntegrityError:
+            user.pk = None
+            resultado.error(indice, {'non_field_errors': [
+                "Ya existe un usuario con el mismo username, email o rut."]})
+
+
+def crear_usuarios(filas):
+    """
+    Crea los usuarios de `filas` (dicts con los campos de
+    `CustomUserSerializer`).
+
+    Returns:
+        Resultado: usuarios creados y errores por índice de `filas`.
+    """
+    resultado = Resultado()
+    validas = _validar(filas, resultado)
+    hashes = hashear([datos['password'] for _, datos in validas])
+
+    usuarios = []
+    for (indice, datos), hash_ in zip(validas, hashes):
+        user = CustomUser(**{campo: valor for campo, valor in datos.items() if campo != 'password'})
+        user.password = hash_
+        usuarios.append((indice, user))
+
+    lote = _configuracion()['LOTE']
+    for i in range(0, len(usuarios), lote):
+        _insertar(usuarios[i:i + lote], resultado)
+    return resultado
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CotizadorappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "CotizadorApp"
+
+    def ready(self):
+        from . import base_datos, metricas, signals  # noqa: F401
@@ -0,0 +1,102 @@
+"""
+Autenticación JWT con caché del usuario resuelto.
+
+`JWTAuthentication` de simplejwt lee el usuario de la base de datos en cada
+petición. `JWTAutenticacionCacheada` lo guarda en el caché `CACHE_ALIAS`
+(LocMem acotado por `MAX_ENTRIES` y con expiración `TIMEOUT`) por el `user_id`
+del token, y en cada acierto vuelve a comprobar que el usuario esté activo (y
+la revocación por cambio de contraseña, si está habilitada).
+
+Las escrituras sobre el usuario (`UserViewSet`, `CustomUserSerializer`,
+admin o cualquier `save()`/`delete()`) eliminan su entrada mediante señales.
+Con LocMem cada proceso tiene su propio caché, así que en los demás procesos
+un cambio (p. ej. una desactivación) tarda como máximo `TIMEOUT` segundos en
+verse; con un backend compartido (Redis, Memcached) la invalidación es global.
+"""
+import threading
+
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+CACHE_ALIAS = 'usuarios'
+
+_contadores = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0}
+_contadores_lock = threading.Lock()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _contar(nombre):
+    with _contadores_lock:
+        _contadores[nombre] += 1
+
+
+def clave(user_id):
+    return f"usuario:{user_id}"
+
+
+def invalidar(user_id):
+    """
+    Elimina el usuario del caché; la próxima petición lo vuelve a leer.
+    """
+    _cache().delete(clave(user_id))
+    _contar('invalidaciones')
+
+
+def estadisticas():
+    """
+    Aciertos, fallos e invalidaciones de este proceso y tasa de aciertos.
+    """
+    with _contadores_lock:
+        contadores = dict(_contadores)
+    total = contadores['aciertos'] + contadores['fallos']
+    return {
+        **contadores,
+        'tasa_aciertos': round(contadores['aciertos'] / total, 4) if total else None,
+    }
+
+
+def reiniciar_estadisticas():
+    with _contadores_lock:
+        for nombre in _contadores:
+            _contadores[nombre] = 0
+
+
+class JWTAutenticacionCacheada(JWTAuthentication):
+    """
+    `JWTAuthentication` que cachea el usuario por `user_id` del token.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            # Sin identificador: simplejwt responde el error correspondiente.
+            return super().get_user(validated_token)
+
+        user = _cache().get(clave(user_id))
+        if user is None:
+            _contar('fallos')
+            user = super().get_user(validated_token)
+            _cache().set(clave(user_id), user)
+            return user
+
+        _contar('aciertos')
+        self._verificar(user, validated_token)
+        return user
+
+    def _verificar(self, user, validated_token):
+        """
+        Las mismas comprobaciones que hace simplejwt tras leer el usuario.
+        """
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed")
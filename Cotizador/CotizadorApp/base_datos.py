@@ -0,0 +1,33 @@
+"""
+Configuración de las conexiones a la base de datos.
+
+Django abre las conexiones SQLite con el journal por defecto (DELETE), donde
+un escritor bloquea también a los lectores y el resto de los escritores falla
+con "database is locked" pasados 5 segundos. Al crear cada conexión se
+aplican los PRAGMAs de `settings.SQLITE_PRAGMAS` (WAL, busy_timeout y
+synchronous). Con MySQL no se hace nada: sus opciones van en `OPTIONS`.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragmas(connection):
+    """
+    Valores actuales de los PRAGMAs configurados en `connection` (SQLite).
+    """
+    with connection.cursor() as cursor:
+        valores = {}
+        for pragma in settings.SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+            valores[pragma] = cursor.fetchone()[0]
+    return valores
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, valor in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {valor}")
@@ -0,0 +1,195 @@
+"""
+Índice de búsqueda de texto completo para productos.
+
+`SearchFilter` compila `?search=` a `icontains` (LIKE '%término%'), que recorre
+la tabla entera en cada consulta. Aquí la búsqueda usa el índice de texto
+completo del motor de base de datos, con coincidencia por prefijo ("marti"
+encuentra "Martillo") y resultados ordenados por relevancia:
+
+    - SQLite: tabla virtual FTS5 de contenido externo, sincronizada con
+      `Producto` mediante triggers (cubren también `bulk_create`, `update()`
+      y borrados en cascada).
+    - MySQL: índice FULLTEXT sobre (nombre, descripcion) en modo booleano.
+
+Los motores sin backend registrado en `BACKENDS` siguen usando `icontains`.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Producto
+
+_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+
+def palabras(termino):
+    """
+    Separa el término de búsqueda en palabras, descartando la puntuación y
+    los operadores propios de cada motor.
+    """
+    return _PALABRA.findall(termino or "")
+
+
+class BackendBusqueda(ABC):
+    """
+    Interfaz de un backend de búsqueda de productos. Un backend que no
+    implementa todos los métodos no se puede instanciar.
+    """
+
+    @abstractmethod
+    def crear(self, schema_editor):
+        """
+        Crea el índice (y lo llena con los productos existentes).
+        """
+
+    @abstractmethod
+    def eliminar(self, schema_editor):
+        """
+        Elimina el índice.
+        """
+
+    @abstractmethod
+    def reconstruir(self, connection):
+        """
+        Vuelve a generar el índice completo a partir de la tabla de productos.
+        """
+
+    @abstractmethod
+    def buscar(self, queryset, termino):
+        """
+        Filtra `queryset` por `termino` y lo anota con `relevancia`, ordenado
+        de más a menos relevante (con `id` como desempate).
+        """
+
+
+class SQLiteFTS5(BackendBusqueda):
+    """
+    Tabla virtual FTS5 de contenido externo: guarda solo el índice invertido y
+    lee nombre y descripción de la tabla de productos.
+    """
+    tabla = "cotizadorapp_producto_fts"
+    # bm25 pondera más las coincidencias en el nombre que en la descripción.
+    ranking = "bm25(10.0, 1.0)"
+
+    def crear(self, schema_editor):
+        tabla, productos = self.tabla, Producto._meta.db_table
+        sentencias = [
+            f"""CREATE VIRTUAL TABLE "{tabla}" USING fts5(
+                nombre, descripcion,
+                content='{productos}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+            f"""CREATE TRIGGER "{tabla}_ai" AFTER INSERT ON "{productos}" BEGIN
+                INSERT INTO "{tabla}"(rowid, nombre, descripcion)
+                VALUES (new.id, new.nombre, new.descripcion);
+            END""",
+            f"""CREATE TRIGGER "{tabla}_ad" AFTER DELETE ON "{productos}" BEGIN
+                INSERT INTO "{tabla}"("{tabla}", rowid, nombre, descripcion)
+                VALUES ('delete', old.id, old.nombre, old.descripcion);
+            END""",
+            f"""CREATE TRIGGER "{tabla}_au" AFTER UPDATE OF nombre, descripcion
+                ON "{productos}" BEGIN
+                INSERT INTO "{tabla}"("{tabla}", rowid, nombre, descripcion)
+                VALUES ('delete', old.id, old.nombre, old.descripcion);
+                INSERT INTO "{tabla}"(rowid, nombre, descripcion)
+                VALUES (new.id, new.nombre, new.descripcion);
+            END""",
+            f"""INSERT INTO "{tabla}"("{tabla}", rank) VALUES ('rank', '{self.ranking}')""",
+            f"""INSERT INTO "{tabla}"("{tabla}") VALUES ('rebuild')""",
+        ]
+        for sentencia in sentencias:
+            schema_editor.execute(sentencia)
+
+    def eliminar(self, schema_editor):
+        for sufijo in ("ai", "ad", "au"):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "{self.tabla}_{sufijo}"')
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{self.tabla}"')
+
+    def reconstruir(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"""INSERT INTO "{self.tabla}"("{self.tabla}") VALUES ('rebuild')""")
+            cursor.execute(f"""INSERT INTO "{self.tabla}"("{self.tabla}") VALUES ('optimize')""")
+
+    def consulta(self, termino):
+        """
+        Traduce el término a la sintaxis de FTS5: cada palabra entre comillas
+        (sin operadores) y con `*` para buscar por prefijo; todas deben estar.
+        """
+        return " ".join(f'"{palabra}"*' for palabra in palabras(termino))
+
+    def buscar(self, queryset, termino):
+        productos = queryset.model._meta.db_table
+        return queryset.extra(
+            tables=[self.tabla],
+            where=[f'"{self.tabla}".rowid = "{productos}"."id"',
+                   f'"{self.tabla}" MATCH %s'],
+            params=[self.consulta(termino)],
+        ).annotate(
+            # En FTS5 `rank` es menor cuanto más relevante es la fila.
+            relevancia=RawSQL(f'"{self.tabla}".rank', ()),
+        ).order_by('relevancia', 'id')
+
+
+class MySQLFullText(BackendBusqueda):
+    """
+    Índice FULLTEXT de InnoDB sobre (nombre, descripcion).
+    """
+    indice = "producto_busqueda_ft"
+
+    def crear(self, schema_editor):
+        schema_editor.execute(
+            f"ALTER TABLE `{Producto._meta.db_table}` "
+            f"ADD FULLTEXT INDEX `{self.indice}` (nombre, descripcion)")
+
+    def eliminar(self, schema_editor):
+        schema_editor.execute(
+            f"ALTER TABLE `{Producto._meta.db_table}` DROP INDEX `{self.indice}`")
+
+    def reconstruir(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"OPTIMIZE TABLE `{Producto._meta.db_table}`")
+
+    def consulta(self, termino):
+        return " ".join(f"+{palabra}*" for palabra in palabras(termino))
+
+    def buscar(self, queryset, termino):
+        relevancia = RawSQL("MATCH (nombre, descripcion) AGAINST (%s IN BOOLEAN MODE)",
+                            (self.consulta(termino),))
+        return queryset.annotate(relevancia=relevancia).filter(
+            relevancia__gt=0).order_by('-relevancia', 'id')
+
+
+# Backend por motor de base de datos (`connection.vendor`).
+BACKENDS = {
+    'sqlite': SQLiteFTS5,
+    'mysql': MySQLFullText,
+}
+
+
+def backend_para(connection):
+    """
+    Devuelve el backend de búsqueda del motor de `connection`, o None si el
+    motor no tiene índice de texto completo.
+    """
+    clase = BACKENDS.get(connection.vendor)
+    return clase() if clase else None
+
+
+class BusquedaProductosFilter(filters.SearchFilter):
+    """
+    `SearchFilter` para productos que usa el índice de texto completo.
+
+    Sin `?ordering=` los resultados salen ordenados por relevancia; en motores
+    sin backend se comporta igual que `SearchFilter`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        termino = request.query_params.get(self.search_param, '')
+        backend = backend_para(connections[queryset.db])
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+        if not palabras(termino):
+            return queryset
+        return backend.buscar(queryset, termino)
@@ -0,0 +1,107 @@
+"""
+Caché de respuestas de los listados y detalles del catálogo (productos y
+categorías).
+
+Se guarda `response.data` ya serializado, con una clave formada por la ruta,
+los parámetros de la consulta y la versión del catálogo (`VersionCatalogo`).
+Cualquier escritura en productos o categorías incrementa la versión, de modo
+que las entradas antiguas dejan de consultarse y terminan desalojadas por el
+límite de entradas (`MAX_ENTRIES`) o por expiración (`TIMEOUT`) del caché
+`CACHE_ALIAS`.
+"""
+import hashlib
+import threading
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .models import VersionCatalogo
+
+CACHE_ALIAS = 'catalogo'
+
+_contadores = {'aciertos': 0, 'fallos': 0}
+_contadores_lock = threading.Lock()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _contar(nombre):
+    with _contadores_lock:
+        _contadores[nombre] += 1
+
+
+def clave(request, version):
+    """
+    Clave de caché de la petición: host (los enlaces de paginación son
+    absolutos), ruta y parámetros ordenados, dentro de la versión dada.
+    """
+    parametros = sorted(
+        (nombre, valor)
+        for nombre, valores in request.query_params.lists()
+        for valor in valores
+    )
+    datos = "\x1f".join([request.get_host(), request.path, repr(parametros)])
+    return f"catalogo:{version}:{hashlib.sha1(datos.encode('utf-8')).hexdigest()}"
+
+
+def respuesta_cacheada(request, generar):
+    """
+    Devuelve la respuesta cacheada de la petición o la genera con `generar()`
+    y la guarda si fue exitosa. Agrega la cabecera `X-Cache: HIT|MISS`.
+    """
+    clave_peticion = clave(request, VersionCatalogo.actual())
+    datos = _cache().get(clave_peticion)
+    if datos is not None:
+        _contar('aciertos')
+        return Response(datos, headers={'X-Cache': 'HIT'})
+
+    _contar('fallos')
+    response = generar()
+    if response.status_code == 200:
+        _cache().set(clave_peticion, response.data)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def invalidar():
+    """
+    Incrementa la versión del catálogo. Las escrituras masivas que no emiten
+    señales (`bulk_create`, `update()`) deben llamarla explícitamente.
+    """
+    VersionCatalogo.incrementar()
+
+
+def estadisticas():
+    """
+    Aciertos y fallos de este proceso, tasa de aciertos y versión actual.
+    """
+    with _contadores_lock:
+        aciertos, fallos = _contadores['aciertos'], _contadores['fallos']
+    total = aciertos + fallos
+    return {
+        'aciertos': aciertos,
+        'fallos': fallos,
+        'tasa_aciertos': round(aciertos / total, 4) if total else None,
+        'version': VersionCatalogo.actual(),
+    }
+
+
+def reiniciar_estadisticas():
+    with _contadores_lock:
+        _contadores['aciertos'] = _contadores['fallos'] = 0
+
+
+class CacheCatalogoMixin:
+    """
+    Mixin para ViewSets del catálogo: cachea `list` y `retrieve`.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return respuesta_cacheada(request, lambda: super(CacheCatalogoMixin, self).list(
+            request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return respuesta_cacheada(request, lambda: super(CacheCatalogoMixin, self).retrieve(
+            request, *args, **kwargs))
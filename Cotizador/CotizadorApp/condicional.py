@@ -0,0 +1,103 @@
+"""
+GET condicionales (ETag / Last-Modified) para cotizaciones y sus archivos.
+
+Los validadores salen de columnas baratas de leer (`version`, `actualizado`
+de la cotización y la versión del catálogo, porque el JSON y el PDF
+incluyen los productos), de modo que una petición con `If-None-Match` o
+`If-Modified-Since` vigente recibe un 304 sin pasar por el serializer, la
+caché de PDF ni ReportLab.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import VersionCatalogo
+from .pdf_cache import clave as clave_pdf, estado_catalogo
+
+
+def etag(*partes):
+    """
+    ETag fuerte (entre comillas) a partir de las partes dadas.
+    """
+    datos = "\x1f".join(str(parte) for parte in partes)
+    return f'"{hashlib.sha1(datos.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def _parametros(request):
+    return sorted(
+        (nombre, valor)
+        for nombre, valores in request.query_params.lists()
+        for valor in valores
+    )
+
+
+def _mas_reciente(*fechas):
+    fechas = [fecha for fecha in fechas if fecha is not None]
+    return max(fechas) if fechas else None
+
+
+def responder(request, etag_actual, ultima_modificacion, generar):
+    """
+    Responde 304 si los validadores de la petición coinciden; si no, llama a
+    `generar()` y agrega `ETag`, `Last-Modified` y `Cache-Control` a la
+    respuesta (el cliente debe revalidar siempre: `no-cache`).
+    """
+    # Last-Modified tiene resolución de segundos; el ETag cubre los cambios
+    # dentro del mismo segundo.
+    timestamp = int(ultima_modificacion.timestamp()) if ultima_modificacion else None
+    response = get_conditional_response(request, etag=etag_actual, last_modified=timestamp)
+    if response is None:
+        response = generar()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag_actual
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def responder_cotizacion(request, cotizacion, generar):
+    """
+    GET condicional del JSON de una cotización. El ETag incluye
+    `actualizado`: un `save()` directo (p. ej. de la fecha) no incrementa
+    `version`.
+    """
+    version_catalogo, catalogo_actualizado = VersionCatalogo.estado()
+    return responder(
+        request,
+        etag('json', cotizacion.pk, cotizacion.version, cotizacion.actualizado.isoformat(),
+             version_catalogo),
+        _mas_reciente(cotizacion.actualizado, catalogo_actualizado),
+        generar)
+
+
+def responder_pdf(request, cotizacion, generar):
+    """
+    GET condicional del PDF de una cotización. Usa la misma clave que la
+    caché de PDF, que ya cubre la versión, los datos del cliente y la versión
+    del catálogo (el PDF imprime los nombres de los productos).
+    """
+    etag_actual = etag('pdf', clave_pdf(cotizacion))
+    _, catalogo_actualizado = estado_catalogo(cotizacion)
+    return responder(request, etag_actual,
+                     _mas_reciente(cotizacion.actualizado, catalogo_actualizado), generar)
+
+
+def responder_listado(request, cotizaciones, generar, *extra):
+    """
+    GET condicional de un listado o exportación de cotizaciones.
+
+    El ETag resume, con una sola consulta de agregación, la cantidad de
+    cotizaciones y su último cambio junto con los parámetros de la petición y
+    la versión del catálogo. No se envía `Last-Modified`: un borrado no mueve
+    ningún timestamp, así que solo el ETag (que incluye la cantidad) lo detecta.
+    """
+    resumen = cotizaciones.order_by().aggregate(cantidad=Count('pk'), ultima=Max('actualizado'))
+    version_catalogo, _ = VersionCatalogo.estado()
+    etag_actual = etag('listado', request.user.pk, _parametros(request), resumen['cantidad'],
+                       resumen['ultima'] and resumen['ultima'].isoformat(), version_catalogo,
+                       *extra)
+    return responder(request, etag_actual, None, generar)
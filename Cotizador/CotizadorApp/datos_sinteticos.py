@@ -0,0 +1,201 @@
+"""
+Generación de datos sintéticos para benchmarks y pruebas de carga.
+
+Crea usuarios, categorías, productos y cotizaciones con sus detalles por
+bloques con `bulk_create`, sin pasar por señales ni serializers:
+
+- los usuarios comparten un único hash de contraseña (calcular PBKDF2 por
+  usuario tomaría horas a gran escala);
+- las cotizaciones se insertan con subtotal, IVA y total ya calculados, y
+  luego un UPDATE por bloque les da fechas repartidas en los últimos `dias`
+  días;
+- al terminar se reconstruyen los resúmenes de ventas y se invalida el caché
+  del catálogo. El índice de búsqueda se mantiene solo (triggers).
+
+Los datos son reproducibles con la misma `semilla` y se pueden generar
+varias veces sobre la misma base: los identificadores únicos continúan desde
+los usuarios existentes.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Case, Max, Value, When
+from django.utils import timezone
+
+from . import cache_catalogo, resumen_ventas
+from .models import Categoria, Cotizacion, CustomUser, DetalleFactura, Producto, calcular_totales
+
+LOTE = 2000
+
+CONTRASENA = "cotizador123"
+
+NOMBRES = ["Ana", "Benjamín", "Camila", "Diego", "Fernanda", "Gonzalo", "Isidora",
+           "Javier", "Josefa", "Matías", "Sofía", "Tomás", "Valentina", "Vicente"]
+APELLIDOS = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras",
+             "Silva", "Martínez", "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes"]
+CATEGORIAS = ["Herramientas", "Electricidad", "Gasfitería", "Pinturas", "Jardín",
+              "Ferretería", "Construcción", "Iluminación", "Baño", "Cocina",
+              "Seguridad", "Adhesivos", "Maderas", "Fijaciones", "Climatización"]
+ARTICULOS = ["Martillo", "Taladro", "Llave", "Cable", "Tubo", "Pintura", "Manguera",
+             "Tornillo", "Ampolleta", "Cerradura", "Sierra", "Brocha", "Adhesivo",
+             "Tablero", "Enchufe", "Válvula", "Esmalte", "Tarugo", "Lija", "Foco"]
+VARIANTES = ["profesional", "reforzado", "compacto", "industrial", "inalámbrico",
+             "galvanizado", "de precisión", "multiuso", "premium", "económico"]
+
+
+def digito_verificador(numero):
+    """
+    Dígito verificador de un RUT chileno (módulo 11).
+    """
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    return {11: "0", 10: "K"}.get(resto, str(resto))
+
+
+def _asignar_fechas(fechas):
+    """
+    Asigna las fechas `{id: fecha}` a sus cotizaciones con un único UPDATE.
+    `bulk_create` no las respeta: `auto_now_add` pone la fecha actual.
+    """
+    Cotizacion.objects.filter(id__in=fechas).update(fecha=Case(
+        *(When(id=id_, then=Value(fecha)) for id_, fecha in fechas.items()),
+        output_field=Cotizacion._meta.get_field('fecha')))
+
+
+def _por_bloques(objetos, lote=LOTE):
+    for i in range(0, len(objetos), lote):
+        yield objetos[i:i + lote]
+
+
+def _maximo_id(modelo):
+    return modelo.objects.aggregate(maximo=Max('id'))['maximo'] or 0
+
+
+def generar_usuarios(cantidad, azar):
+    """
+    Returns:
+        list: Ids de los usuarios creados.
+    """
+    inicio = _maximo_id(CustomUser) + 1
+    contrasena = make_password(CONTRASENA)
+    usuarios = []
+    for n in range(inicio, inicio + cantidad):
+        rut = 30000000 + n
+        usuarios.append(CustomUser(
+            username=f"usuario{n}", email=f"usuario{n}@example.com", password=contrasena,
+            rut=f"{rut}-{digito_verificador(rut)}", telefono=f"9{azar.randint(10000000, 99999999)}",
+            first_name=azar.choice(NOMBRES), last_name=azar.choice(APELLIDOS)))
+    for bloque in _por_bloques(usuarios):
+        CustomUser.objects.bulk_create(bloque)
+    return list(CustomUser.objects.filter(id__gte=inicio).values_list('id', flat=True))
+
+
+def generar_categorias(cantidad):
+    """
+    Crea `cantidad` categorías con nombres que no existan aún.
+    """
+    existentes = set(Categoria.objects.values_list('nombre', flat=True))
+    nombres = []
+    vuelta = 0
+    while len(nombres) < cantidad:
+        for base in CATEGORIAS:
+            nombre = base if vuelta == 0 else f"{base} {vuelta + 1}"
+            if nombre not in existentes:
+                nombres.append(nombre)
+                if len(nombres) == cantidad:
+                    break
+        vuelta += 1
+    Categoria.objects.bulk_create([Categoria(nombre=nombre) for nombre in nombres])
+    return list(Categoria.objects.filter(nombre__in=nombres).values_list('id', flat=True))
+
+
+def generar_productos(cantidad, categorias, azar):
+    """
+    Returns:
+        list: Pares `(id, precio)` de los productos creados.
+    """
+    desde = _maximo_id(Producto)
+    productos = []
+    for n in range(cantidad):
+        articulo, variante = azar.choice(ARTICULOS), azar.choice(VARIANTES)
+        # Precios en pesos con distribución sesgada: muchos baratos, pocos caros.
+        precio = Decimal(max(round(azar.lognormvariate(9, 1.2), -1), 10)).quantize(Decimal("1.00"))
+        productos.append(Producto(
+            nombre=f"{articulo} {variante} {desde + n + 1}",
+            descripcion=f"{articulo} {variante} para uso doméstico y profesional.",
+            precio=precio, stock=azar.randint(0, 5000),
+            categoria_id=azar.choice(categorias) if categorias else None))
+    for bloque in _por_bloques(productos):
+        Producto.objects.bulk_create(bloque)
+    # MySQL no devuelve los ids de `bulk_create`.
+    return list(Producto.objects.filter(id__gt=desde).order_by('id').values_list('id', 'precio'))
+
+
+def generar_cotizaciones(cantidad, detalles, usuarios, productos, dias, azar):
+    """
+    Inserta `cantidad` cotizaciones con `detalles` líneas cada una (productos
+    distintos por cotización), por bloques de ~`LOTE` detalles.
+    """
+    ahora = timezone.now()
+    por_bloque = max(LOTE // max(detalles, 1), 1)
+    # Ids explícitos: MySQL no los devuelve de `bulk_create` y los detalles
+    # los necesitan.
+    siguiente = _maximo_id(Cotizacion) + 1
+    creadas = 0
+    while creadas < cantidad:
+        bloque = min(por_bloque, cantidad - creadas)
+        cotizaciones, lineas, fechas = [], [], {}
+        for _ in range(bloque):
+            elegidos = azar.sample(productos, min(detalles, len(productos)))
+            cantidades = [azar.randint(1, 20) for _ in elegidos]
+            subtotal = sum((precio * c for (_, precio), c in zip(elegidos, cantidades)),
+                           Decimal("0"))
+            cotizacion = Cotizacion(id=siguiente, user_id=azar.choice(usuarios))
+            fechas[siguiente] = ahora - timedelta(seconds=azar.randint(0, dias * 86400))
+            cotizacion.subtotal, cotizacion.iva, cotizacion.total = calcular_totales(subtotal)
+            cotizaciones.append(cotizacion)
+            siguiente += 1
+            lineas.append([(producto_id, precio, c)
+                           for (producto_id, precio), c in zip(elegidos, cantidades)])
+        with transaction.atomic():
+            Cotizacion.objects.bulk_create(cotizaciones)
+            _asignar_fechas(fechas)
+            DetalleFactura.objects.bulk_create([
+                DetalleFactura(cotizacion=cotizacion, producto_id=producto_id,
+                               cantidad=c, precio_unitario=precio)
+                for cotizacion, detalle in zip(cotizaciones, lineas)
+                for producto_id, precio, c in detalle
+            ], batch_size=LOTE)
+        creadas += bloque
+    return creadas
+
+
+def generar(usuarios=100, categorias=15, productos=1000, cotizaciones=1000, detalles=5,
+            dias=365, semilla=0):
+    """
+    Genera el conjunto de datos completo.
+
+    Returns:
+        dict: Cantidad de objetos creados por tipo.
+    """
+    azar = random.Random(semilla)
+    ids_usuarios = generar_usuarios(usuarios, azar)
+    ids_categorias = generar_categorias(categorias)
+    catalogo = generar_productos(productos, ids_categorias, azar)
+    creadas = 0
+    if cotizaciones:
+        if not ids_usuarios or not catalogo:
+            raise ValueError("Para generar cotizaciones se necesitan usuarios y productos.")
+        creadas = generar_cotizaciones(
+            cotizaciones, detalles, ids_usuarios, catalogo, dias, azar)
+    resumen_ventas.reconstruir()
+    cache_catalogo.invalidar()
+    return {'usuarios': len(ids_usuarios), 'categorias': len(ids_categorias),
+            'productos': len(catalogo), 'cotizaciones': creadas,
+            'detalles': creadas * min(detalles, len(catalogo))}
@@ -0,0 +1,230 @@
+"""
+Descargas asíncronas para el despliegue ASGI.
+
+Bajo ASGI, Django ejecuta cada vista síncrona en un hilo propio de la
+petición, que abre su propia conexión a la base de datos, y consume el
+`streaming_content` síncrono de una respuesta con `sync_to_async(list)`:
+arma el archivo completo en memoria antes de enviar el primer byte. Con
+cientos de descargas simultáneas hay cientos de hilos trabajando y de
+conexiones abiertas.
+
+`vista_asincrona` envuelve las vistas de descarga (exportaciones y PDF) en
+una vista `async`:
+
+- cada descarga reserva uno de los `DESCARGAS_ASINCRONAS['HILOS']` hilos de
+  descarga (las demás esperan turno) y la vista original (DRF:
+  autenticación, permisos, consultas y renderizado) corre en él, con la
+  conexión a la base de datos de ese hilo;
+- el archivo de un `FileResponse` (XLSX, PDF en caché, trabajos de
+  exportación) libera el hilo de inmediato y se lee por bloques en un pool
+  compartido, así que mientras el cliente recibe no se ocupa ningún hilo de
+  descarga ni conexión;
+- el generador de un `StreamingHttpResponse` (CSV, NDJSON, ZIP) se consume
+  bloque a bloque en el hilo reservado, porque el cursor de la base de datos
+  no puede cambiar de hilo: cada bloque se envía en cuanto está listo y el
+  hilo queda reservado hasta que termina la descarga.
+
+La respuesta es un `StreamingHttpResponse` con un iterador asíncrono. (Django
+mantiene, inactivo, el hilo de la petición que usa para las señales de
+inicio y fin.) Las respuestas que no son archivos (errores, 304) se
+devuelven como las entrega la vista.
+
+`envolver` reemplaza las vistas de las rutas indicadas; las URLs lo aplican
+cuando `DESCARGAS_ASINCRONAS['ACTIVAS']` (por defecto en `asgi.py`).
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import URLPattern
+
+from .exporters import TAMANO_BLOQUE
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Hilos de descarga libres y semáforo que limita los reservados (uno por
+# bucle de eventos: los semáforos de asyncio no se comparten entre bucles).
+_hilos_libres = []
+_semaforos = weakref.WeakKeyDictionary()
+# Reentrante: `liberar` puede correr desde un finalizador mientras se tiene.
+_hilos_lock = threading.RLock()
+
+
+def _configuracion():
+    return settings.DESCARGAS_ASINCRONAS
+
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_configuracion()['HILOS'],
+                                       thread_name_prefix='descargas')
+        return _pool
+
+
+def _ejecutar(executor, funcion, *args):
+    # Con el contexto actual (p. ej. la medición de `metricas`).
+    contexto = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(executor, contexto.run, funcion, *args)
+
+
+async def en_pool(funcion, *args):
+    """
+    Ejecuta `funcion(*args)` en el pool compartido de descargas.
+    """
+    return await _ejecutar(_obtener_pool(), funcion, *args)
+
+
+class _Reserva:
+    """
+    Hilo de descarga reservado para una petición hasta `liberar()`.
+    """
+
+    def __init__(self, semaforo, hilo):
+        self._loop = asyncio.get_running_loop()
+        self._semaforo = semaforo
+        self._hilo = hilo
+        self._liberada = False
+
+    async def ejecutar(self, funcion, *args):
+        return await _ejecutar(self._hilo, funcion, *args)
+
+    def liberar(self, al_terminar=None):
+        """
+        Devuelve el hilo (tras ejecutar en él `al_terminar`, si se indica).
+        Se puede llamar más de una vez y desde cualquier hilo.
+        """
+        with _hilos_lock:
+            if self._liberada:
+                return
+            self._liberada = True
+        if al_terminar is not None:
+            self._hilo.submit(al_terminar)
+        with _hilos_lock:
+            _hilos_libres.append(self._hilo)
+        try:
+            self._loop.call_soon_threadsafe(self._semaforo.release)
+        except RuntimeError:
+            # El bucle ya se cerró, y con él su semáforo.
+            pass
+
+
+async def _reservar():
+    loop = asyncio.get_running_loop()
+    with _hilos_lock:
+        semaforo = _semaforos.get(loop)
+        if semaforo is None:
+            semaforo = _semaforos[loop] = asyncio.Semaphore(_configuracion()['HILOS'])
+    await semaforo.acquire()
+    with _hilos_lock:
+        hilo = _hilos_libres.pop() if _hilos_libres else ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='descargas-reservado')
+    return _Reserva(semaforo, hilo)
+
+
+def cerrar():
+    """
+    Detiene el pool compartido y los hilos de descarga libres (cada hilo
+    cierra sus conexiones al terminar).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+    with _hilos_lock:
+        libres, _hilos_libres[:] = list(_hilos_libres), []
+    for hilo in libres:
+        hilo.shutdown()
+
+
+def _preparar(vista, request, args, kwargs):
+    # Como al inicio y fin de una petición: descarta las conexiones vencidas
+    # o rotas del hilo; las demás se reutilizan según CONN_MAX_AGE. El
+    # generador de un `StreamingHttpResponse` todavía no empezó, así que no
+    # tiene cursores abiertos.
+    close_old_connections()
+    try:
+        response = vista(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+    finally:
+        close_old_connections()
+    return response
+
+
+async def _leer_archivo(archivo):
+    try:
+        while True:
+            bloque = await en_pool(archivo.read, TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
+    finally:
+        await en_pool(archivo.close)
+
+
+async def _leer_generador(reserva, original):
+    # `close()` cierra el generador y envía `request_finished`, que cierra
+    # las conexiones vencidas del hilo.
+    try:
+        bloques = iter(original.streaming_content)
+        while True:
+            bloque = await reserva.ejecutar(next, bloques, None)
+            if bloque is None:
+                break
+            yield bloque
+    finally:
+        reserva.liberar(al_terminar=original.close)
+
+
+def vista_asincrona(vista):
+    """
+    Versión `async` de la vista de descarga `vista` (ver el módulo).
+    """
+    @functools.wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        reserva = await _reservar()
+        try:
+            original = await reserva.ejecutar(_preparar, vista, request, args, kwargs)
+        except BaseException:
+            reserva.liberar()
+            raise
+        if isinstance(original, FileResponse) and hasattr(original, 'file_to_stream'):
+            reserva.liberar()
+            contenido = _leer_archivo(original.file_to_stream)
+        elif original.streaming and not original.is_async:
+            contenido = _leer_generador(reserva, original)
+        else:
+            reserva.liberar()
+            return original
+        response = StreamingHttpResponse(contenido, status=original.status_code)
+        for cabecera, valor in original.items():
+            response[cabecera] = valor
+        response.cookies = original.cookies
+        # Si el cuerpo nunca se empieza a leer (p. ej. el cliente se desconecta
+        # antes), el hilo se libera al descartar la respuesta.
+        weakref.finalize(response, reserva.liberar, original.close)
+        return response
+    return envoltura
+
+
+def envolver(urlpatterns, nombres):
+    """
+    Copia de `urlpatterns` con las vistas de las rutas `nombres` envueltas en
+    `vista_asincrona`.
+    """
+    return [
+        URLPattern(patron.pattern, vista_asincrona(patron.callback),
+                   patron.default_args, patron.name)
+        if isinstance(patron, URLPattern) and patron.name in nombres else patron
+        for patron in urlpatterns
+    ]
@@ -0,0 +1,189 @@
+"""
+Exportación columnar de cotizaciones (Parquet y Arrow IPC) para análisis.
+
+En vez de convertir cada detalle a una tupla de objetos Python y escribirla
+fila a fila, las filas de `values_list` se leen por bloques y cada columna
+del bloque se convierte de una vez en un arreglo tipado de Arrow:
+
+- `cotizacion_id` y `cantidad` como enteros, `fecha` como timestamp UTC;
+- `precio_unitario` y `precio_total` como decimales de punto fijo (misma
+  escala que el modelo, sin pasar por float);
+- `cliente`, `email` y `producto` codificados como diccionario (cada nombre
+  distinto se guarda una vez por lote).
+
+Los bloques se juntan en lotes de `FILAS_POR_LOTE` filas y las columnas
+derivadas (`cliente`, `precio_total`, "Eliminado" para los productos
+borrados) se calculan con `pyarrow.compute` sobre el lote completo. Cada
+lote es un row group de Parquet (zstd) o un record batch del stream Arrow,
+así que la memoria depende del tamaño del lote y no del total.
+
+pyarrow está en `requirements.txt`; si falta en un entorno, estos formatos
+responden 406.
+"""
+import tempfile
+from itertools import islice
+
+from django.http import FileResponse
+from rest_framework.exceptions import NotAcceptable
+
+from .exporters import (
+    CHUNK_SIZE, SPOOL_MAX_MEMORIA, exportacion_cotizaciones, respuesta_exportacion,
+)
+from .metricas import medido
+from .models import DetalleFactura
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+PARQUET_CONTENT_TYPE = 'application/vnd.apache.parquet'
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+
+FORMATOS = ('parquet', 'arrow')
+
+# Filas por row group / record batch.
+FILAS_POR_LOTE = 65536
+
+COMPRESION_PARQUET = 'zstd'
+
+
+def disponible():
+    return pa is not None
+
+
+def esquema_cotizaciones():
+    """
+    Esquema Arrow de la exportación de cotizaciones (una fila por detalle).
+    """
+    campo_precio = DetalleFactura._meta.get_field('precio_unitario')
+    texto = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('cotizacion_id', pa.int64()),
+        ('fecha', pa.timestamp('us', tz='UTC')),
+        ('cliente', texto),
+        ('email', texto),
+        ('producto', texto),
+        ('cantidad', pa.int64()),
+        ('precio_unitario', pa.decimal128(campo_precio.max_digits, campo_precio.decimal_places)),
+        # Cantidad (hasta 10 dígitos) por precio unitario.
+        ('precio_total', pa.decimal128(campo_precio.max_digits + 10, campo_precio.decimal_places)),
+    ])
+
+
+def _columnas(filas, tipos):
+    """
+    Arreglos tipados con las columnas de un bloque de filas de `values_list`.
+    """
+    (cotizacion_id, fecha, nombre, apellido, email, producto,
+     cantidad, precio_unitario) = zip(*filas)
+    return [
+        pa.array(cotizacion_id, type=pa.int64()),
+        pa.array(fecha, type=tipos['fecha']),
+        pa.array(nombre, type=pa.string()),
+        pa.array(apellido, type=pa.string()),
+        pa.array(email, type=pa.string()),
+        pa.array(producto, type=pa.string()),
+        pa.array(cantidad, type=pa.int64()),
+        pa.array(precio_unitario, type=tipos['precio_unitario']),
+    ]
+
+
+def _lote(bloques, esquema):
+    """
+    `RecordBatch` a partir de los arreglos de varios bloques; las columnas
+    derivadas se calculan sobre el lote completo.
+    """
+    tipos = {campo.name: campo.type for campo in esquema}
+    (cotizacion_id, fecha, nombre, apellido, email, producto,
+     cantidad, precio_unitario) = [pa.concat_arrays(columna) for columna in zip(*bloques)]
+    precio_total = pc.multiply(pc.cast(cantidad, pa.decimal128(19, 0)), precio_unitario)
+    columnas = [
+        cotizacion_id,
+        fecha,
+        pc.binary_join_element_wise(nombre, apellido, " ").dictionary_encode(),
+        email.dictionary_encode(),
+        pc.fill_null(producto, "Eliminado").dictionary_encode(),
+        cantidad,
+        precio_unitario,
+        pc.cast(precio_total, tipos['precio_total']),
+    ]
+    return pa.RecordBatch.from_arrays(columnas, schema=esquema)
+
+
+def lotes_cotizaciones(cotizaciones, filas_por_lote=FILAS_POR_LOTE, chunk_size=CHUNK_SIZE):
+    """
+    Itera `RecordBatch` con un detalle por fila de las cotizaciones dadas.
+
+    Las filas se convierten en arreglos tipados cada `chunk_size` (lo que se
+    lee en cada viaje a la base de datos), así que los objetos Python vivos
+    no dependen de `filas_por_lote`.
+
+    Args:
+        cotizaciones: QuerySet de `Cotizacion` ya filtrado.
+        filas_por_lote: Filas por lote (row group de Parquet).
+        chunk_size: Filas leídas por cada viaje a la base de datos.
+    """
+    esquema = esquema_cotizaciones()
+    tipos = {campo.name: campo.type for campo in esquema}
+    filas = DetalleFactura.objects.filter(
+        cotizacion__in=cotizaciones.values('pk')
+    ).order_by('cotizacion_id', 'id').values_list(
+        'cotizacion_id', 'cotizacion__fecha',
+        'cotizacion__user__first_name', 'cotizacion__user__last_name',
+        'cotizacion__user__email', 'producto__nombre',
+        'cantidad', 'precio_unitario',
+    ).iterator(chunk_size=chunk_size)
+    bloques, acumuladas = [], 0
+    while True:
+        bloque = list(islice(filas, min(chunk_size, filas_por_lote - acumuladas)))
+        if bloque:
+            bloques.append(_columnas(bloque, tipos))
+            acumuladas += len(bloque)
+        if bloques and (not bloque or acumuladas >= filas_por_lote):
+            yield _lote(bloques, esquema)
+            bloques, acumuladas = [], 0
+        if not bloque:
+            break
+
+
+@medido('columnar')
+def escribir_cotizaciones(destino, cotizaciones, formato, filas_por_lote=FILAS_POR_LOTE):
+    """
+    Escribe la exportación de cotizaciones en `destino` como Parquet o Arrow IPC.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    esquema = esquema_cotizaciones()
+    if formato == 'parquet':
+        escritor = pq.ParquetWriter(destino, esquema, compression=COMPRESION_PARQUET)
+    else:
+        escritor = ipc.new_stream(destino, esquema)
+    with escritor:
+        for lote in lotes_cotizaciones(cotizaciones, filas_por_lote):
+            escritor.write_batch(lote)
+
+
+def respuesta_cotizaciones(cotizaciones, formato):
+    """
+    Respuesta de la exportación de cotizaciones en cualquier formato: los
+    columnares se generan aquí en un archivo temporal y el resto con
+    `exporters.respuesta_exportacion`.
+    """
+    if formato not in FORMATOS:
+        return respuesta_exportacion(exportacion_cotizaciones(cotizaciones), formato)
+    if not disponible():
+        raise NotAcceptable(f"El formato {formato} requiere instalar pyarrow.")
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORIA)
+    try:
+        escribir_cotizaciones(spool, cotizaciones, formato)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    content_type = PARQUET_CONTENT_TYPE if formato == 'parquet' else ARROW_CONTENT_TYPE
+    return FileResponse(spool, as_attachment=True, filename=f"cotizaciones.{formato}",
+                        content_type=content_type)
@@ -0,0 +1,275 @@
+"""
+Motor de exportación en streaming.
+
+Las filas se leen de la base de datos por bloques con `values_list().iterator()`
+(sin instanciar modelos ni acumular listas) y se escriben a medida que llegan,
+de modo que la memoria usada no depende de la cantidad de datos exportados.
+
+Formatos disponibles:
+    - xlsx: libro de solo escritura en un archivo temporal de la petición.
+    - csv y ndjson: se generan fila a fila directamente hacia el cliente.
+"""
+import csv
+import datetime
+import tempfile
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+from .metricas import medido
+from .models import DetalleFactura
+
+CHUNK_SIZE = 2000
+
+# Tamaño máximo que un archivo generado se mantiene en memoria antes de
+# pasar a un archivo temporal en disco.
+SPOOL_MAX_MEMORIA = 8 * 1024 * 1024
+
+# Tamaño aproximado de cada bloque enviado al cliente en CSV y NDJSON.
+TAMANO_BLOQUE = 64 * 1024
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+FORMATOS = ('xlsx', 'csv', 'ndjson')
+
+# Una exportación: nombre base del archivo, nombre de la hoja XLSX, columnas
+# como pares (clave, encabezado) y un iterador de filas con valores crudos
+# (int, str, Decimal, datetime) en el orden de las columnas.
+Exportacion = namedtuple('Exportacion', ['nombre', 'hoja', 'columnas', 'filas'])
+
+_CODIFICADOR_JSON = DjangoJSONEncoder(ensure_ascii=False)
+
+
+COLUMNAS_COTIZACIONES = [
+    ('cotizacion_id', "ID Cotización"),
+    ('fecha', "Fecha"),
+    ('cliente', "Cliente"),
+    ('email', "Email"),
+    ('producto', "Producto"),
+    ('cantidad', "Cantidad"),
+    ('precio_unitario', "Precio Unitario"),
+    ('precio_total', "Precio Total"),
+]
+
+COLUMNAS_USUARIOS = [
+    ('id', "ID"),
+    ('nombre', "Nombre"),
+    ('apellido', "Apellido"),
+    ('rut', "RUT"),
+    ('email', "Email"),
+]
+
+COLUMNAS_PRODUCTOS = [
+    ('id', "ID"),
+    ('nombre', "Nombre"),
+    ('descripcion', "Descripción"),
+    ('precio', "Precio"),
+    ('categoria', "Categoría"),
+    ('stock', "Stock"),
+]
+
+
+def filas_cotizaciones(cotizaciones, chunk_size=CHUNK_SIZE):
+    """
+    Itera una fila por cada detalle de las cotizaciones dadas.
+
+    Args:
+        cotizaciones: QuerySet de `Cotizacion` ya filtrado.
+        chunk_size: Cantidad de filas leídas por cada viaje a la base de datos.
+
+    Yields:
+        tuple: Valores en el orden de `COLUMNAS_COTIZACIONES`.
+    """
+    detalles = DetalleFactura.objects.filter(
+        cotizacion__in=cotizaciones.values('pk')
+    ).order_by('cotizacion_id', 'id').values_list(
+        'cotizacion_id', 'cotizacion__fecha',
+        'cotizacion__user__first_name', 'cotizacion__user__last_name',
+        'cotizacion__user__email', 'producto__nombre',
+        'cantidad', 'precio_unitario',
+    )
+    for (cotizacion_id, fecha, nombre, apellido, email, producto,
+         cantidad, precio_unitario) in detalles.iterator(chunk_size=chunk_size):
+        yield (
+            cotizacion_id,
+            fecha,
+            f"{nombre} {apellido}",
+            email,
+            producto if producto is not None else "Eliminado",
+            cantidad,
+            precio_unitario,
+            cantidad * precio_unitario,
+        )
+
+
+def exportacion_cotizaciones(cotizaciones, chunk_size=CHUNK_SIZE):
+    """
+    Exportación con una fila por detalle de las cotizaciones dadas.
+    """
+    return Exportacion("cotizaciones", "Cotizaciones", COLUMNAS_COTIZACIONES,
+                       filas_cotizaciones(cotizaciones, chunk_size))
+
+
+def exportacion_usuarios(usuarios, chunk_size=CHUNK_SIZE):
+    """
+    Exportación con una fila por usuario.
+    """
+    filas = usuarios.order_by('id').values_list(
+        'id', 'first_name', 'last_name', 'rut', 'email'
+    ).iterator(chunk_size=chunk_size)
+    return Exportacion("usuarios", "Usuarios", COLUMNAS_USUARIOS, filas)
+
+
+def exportacion_productos(productos, chunk_size=CHUNK_SIZE):
+    """
+    Exportación con una fila por producto.
+    """
+    filas = (
+        (id_, nombre, descripcion, precio,
+         categoria if categoria is not None else "Sin categoría", stock)
+        for id_, nombre, descripcion, precio, categoria, stock
+        in productos.order_by('id').values_list(
+            'id', 'nombre', 'descripcion', 'precio', 'categoria__nombre', 'stock'
+        ).iterator(chunk_size=chunk_size)
+    )
+    return Exportacion("productos", "Productos", COLUMNAS_PRODUCTOS, filas)
+
+
+def _valor_xlsx(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, datetime.datetime):
+        return valor.strftime("%d-%m-%Y")
+    return valor
+
+
+def _valor_texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return _CODIFICADOR_JSON.default(valor)
+    return valor
+
+
+@medido('xlsx')
+def escribir_xlsx(destino, exportacion):
+    """
+    Escribe la exportación en un libro XLSX de solo escritura.
+
+    openpyxl vuelca cada fila al disco al agregarla, por lo que la memoria se
+    mantiene acotada sin importar el largo de `exportacion.filas`.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(exportacion.hoja)
+    hoja.append([encabezado for _, encabezado in exportacion.columnas])
+    for fila in exportacion.filas:
+        hoja.append([_valor_xlsx(valor) for valor in fila])
+    libro.save(destino)
+
+
+def _en_bloques(lineas):
+    """
+    Agrupa líneas de texto en bloques de bytes de ~`TAMANO_BLOQUE`.
+    """
+    bloque = []
+    tamano = 0
+    for linea in lineas:
+        bloque.append(linea)
+        tamano += len(linea)
+        if tamano >= TAMANO_BLOQUE:
+            yield "".join(bloque).encode("utf-8")
+            bloque = []
+            tamano = 0
+    if bloque:
+        yield "".join(bloque).encode("utf-8")
+
+
+class _Eco:
+    """
+    Pseudo-archivo que devuelve lo escrito en vez de guardarlo, para usar
+    `csv.writer` como formateador de líneas.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(exportacion):
+    """
+    Itera bloques de bytes CSV: el encabezado primero y luego las filas.
+    """
+    escritor = csv.writer(_Eco())
+    encabezados = [encabezado for _, encabezado in exportacion.columnas]
+    yield escritor.writerow(encabezados).encode("utf-8")
+    yield from _en_bloques(
+        escritor.writerow([_valor_texto(valor) for valor in fila])
+        for fila in exportacion.filas
+    )
+
+
+def generar_ndjson(exportacion):
+    """
+    Itera bloques de bytes NDJSON: un objeto JSON por línea.
+    """
+    claves = [clave for clave, _ in exportacion.columnas]
+    yield from _en_bloques(
+        _CODIFICADOR_JSON.encode(dict(zip(claves, fila))) + "\n"
+        for fila in exportacion.filas
+    )
+
+
+def escribir_archivo(destino, exportacion, formato):
+    """
+    Escribe la exportación en el archivo binario `destino` en el formato pedido.
+    """
+    if formato == 'xlsx':
+        escribir_xlsx(destino, exportacion)
+        return
+    generadores = {'csv': generar_csv, 'ndjson': generar_ndjson}
+    if formato not in generadores:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    for bloque in generadores[formato](exportacion):
+        destino.write(bloque)
+
+
+def respuesta_xlsx(exportacion):
+    """
+    Genera el XLSX en un archivo temporal propio de la petición y lo devuelve
+    como `FileResponse`, que lo envía por bloques y lo cierra al terminar.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORIA)
+    try:
+        escribir_xlsx(spool, exportacion)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return FileResponse(spool, as_attachment=True,
+                        filename=f"{exportacion.nombre}.xlsx",
+                        content_type=XLSX_CONTENT_TYPE)
+
+
+def respuesta_exportacion(exportacion, formato='xlsx'):
+    """
+    Devuelve la respuesta HTTP de la exportación en el formato pedido.
+
+    CSV y NDJSON se envían con `StreamingHttpResponse`: el primer bloque sale
+    apenas se lee la primera fila y el archivo nunca se arma completo en memoria.
+    """
+    if formato == 'xlsx':
+        return respuesta_xlsx(exportacion)
+    if formato == 'csv':
+        contenido, content_type = generar_csv(exportacion), CSV_CONTENT_TYPE
+    elif formato == 'ndjson':
+        contenido, content_type = generar_ndjson(exportacion), NDJSON_CONTENT_TYPE
+    else:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    response = StreamingHttpResponse(contenido, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{exportacion.nombre}.{formato}"')
+    return response
@@ -1,46 +1,25 @@
 # cotizaciones/exports.py
 
-from django.http import HttpResponse, FileResponse
+from django.http import HttpResponse
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from . import condicional
 from .models import Cotizacion
-from .utils import generar_pdf
-import pandas as pd
+from .pdf_cache import respuesta_pdf
+from .exportacion_columnar import respuesta_cotizaciones
+from .renderers import EXPORT_RENDERERS_COTIZACIONES, ExportContentNegotiation
 
 
 class ExportarCotizacionesExcel(APIView):
     permission_classes = [IsAuthenticated]
+    renderer_classes = EXPORT_RENDERERS_COTIZACIONES
+    content_negotiation_class = ExportContentNegotiation
 
     def get(self, request):
-        user = request.user
-        cotizaciones = Cotizacion.objects.filter(user=user)
-        data = []
-
-        for c in cotizaciones:
-            for detalle in c.detalles.all():
-                data.append({
-                    "ID Cotización": c.id,
-                    "Fecha": c.fecha.strftime("%d-%m-%Y"),
-                    "Cliente": f"{c.user.first_name} {c.user.last_name}",
-                    "Email": c.user.email,
-                    "Producto": detalle.producto.nombre if detalle.producto else "Eliminado",
-                    "Cantidad": detalle.cantidad,
-                    "Precio Unitario": float(detalle.precio_unitario),
-                    "Precio Total": float(detalle.precio_total),
-                })
-
-        df = pd.DataFrame(data)
-        file_name = "cotizaciones.xlsx"
-        with pd.ExcelWriter(file_name, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
-
-        with open(file_name, "rb") as f:
-            response = HttpResponse(
-                f.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-            return response
+        cotizaciones = Cotizacion.objects.del_usuario(request.user)
+        formato = request.accepted_renderer.format
+        return condicional.responder_listado(
+            request, cotizaciones, lambda: respuesta_cotizaciones(cotizaciones, formato), formato)
 
 
 class ExportarCotizacionPDF(APIView):
@@ -48,9 +27,9 @@ class ExportarCotizacionPDF(APIView):
 
     def get(self, request, pk):
         try:
-            cotizacion = Cotizacion.objects.get(pk=pk, user=request.user)
+            cotizacion = Cotizacion.objects.del_usuario(
+                request.user).select_related('user').con_version_catalogo().get(pk=pk)
         except Cotizacion.DoesNotExist:
             return HttpResponse("Cotización no encontrada", status=404)
 
-        buffer = generar_pdf(cotizacion)
-        return FileResponse(buffer, as_attachment=True, filename=f"cotizacion_{cotizacion.id}.pdf")
+        return condicional.responder_pdf(request, cotizacion, lambda: respuesta_pdf(cotizacion))
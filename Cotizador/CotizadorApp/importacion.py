@@ -0,0 +1,287 @@
+"""
+Importación masiva de productos desde CSV o XLSX.
+
+El archivo se lee fila a fila (`csv.reader` sobre el archivo subido y
+openpyxl en modo `read_only`), sin cargarlo completo en memoria, y se procesa
+por bloques de `LOTE` filas. Por cada bloque:
+
+- se validan las filas con campos de DRF instanciados una sola vez (sin un
+  serializer por fila);
+- se resuelven los nombres de categoría con una consulta, creando las que
+  falten con un único `bulk_create`;
+- las filas con `ID` actualizan el producto existente y las demás lo crean,
+  dentro de una transacción por bloque. Las actualizaciones son un upsert
+  (`bulk_create` con `update_conflicts`: INSERT ... ON CONFLICT DO UPDATE);
+  `bulk_update` arma un CASE por campo y fila que en Python cuesta varios
+  milisegundos por producto.
+
+Las columnas son las de la exportación de productos (`ID`, `Nombre`,
+`Descripción`, `Precio`, `Categoría`, `Stock`), de modo que un archivo
+exportado se puede editar y volver a importar. Las filas inválidas no
+detienen la importación: se informan con su número de fila.
+"""
+import csv
+import io
+from itertools import islice
+
+from django.db import connection, transaction
+from openpyxl import load_workbook
+from rest_framework import serializers
+
+from . import cache_catalogo, resumen_ventas
+from .exporters import COLUMNAS_PRODUCTOS
+from .models import Categoria, Producto
+
+LOTE = 2000
+
+# Errores incluidos en el reporte; el resto solo se cuenta.
+MAX_ERRORES = 1000
+
+FORMATOS = ('csv', 'xlsx')
+
+SIN_CATEGORIA = "Sin categoría"
+
+CAMPOS = {
+    'id': serializers.IntegerField(min_value=1, allow_null=True),
+    'nombre': serializers.CharField(max_length=100),
+    'descripcion': serializers.CharField(allow_blank=True, trim_whitespace=False),
+    'precio': serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0),
+    'categoria': serializers.CharField(max_length=50, allow_blank=True),
+    'stock': serializers.IntegerField(min_value=0, max_value=2147483647),
+}
+OBLIGATORIAS = {'nombre', 'precio', 'stock'}
+VALORES_POR_DEFECTO = {'id': None, 'descripcion': '', 'categoria': ''}
+
+
+class ArchivoInvalido(Exception):
+    """
+    El archivo no se puede leer o sus encabezados no corresponden.
+    """
+
+
+def filas_csv(archivo):
+    """
+    Itera las filas (listas de str) de un CSV UTF-8 subido, con o sin BOM.
+    Acepta `,` o `;` como separador.
+    """
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;') if muestra else csv.excel
+    except csv.Error:
+        dialecto = csv.excel
+    except UnicodeDecodeError as exc:
+        raise ArchivoInvalido("El CSV debe estar codificado en UTF-8.") from exc
+    try:
+        yield from csv.reader(texto, dialecto)
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ArchivoInvalido(f"CSV inválido: {exc}") from exc
+    finally:
+        texto.detach()
+
+
+def filas_xlsx(archivo):
+    """
+    Itera las filas (tuplas de valores) de la primera hoja de un XLSX.
+    """
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ArchivoInvalido("El archivo no es un XLSX válido.") from exc
+    try:
+        yield from libro.worksheets[0].iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def filas_archivo(archivo, formato):
+    if formato == 'xlsx':
+        return filas_xlsx(archivo)
+    return filas_csv(archivo)
+
+
+def _normalizar(texto):
+    return str(texto or '').strip().lower()
+
+
+_ENCABEZADOS = {}
+for _clave, _encabezado in COLUMNAS_PRODUCTOS:
+    _ENCABEZADOS[_normalizar(_clave)] = _ENCABEZADOS[_normalizar(_encabezado)] = _clave
+
+
+def _columnas(encabezado):
+    """
+    Posición de cada campo según la fila de encabezados, que puede usar los
+    títulos de la exportación ("Precio") o las claves ("precio").
+    """
+    columnas = {}
+    for posicion, titulo in enumerate(encabezado):
+        clave = _ENCABEZADOS.get(_normalizar(titulo))
+        if clave is not None and clave not in columnas:
+            columnas[clave] = posicion
+    faltantes = OBLIGATORIAS - columnas.keys()
+    if faltantes:
+        nombres = dict(COLUMNAS_PRODUCTOS)
+        raise ArchivoInvalido("Faltan columnas: " + ", ".join(
+            nombres[clave] for clave, _ in COLUMNAS_PRODUCTOS if clave in faltantes))
+    return columnas
+
+
+def _validar(fila, columnas):
+    """
+    Devuelve `(datos, errores)` de una fila; `errores` es un dict campo →
+    mensajes o None si la fila es válida.
+    """
+    datos, errores = {}, {}
+    for clave, posicion in columnas.items():
+        valor = fila[posicion] if posicion < len(fila) else None
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if valor in (None, ''):
+            if clave in VALORES_POR_DEFECTO:
+                datos[clave] = VALORES_POR_DEFECTO[clave]
+                continue
+        try:
+            datos[clave] = CAMPOS[clave].run_validation(
+                valor if valor not in (None, '') else serializers.empty)
+        except serializers.ValidationError as exc:
+            errores[clave] = exc.detail
+    for clave, valor in VALORES_POR_DEFECTO.items():
+        datos.setdefault(clave, valor)
+    if datos.get('categoria') == SIN_CATEGORIA:
+        datos['categoria'] = ''
+    return datos, errores or None
+
+
+def _ids_de_categorias(nombres, conocidas):
+    """
+    Completa `conocidas` (nombre → id) con los `nombres` dados, creando en
+    bloque las categorías que no existan. Devuelve cuántas se crearon.
+    """
+    pendientes = set(nombres) - conocidas.keys()
+    if not pendientes:
+        return 0
+    conocidas.update(Categoria.objects.filter(nombre__in=pendientes).values_list('nombre', 'id'))
+    nuevas = pendientes - conocidas.keys()
+    if nuevas:
+        # ignore_conflicts: otra importación simultánea pudo crearlas.
+        Categoria.objects.bulk_create([Categoria(nombre=nombre) for nombre in sorted(nuevas)],
+                                      ignore_conflicts=True)
+        conocidas.update(Categoria.objects.filter(nombre__in=nuevas).values_list('nombre', 'id'))
+    return len(nuevas)
+
+
+class Resultado:
+    """
+    Totales y errores de una importación.
+    """
+
+    def __init__(self):
+        self.creados = 0
+        self.actualizados = 0
+        self.categorias_creadas = 0
+        self.errores = []
+        self.total_errores = 0
+
+    def error(self, numero, errores):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'fila': numero, 'errores': errores})
+
+    def como_dict(self):
+        return {
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'categorias_creadas': self.categorias_creadas,
+            'total_errores': self.total_errores,
+            'errores': self.errores,
+        }
+
+
+CAMPOS_ACTUALIZABLES = ['nombre', 'descripcion', 'precio', 'stock', 'categoria']
+
+
+def _importar_bloque(bloque, categorias, resultado):
+    """
+    Importa un bloque de `(numero, datos)` válidos. Devuelve True si cambió la
+    categoría de algún producto existente.
+    """
+    resultado.categorias_creadas += _ids_de_categorias(
+        {datos['categoria'] for _, datos in bloque if datos['categoria']}, categorias)
+
+    ids = {datos['id'] for _, datos in bloque if datos['id'] is not None}
+    existentes = dict(Producto.objects.filter(pk__in=ids).values_list('pk', 'categoria_id'))
+    nuevos, modificados, vistos = [], [], set()
+    cambia_categoria = False
+    for numero, datos in bloque:
+        id_ = datos['id']
+        if id_ is not None and (id_ not in existentes or id_ in vistos):
+            motivo = "No existe." if id_ not in existentes else "Repetido en el archivo."
+            resultado.error(numero, {'id': [f"Producto {id_}: {motivo}"]})
+            continue
+        producto = Producto(
+            pk=id_, nombre=datos['nombre'], descripcion=datos['descripcion'],
+            precio=datos['precio'], stock=datos['stock'],
+            categoria_id=categorias.get(datos['categoria']))
+        if id_ is None:
+            nuevos.append(producto)
+        else:
+            vistos.add(id_)
+            cambia_categoria |= existentes[id_] != producto.categoria_id
+            modificados.append(producto)
+
+    with transaction.atomic():
+        Producto.objects.bulk_create(nuevos)
+        if modificados:
+            # MySQL no admite indicar la columna del conflicto (usa la clave primaria).
+            unicos = ['id'] if connection.features.supports_update_conflicts_with_target else None
+            Producto.objects.bulk_create(modificados, update_conflicts=True,
+                                         unique_fields=unicos, update_fields=CAMPOS_ACTUALIZABLES)
+    resultado.creados += len(nuevos)
+    resultado.actualizados += len(modificados)
+    return cambia_categoria
+
+
+def importar_productos(filas, lote=LOTE):
+    """
+    Importa productos desde un iterable de filas cuya primera fila son los
+    encabezados.
+
+    Raises:
+        ArchivoInvalido: si el archivo no se puede leer o faltan columnas. Si
+            ocurre a mitad del archivo, los bloques anteriores quedan importados.
+
+    Returns:
+        Resultado: totales y errores por fila (numeradas desde 1, contando
+        los encabezados, como en una planilla).
+    """
+    filas = iter(filas)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        raise ArchivoInvalido("El archivo está vacío.")
+    columnas = _columnas(encabezado)
+
+    resultado, categorias = Resultado(), {}
+    cambia_categoria = False
+    numeradas = enumerate(filas, start=2)
+    try:
+        while crudas := list(islice(numeradas, lote)):
+            bloque = []
+            for numero, fila in crudas:
+                if all(valor in (None, '') for valor in fila):
+                    continue
+                datos, errores = _validar(fila, columnas)
+                if errores:
+                    resultado.error(numero, errores)
+                else:
+                    bloque.append((numero, datos))
+            if bloque:
+                cambia_categoria |= _importar_bloque(bloque, categorias, resultado)
+    finally:
+        # Las escrituras en bloque no emiten señales.
+        if resultado.creados or resultado.actualizados or resultado.categorias_creadas:
+            cache_catalogo.invalidar()
+        if cambia_categoria:
+            resumen_ventas.reconstruir_categorias()
+    return resultado
@@ -0,0 +1,199 @@
+"""
+Trabajos de exportación en segundo plano.
+
+La tabla `TrabajoExportacion` hace de cola local (sin broker externo): un
+trabajador toma el pendiente más antiguo con un UPDATE condicional sobre
+`estado`, de modo que varios hilos o procesos pueden consumir la misma cola
+sin tomar dos veces el mismo trabajo.
+
+Modos (`EXPORT_JOBS['MODO']`):
+    - hilos: un pool de `CONCURRENCIA` hilos dentro del proceso web procesa
+      los trabajos apenas se confirma su creación.
+    - externo: solo se encolan; los procesa `manage.py procesar_exportaciones`.
+    - sincrono: se procesan en el mismo hilo al confirmar la transacción
+      (útil en desarrollo y pruebas).
+"""
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .exporters import (
+    escribir_archivo, exportacion_cotizaciones, exportacion_productos,
+    exportacion_usuarios,
+)
+from .models import Cotizacion, CustomUser, Producto, TrabajoExportacion
+from .pdf_cache import abrir_pdf
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _configuracion():
+    return settings.EXPORT_JOBS
+
+
+def directorio():
+    """
+    Directorio raíz donde se guardan los archivos generados.
+    """
+    return str(_configuracion()['DIRECTORIO'])
+
+
+def ruta_archivo(trabajo):
+    """
+    Ruta absoluta del archivo generado por `trabajo`.
+    """
+    return os.path.join(directorio(), trabajo.archivo)
+
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=_configuracion()['CONCURRENCIA'],
+                thread_name_prefix='exportacion')
+        return _pool
+
+
+def encolar(trabajo):
+    """
+    Programa el procesamiento de `trabajo` para cuando se confirme la transacción.
+    """
+    transaction.on_commit(despachar)
+
+
+def despachar():
+    """
+    Procesa los trabajos pendientes según el modo configurado.
+    """
+    modo = _configuracion()['MODO']
+    if modo == 'sincrono':
+        procesar_pendientes()
+    elif modo == 'hilos':
+        _obtener_pool().submit(_drenar)
+
+
+def _drenar():
+    try:
+        procesar_pendientes()
+    except Exception:
+        logger.exception("Error procesando trabajos de exportación")
+    finally:
+        close_old_connections()
+
+
+def tomar_siguiente():
+    """
+    Marca como en proceso el trabajo pendiente más antiguo y lo devuelve, o
+    devuelve None si no hay pendientes.
+    """
+    pendientes = TrabajoExportacion.objects.filter(estado=TrabajoExportacion.PENDIENTE)
+    while True:
+        trabajo_id = pendientes.order_by('creado', 'id').values_list('id', flat=True).first()
+        if trabajo_id is None:
+            return None
+        tomado = pendientes.filter(pk=trabajo_id).update(
+            estado=TrabajoExportacion.EN_PROCESO, iniciado=timezone.now())
+        if tomado:
+            return TrabajoExportacion.objects.select_related('user').get(pk=trabajo_id)
+
+
+def procesar_pendientes():
+    """
+    Procesa trabajos hasta vaciar la cola y limpia los resultados vencidos.
+
+    Returns:
+        int: Cantidad de trabajos procesados.
+    """
+    procesados = 0
+    while (trabajo := tomar_siguiente()) is not None:
+        ejecutar(trabajo)
+        procesados += 1
+    limpiar_expirados()
+    return procesados
+
+
+def ejecutar(trabajo):
+    """
+    Genera el archivo de `trabajo` y registra el resultado.
+    """
+    try:
+        trabajo.archivo = _generar(trabajo)
+        trabajo.estado = TrabajoExportacion.COMPLETADO
+    except Exception as exc:
+        logger.exception("Falló el trabajo de exportación %s", trabajo.id)
+        shutil.rmtree(os.path.join(directorio(), str(trabajo.id)), ignore_errors=True)
+        trabajo.estado = TrabajoExportacion.ERROR
+        trabajo.error = str(exc) or exc.__class__.__name__
+    trabajo.terminado = timezone.now()
+    trabajo.expira = trabajo.terminado + timedelta(hours=_configuracion()['RETENCION_HORAS'])
+    trabajo.save(update_fields=['archivo', 'estado', 'error', 'terminado', 'expira'])
+
+
+def _generar(trabajo):
+    carpeta = os.path.join(directorio(), str(trabajo.id))
+    os.makedirs(carpeta, exist_ok=True)
+
+    if trabajo.tipo == TrabajoExportacion.TIPO_PDF:
+        cotizacion = Cotizacion.objects.del_usuario(trabajo.user).select_related(
+            'user').con_version_catalogo().get(pk=trabajo.filtros['cotizacion'])
+        nombre = f"cotizacion_{cotizacion.id}.pdf"
+        with abrir_pdf(cotizacion) as origen, \
+                open(os.path.join(carpeta, nombre), 'wb') as destino:
+            shutil.copyfileobj(origen, destino)
+    else:
+        exportacion = _exportacion(trabajo)
+        nombre = f"{exportacion.nombre}.{trabajo.formato}"
+        with open(os.path.join(carpeta, nombre), 'wb') as destino:
+            escribir_archivo(destino, exportacion, trabajo.formato)
+    return os.path.join(str(trabajo.id), nombre)
+
+
+def _exportacion(trabajo):
+    filtros = trabajo.filtros
+    if trabajo.tipo == TrabajoExportacion.TIPO_COTIZACIONES:
+        cotizaciones = Cotizacion.objects.del_usuario(trabajo.user).entre_fechas(
+            filtros.get('start_date'), filtros.get('end_date'))
+        if filtros.get('total__gte') is not None:
+            cotizaciones = cotizaciones.filter(total__gte=filtros['total__gte'])
+        if filtros.get('total__lte') is not None:
+            cotizaciones = cotizaciones.filter(total__lte=filtros['total__lte'])
+        return exportacion_cotizaciones(cotizaciones)
+    if trabajo.tipo == TrabajoExportacion.TIPO_USUARIOS:
+        return exportacion_usuarios(CustomUser.objects.all())
+    if trabajo.tipo == TrabajoExportacion.TIPO_PRODUCTOS:
+        return exportacion_productos(Producto.objects.all())
+    raise ValueError(f"Tipo de exportación no soportado: {trabajo.tipo}")
+
+
+def limpiar_expirados():
+    """
+    Elimina los trabajos vencidos con sus archivos y marca como error los que
+    llevan en proceso más del tiempo máximo (por ejemplo, si el trabajador murió).
+
+    Returns:
+        int: Cantidad de trabajos eliminados.
+    """
+    ahora = timezone.now()
+    maximo = timedelta(minutes=_configuracion()['TIEMPO_MAXIMO_MINUTOS'])
+    TrabajoExportacion.objects.filter(
+        estado=TrabajoExportacion.EN_PROCESO, iniciado__lt=ahora - maximo,
+    ).update(estado=TrabajoExportacion.ERROR, error="Tiempo máximo excedido.",
+             terminado=ahora, expira=ahora + timedelta(hours=_configuracion()['RETENCION_HORAS']))
+
+    vencidos = TrabajoExportacion.objects.filter(expira__lte=ahora)
+    ids = list(vencidos.values_list('id', flat=True))
+    for trabajo_id in ids:
+        shutil.rmtree(os.path.join(directorio(), str(trabajo_id)), ignore_errors=True)
+    TrabajoExportacion.objects.filter(id__in=ids).delete()
+    return len(ids)
@@ -0,0 +1,145 @@
+"""
+Camino rápido de solo lectura para los listados de la API.
+
+Los serializers anidados (`CotizacionSerializer` → `DetalleFacturaSerializer`
+→ `ProductoSerializer` → `CategoriaSerializer`) instancian modelos y recorren
+la maquinaria de campos de DRF por cada fila. Para los listados se leen las
+columnas con `values()` y se arman los diccionarios directamente, con la misma
+forma y los mismos valores que producirían los serializers (las conversiones
+de decimales y fechas reutilizan los campos de DRF, instanciados una vez).
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .models import DetalleFactura
+
+_PRECIO = serializers.DecimalField(max_digits=10, decimal_places=2)
+_MONTO = serializers.DecimalField(max_digits=14, decimal_places=2)
+_FECHA = serializers.DateTimeField()
+
+
+def _fecha(valor):
+    return None if valor is None else _FECHA.to_representation(valor)
+
+
+# ========================
+# Productos
+# ========================
+CAMPOS_PRODUCTO = (
+    'id', 'nombre', 'descripcion', 'precio', 'stock', 'fecha_creacion',
+    'categoria_id', 'categoria__nombre',
+)
+
+
+def _producto(fila, prefijo=''):
+    """
+    Diccionario con la forma de `ProductoSerializer` a partir de una fila de
+    `values()`; `prefijo` permite leer el producto de un detalle.
+    """
+    categoria_id = fila[f'{prefijo}categoria_id']
+    return {
+        'id': fila[f'{prefijo}id'],
+        'nombre': fila[f'{prefijo}nombre'],
+        'descripcion': fila[f'{prefijo}descripcion'],
+        'precio': _PRECIO.to_representation(fila[f'{prefijo}precio']),
+        'stock': fila[f'{prefijo}stock'],
+        'fecha_creacion': _fecha(fila[f'{prefijo}fecha_creacion']),
+        'categoria': None if categoria_id is None else {
+            'id': categoria_id,
+            'nombre': fila[f'{prefijo}categoria__nombre'],
+        },
+    }
+
+
+def listado_productos(filas):
+    return [_producto(fila) for fila in filas]
+
+
+# ========================
+# Usuarios
+# ========================
+CAMPOS_USUARIO = ('id', 'first_name', 'last_name', 'rut', 'telefono', 'email', 'username')
+
+
+def listado_usuarios(filas):
+    return [{campo: fila[campo] for campo in CAMPOS_USUARIO} for fila in filas]
+
+
+# ========================
+# Cotizaciones
+# ========================
+CAMPOS_COTIZACION = ('id', 'user_id', 'fecha', 'subtotal', 'iva', 'total')
+
+CAMPOS_DETALLE = (
+    'id', 'cotizacion_id', 'cantidad', 'precio_unitario',
+    *(f'producto__{campo}' for campo in CAMPOS_PRODUCTO),
+)
+
+
+def _detalle(fila):
+    return {
+        'id': fila['id'],
+        'producto': None if fila['producto__id'] is None else _producto(fila, 'producto__'),
+        'cantidad': fila['cantidad'],
+        'precio_unitario': _PRECIO.to_representation(fila['precio_unitario']),
+        'precio_total': fila['cantidad'] * fila['precio_unitario'],
+    }
+
+
+def listado_cotizaciones(filas):
+    """
+    Arma las cotizaciones con sus detalles, leyendo todos los detalles de la
+    página en una sola consulta.
+    """
+    filas = list(filas)
+    detalles = defaultdict(list)
+    for fila in DetalleFactura.objects.filter(
+        cotizacion_id__in=[fila['id'] for fila in filas]
+    ).order_by('id').values(*CAMPOS_DETALLE):
+        detalles[fila['cotizacion_id']].append(_detalle(fila))
+    return [{
+        'id': fila['id'],
+        'user': fila['user_id'],
+        'fecha': _fecha(fila['fecha']),
+        'detalles': detalles[fila['id']],
+        'subtotal': _MONTO.to_representation(fila['subtotal']),
+        'iva': _MONTO.to_representation(fila['iva']),
+        'total': _MONTO.to_representation(fila['total']),
+    } for fila in filas]
+
+
+class ListadoRapidoMixin:
+    """
+    Mixin para ViewSets: `list` lee `campos_listado` con `values()` y arma la
+    respuesta con `construir_listado` en vez del serializer. Filtros, orden y
+    paginación se aplican igual que en el listado normal.
+
+    Cada ViewSet define ambos atributos (`construir_listado` como
+    `staticmethod` de una de las funciones `listado_*`); si falta alguno, la
+    clase no se puede definir.
+    """
+    listado_rapido = True
+    campos_listado = ()
+    construir_listado = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.listado_rapido and (not cls.campos_listado or cls.construir_listado is None):
+            raise ImproperlyConfigured(
+                f"{cls.__name__} debe definir `campos_listado` y `construir_listado` "
+                f"(o `listado_rapido = False`).")
+
+    def list(self, request, *args, **kwargs):
+        if not self.listado_rapido:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Las anotaciones (p. ej. la relevancia de la búsqueda) se incluyen
+        # porque la paginación puede ordenar por ellas.
+        filas = queryset.values(*self.campos_listado, *queryset.query.annotations)
+        pagina = self.paginate_queryset(filas)
+        if pagina is None:
+            return Response(self.construir_listado(filas))
+        return self.get_paginated_response(self.construir_listado(pagina))
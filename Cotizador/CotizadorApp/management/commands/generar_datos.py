@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from CotizadorApp import datos_sinteticos
+
+# Escalas predefinidas: (usuarios, categorías, productos, cotizaciones, detalles).
+ESCALAS = {
+    'pequena': (50, 10, 500, 1000, 5),
+    'mediana': (500, 30, 5000, 20000, 10),
+    'grande': (5000, 100, 50000, 200000, 10),
+}
+
+
+class Command(BaseCommand):
+    """
+    Genera en bloque un conjunto de datos sintéticos para benchmarks.
+    """
+    help = ("Crea usuarios, categorías, productos y cotizaciones con detalles sintéticos "
+            "(contraseña de los usuarios: '%s')." % datos_sinteticos.CONTRASENA)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escala', choices=ESCALAS,
+            help="Tamaño predefinido; las opciones explícitas lo ajustan.")
+        parser.add_argument('--usuarios', type=int)
+        parser.add_argument('--categorias', type=int)
+        parser.add_argument('--productos', type=int)
+        parser.add_argument('--cotizaciones', type=int)
+        parser.add_argument('--detalles', type=int, help="Detalles por cotización.")
+        parser.add_argument('--dias', type=int, default=365,
+                            help="Las fechas de las cotizaciones se reparten en estos últimos días.")
+        parser.add_argument('--semilla', type=int, default=0,
+                            help="Semilla del generador (misma semilla, mismos datos).")
+
+    def handle(self, *args, escala=None, dias=365, semilla=0, **options):
+        valores = dict(zip(('usuarios', 'categorias', 'productos', 'cotizaciones', 'detalles'),
+                           ESCALAS[escala or 'pequena']))
+        for nombre in valores:
+            if options.get(nombre) is not None:
+                if options[nombre] < 0:
+                    raise CommandError(f"--{nombre} no puede ser negativo.")
+                valores[nombre] = options[nombre]
+
+        inicio = time.perf_counter()
+        try:
+            creados = datos_sinteticos.generar(dias=dias, semilla=semilla, **valores)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        resumen = ", ".join(f"{cantidad} {nombre}" for nombre, cantidad in creados.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Datos generados en {time.perf_counter() - inicio:.1f} s: {resumen}."))
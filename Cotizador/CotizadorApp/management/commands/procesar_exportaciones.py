@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from CotizadorApp import jobs
+
+
+class Command(BaseCommand):
+    """
+    Trabajador de la cola de exportaciones (para EXPORT_JOBS['MODO'] = 'externo').
+    """
+    help = "Procesa los trabajos de exportación pendientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrencia', type=int, default=settings.EXPORT_JOBS['CONCURRENCIA'],
+            help="Cantidad de hilos trabajadores.")
+        parser.add_argument(
+            '--intervalo', type=float, default=2.0,
+            help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help="Vacía la cola y termina en vez de seguir esperando trabajos.")
+
+    def handle(self, *args, concurrencia, intervalo, una_vez, **options):
+        detener = threading.Event()
+        procesados = []
+
+        def trabajador():
+            while not detener.is_set():
+                cantidad = jobs.procesar_pendientes()
+                procesados.append(cantidad)
+                if una_vez:
+                    return
+                if not cantidad:
+                    detener.wait(intervalo)
+
+        def trabajador_en_hilo():
+            try:
+                trabajador()
+            finally:
+                close_old_connections()
+
+        if concurrencia <= 1:
+            try:
+                trabajador()
+            except KeyboardInterrupt:
+                pass
+        else:
+            with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+                futuros = [pool.submit(trabajador_en_hilo) for _ in range(concurrencia)]
+                try:
+                    for futuro in futuros:
+                        futuro.result()
+                except KeyboardInterrupt:
+                    # Los hilos terminan el trabajo en curso y salen.
+                    detener.set()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(procesados)} trabajos de exportación procesados."))
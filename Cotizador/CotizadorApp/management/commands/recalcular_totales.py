@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from CotizadorApp.models import Cotizacion, calcular_totales
+
+
+class Command(BaseCommand):
+    """
+    Recalcula (o solo verifica) los totales persistidos de las cotizaciones.
+    """
+    help = "Recalcula subtotal, IVA y total persistidos de todas las cotizaciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Solo informa las cotizaciones desalineadas, sin modificarlas.")
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help="Cantidad de cotizaciones por lote de actualización.")
+
+    def handle(self, *args, verificar=False, lote=1000, **options):
+        queryset = Cotizacion.objects.con_subtotal_calculado().only(
+            'id', 'subtotal', 'iva', 'total').order_by('id')
+
+        desalineadas = []
+        pendientes = []
+        for cotizacion in queryset.iterator(chunk_size=lote):
+            esperado = calcular_totales(cotizacion.subtotal_calculado)
+            if (cotizacion.subtotal, cotizacion.iva, cotizacion.total) == esperado:
+                continue
+            desalineadas.append(cotizacion.id)
+            if not verificar:
+                cotizacion.subtotal, cotizacion.iva, cotizacion.total = esperado
+                pendientes.append(cotizacion)
+                if len(pendientes) >= lote:
+                    self._guardar(pendientes)
+                    pendientes = []
+        self._guardar(pendientes)
+
+        if verificar:
+            if desalineadas:
+                raise CommandError(
+                    f"{len(desalineadas)} cotizaciones con totales desalineados: "
+                    f"{', '.join(map(str, desalineadas[:20]))}")
+            self.stdout.write(self.style.SUCCESS("Todos los totales están sincronizados."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(desalineadas)} cotizaciones actualizadas."))
+
+    def _guardar(self, cotizaciones):
+        # Como `Cotizacion.recalcular_totales`: incrementa `version` y
+        # actualiza `actualizado`, para que los PDF en caché y los ETag
+        # emitidos con los totales anteriores dejen de valer.
+        if cotizaciones:
+            with transaction.atomic():
+                Cotizacion.objects.bulk_update(cotizaciones, ['subtotal', 'iva', 'total'])
+                Cotizacion.objects.filter(pk__in=[c.pk for c in cotizaciones]).update(
+                    version=F('version') + 1, actualizado=timezone.now())
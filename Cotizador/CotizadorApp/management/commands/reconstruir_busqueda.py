@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from CotizadorApp import cache_catalogo
+from CotizadorApp.busqueda import backend_para
+from CotizadorApp.models import Producto
+
+
+class Command(BaseCommand):
+    """
+    Regenera el índice de búsqueda de texto completo de productos.
+    """
+    help = "Reconstruye el índice de búsqueda de productos a partir de la tabla de productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help="Alias de la base de datos cuyo índice se reconstruye.")
+
+    def handle(self, *args, database=DEFAULT_DB_ALIAS, **options):
+        connection = connections[database]
+        backend = backend_para(connection)
+        if backend is None:
+            raise CommandError(
+                f"El motor '{connection.vendor}' no tiene índice de búsqueda de texto completo.")
+        backend.reconstruir(connection)
+        # Las búsquedas cacheadas pueden haber salido del índice anterior.
+        cache_catalogo.invalidar()
+        total = Producto.objects.using(database).count()
+        self.stdout.write(self.style.SUCCESS(f"Índice de búsqueda reconstruido ({total} productos)."))
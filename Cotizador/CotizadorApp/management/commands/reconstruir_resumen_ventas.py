@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from CotizadorApp import resumen_ventas
+
+
+class Command(BaseCommand):
+    """
+    Regenera los resúmenes de ventas diarios desde los detalles.
+    """
+    help = ("Reconstruye las ventas diarias por producto y por categoría a partir de los "
+            "detalles de las cotizaciones.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-categorias', action='store_true',
+            help="Solo rederiva las ventas por categoría desde las ventas por producto "
+                 "(tras cambiar categorías en bloque).")
+
+    def handle(self, *args, solo_categorias=False, **options):
+        if solo_categorias:
+            categorias = resumen_ventas.reconstruir_categorias()
+            self.stdout.write(self.style.SUCCESS(
+                f"Ventas por categoría reconstruidas ({categorias} filas)."))
+            return
+        productos, categorias = resumen_ventas.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen de ventas reconstruido ({productos} filas por producto, "
+            f"{categorias} por categoría)."))
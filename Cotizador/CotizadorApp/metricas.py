@@ -0,0 +1,282 @@
+"""
+Métricas de rendimiento por petición.
+
+`MetricasMiddleware` mide cada petición: tiempo total, cantidad y tiempo de
+las consultas SQL y los tramos marcados con `medir(nombre)` en los caminos
+costosos (serialización de cotizaciones, XLSX, PDF). La medición en curso
+viaja en una `ContextVar`, así que también se suma lo que ocurre en los hilos
+a los que ASGI o `descargas_asincronas` derivan el trabajo: cada conexión a
+la base de datos lleva un `execute_wrapper` que la consulta. Con eso:
+
+- agrega a la respuesta la cabecera `Server-Timing`, visible en las
+  herramientas de desarrollo del navegador;
+- acumula en memoria del proceso un histograma de latencia por vista y
+  método, contadores de peticiones por estado, de consultas SQL y de tiempo
+  por tramo, que `vista_metricas` expone en formato de texto de Prometheus.
+
+El registro usa un solo lock y estructuras de tamaño fijo por vista, así que
+el costo por petición es de unos microsegundos. En las respuestas en
+streaming solo se mide hasta que la vista devuelve la respuesta.
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+# Límites superiores (segundos) de los buckets del histograma de latencia.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_actual = contextvars.ContextVar('medicion', default=None)
+
+
+class Medicion:
+    """
+    Tiempos de una petición en curso.
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.tramos = {}
+
+    def sumar(self, nombre, segundos):
+        self.tramos[nombre] = self.tramos.get(nombre, 0.0) + segundos
+
+
+def _contar_sql(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+@receiver(connection_created)
+def contar_sql_en_conexion(sender, connection, **kwargs):
+    if _contar_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contar_sql)
+
+
+@contextmanager
+def medir(nombre):
+    """
+    Suma la duración del bloque al tramo `nombre` de la petición en curso.
+    Fuera de una petición (comandos, hilos de exportación, procesos del pool
+    de PDF) no hace nada.
+    """
+    medicion = _actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar(nombre, time.perf_counter() - inicio)
+
+
+def medido(nombre):
+    """
+    Decorador equivalente a envolver la función en `medir(nombre)`.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+class _Histograma:
+    __slots__ = ('buckets', 'suma', 'cantidad')
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.buckets[i] += 1
+                break
+        self.suma += valor
+        self.cantidad += 1
+
+
+class Registro:
+    """
+    Métricas acumuladas del proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.latencias = {}
+            self.peticiones = {}
+            self.consultas = {}
+            self.sql = {}
+            self.tramos = {}
+
+    def registrar(self, vista, metodo, estado, segundos, medicion):
+        with self._lock:
+            histograma = self.latencias.get((vista, metodo))
+            if histograma is None:
+                histograma = self.latencias[(vista, metodo)] = _Histograma()
+            histograma.observar(segundos)
+            clave = (vista, metodo, estado)
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+            self.consultas[vista] = self.consultas.get(vista, 0) + medicion.consultas
+            self.sql[vista] = self.sql.get(vista, 0.0) + medicion.sql
+            for tramo, duracion in medicion.tramos.items():
+                self.tramos[(vista, tramo)] = self.tramos.get((vista, tramo), 0.0) + duracion
+
+    def texto(self):
+        """
+        Las métricas en formato de texto de Prometheus.
+        """
+        with self._lock:
+            latencias = {clave: (list(h.buckets), h.suma, h.cantidad)
+                         for clave, h in self.latencias.items()}
+            peticiones = dict(self.peticiones)
+            consultas = dict(self.consultas)
+            sql = dict(self.sql)
+            tramos = dict(self.tramos)
+
+        lineas = [
+            "# HELP cotizador_peticion_segundos Duración de las peticiones por vista.",
+            "# TYPE cotizador_peticion_segundos histogram",
+        ]
+        for (vista, metodo), (buckets, suma, cantidad) in sorted(latencias.items()):
+            etiquetas = f'vista="{vista}",metodo="{metodo}"'
+            acumulado = 0
+            for limite, valor in zip(BUCKETS, buckets):
+                acumulado += valor
+                lineas.append(f'cotizador_peticion_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'cotizador_peticion_segundos_bucket{{{etiquetas},le="+Inf"}} {cantidad}')
+            lineas.append(f'cotizador_peticion_segundos_sum{{{etiquetas}}} {suma:.6f}')
+            lineas.append(f'cotizador_peticion_segundos_count{{{etiquetas}}} {cantidad}')
+
+        lineas += [
+            "# HELP cotizador_peticiones_total Peticiones atendidas por vista y estado.",
+            "# TYPE cotizador_peticiones_total counter",
+        ]
+        lineas += [f'cotizador_peticiones_total{{vista="{vista}",metodo="{metodo}",estado="{estado}"}} {total}'
+                   for (vista, metodo, estado), total in sorted(peticiones.items())]
+
+        lineas += [
+            "# HELP cotizador_consultas_sql_total Consultas SQL ejecutadas por vista.",
+            "# TYPE cotizador_consultas_sql_total counter",
+        ]
+        lineas += [f'cotizador_consultas_sql_total{{vista="{vista}"}} {total}'
+                   for vista, total in sorted(consultas.items())]
+
+        lineas += [
+            "# HELP cotizador_sql_segundos_total Tiempo en consultas SQL por vista.",
+            "# TYPE cotizador_sql_segundos_total counter",
+        ]
+        lineas += [f'cotizador_sql_segundos_total{{vista="{vista}"}} {total:.6f}'
+                   for vista, total in sorted(sql.items())]
+
+        lineas += [
+            "# HELP cotizador_tramo_segundos_total Tiempo por tramo medido (serialización, xlsx, pdf).",
+            "# TYPE cotizador_tramo_segundos_total counter",
+        ]
+        lineas += [f'cotizador_tramo_segundos_total{{vista="{vista}",tramo="{tramo}"}} {total:.6f}'
+                   for (vista, tramo), total in sorted(tramos.items())]
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+
+def _vista(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return "sin_ruta"
+    return resolver_match.view_name or resolver_match.route
+
+
+def server_timing(total, medicion):
+    """
+    Valor de la cabecera `Server-Timing` (duraciones en milisegundos).
+    """
+    partes = [f"total;dur={total * 1000:.1f}",
+              f'sql;dur={medicion.sql * 1000:.1f};desc="{medicion.consultas} consultas"']
+    partes += [f"{tramo};dur={duracion * 1000:.1f}"
+               for tramo, duracion in medicion.tramos.items()]
+    return ", ".join(partes)
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición y agrega la cabecera `Server-Timing`. Funciona en
+    modo síncrono (WSGI) y asíncrono (ASGI) sin cambiar de hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._terminar(request, response, time.perf_counter() - inicio, medicion)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._terminar(request, response, time.perf_counter() - inicio, medicion)
+
+    def _terminar(self, request, response, total, medicion):
+        registro.registrar(_vista(request), request.method, response.status_code, total, medicion)
+        if settings.METRICAS['SERVER_TIMING']:
+            response['Server-Timing'] = server_timing(total, medicion)
+        return response
+
+
+def vista_metricas(request):
+    """
+    Métricas del proceso para Prometheus, con la cabecera
+    `Authorization: Bearer <METRICAS['TOKEN']>`. Sin token configurado el
+    endpoint no existe (404): las métricas exponen rutas y volúmenes de uso.
+    """
+    token = settings.METRICAS['TOKEN']
+    if not token:
+        raise Http404
+    if not constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    return HttpResponse(registro.texto(), content_type=CONTENT_TYPE)
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.21 on 2026-10-18 06:02
+
+from django.conf import settings
+import django.contrib.auth.models
+import django.contrib.auth.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Categoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Nombre de la categoría (único).', max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Cotizacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, help_text='Fecha y hora de creación de la cotización.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CustomUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('rut', models.CharField(help_text='RUT del usuario (único).', max_length=12, unique=True)),
+                ('telefono', models.CharField(help_text='Número de teléfono del usuario.', max_length=15)),
+                ('email', models.EmailField(help_text='Correo electrónico único del usuario.', max_length=254, unique=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Producto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Nombre del producto.', max_length=100)),
+                ('descripcion', models.TextField(blank=True, help_text='Descripción detallada del producto (opcional).')),
+                ('precio', models.DecimalField(decimal_places=2, help_text='Precio unitario del producto.', max_digits=10)),
+                ('stock', models.PositiveIntegerField(help_text='Cantidad disponible en inventario.')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, help_text='Fecha de creación del producto.')),
+                ('categoria', models.ForeignKey(help_text='Categoría a la que pertenece el producto.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='productos', to='CotizadorApp.categoria')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DetalleFactura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField(help_text='Cantidad del producto vendido.')),
+                ('precio_unitario', models.DecimalField(decimal_places=2, help_text='Precio unitario aplicado.', max_digits=10)),
+                ('cotizacion', models.ForeignKey(help_text='Cotización a la que pertenece este detalle.', on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='CotizadorApp.cotizacion')),
+                ('producto', models.ForeignKey(help_text='Producto vendido en este detalle.', null=True, on_delete=django.db.models.deletion.SET_NULL, to='CotizadorApp.producto')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cotizacion',
+            name='user',
+            field=models.ForeignKey(help_text='Usuario que realizó la cotización.', on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
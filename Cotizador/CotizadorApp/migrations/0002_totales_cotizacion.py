@@ -0,0 +1,59 @@
+# Generated by Django 4.2.21 on 2026-10-18 06:04
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+LOTE = 1000
+
+
+def completar_totales(apps, schema_editor):
+    """
+    Calcula subtotal, IVA y total de las cotizaciones existentes a partir de
+    sus detalles (sin esto quedarían en 0).
+    """
+    from CotizadorApp.models import calcular_totales
+
+    Cotizacion = apps.get_model('CotizadorApp', 'Cotizacion')
+    DetalleFactura = apps.get_model('CotizadorApp', 'DetalleFactura')
+    suma = DetalleFactura.objects.filter(cotizacion=OuterRef('pk')).values('cotizacion').annotate(
+        suma=Sum(F('cantidad') * F('precio_unitario'))).values('suma')
+    cotizaciones = Cotizacion.objects.annotate(subtotal_calculado=Coalesce(
+        Subquery(suma, output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+        Decimal('0'))).only('id').order_by('id')
+    pendientes = []
+    for cotizacion in cotizaciones.iterator(chunk_size=LOTE):
+        cotizacion.subtotal, cotizacion.iva, cotizacion.total = calcular_totales(
+            cotizacion.subtotal_calculado)
+        pendientes.append(cotizacion)
+        if len(pendientes) == LOTE:
+            Cotizacion.objects.bulk_update(pendientes, ['subtotal', 'iva', 'total'])
+            pendientes = []
+    Cotizacion.objects.bulk_update(pendientes, ['subtotal', 'iva', 'total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CotizadorApp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cotizacion',
+            name='iva',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, help_text='IVA (19%) del subtotal.', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='cotizacion',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, help_text='Suma de los totales de cada detalle.', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='cotizacion',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, help_text='Total con IVA incluido.', max_digits=14),
+        ),
+        migrations.RunPython(completar_totales, migrations.RunPython.noop),
+    ]
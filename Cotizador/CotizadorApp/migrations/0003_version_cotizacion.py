@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CotizadorApp', '0002_totales_cotizacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cotizacion',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Se incrementa cada vez que cambia el contenido de la cotización.'),
+        ),
+    ]
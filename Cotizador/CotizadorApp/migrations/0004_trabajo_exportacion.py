@@ -0,0 +1,35 @@
+# Generated by Django 4.2.21 on 2026-10-18 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CotizadorApp', '0003_version_cotizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoExportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cotizaciones', 'Cotizaciones'), ('usuarios', 'Usuarios'), ('productos', 'Productos'), ('pdf', 'PDF de una cotización')], help_text='Datos a exportar.', max_length=20)),
+                ('formato', models.CharField(choices=[('xlsx', 'Excel'), ('csv', 'CSV'), ('ndjson', 'NDJSON'), ('pdf', 'PDF')], help_text='Formato del archivo generado.', max_length=10)),
+                ('filtros', models.JSONField(blank=True, default=dict, help_text='Filtros aplicados a la exportación.')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('error', 'Error')], db_index=True, default='pendiente', help_text='Estado del trabajo.', max_length=20)),
+                ('archivo', models.CharField(blank=True, help_text='Ruta del archivo generado, relativa al directorio de exportaciones.', max_length=255)),
+                ('error', models.TextField(blank=True, help_text='Detalle del error, si lo hubo.')),
+                ('creado', models.DateTimeField(auto_now_add=True, help_text='Fecha de solicitud.')),
+                ('iniciado', models.DateTimeField(blank=True, help_text='Fecha en que un trabajador lo tomó.', null=True)),
+                ('terminado', models.DateTimeField(blank=True, help_text='Fecha de término.', null=True)),
+                ('expira', models.DateTimeField(blank=True, help_text='Fecha a partir de la cual se elimina el resultado.', null=True)),
+                ('user', models.ForeignKey(help_text='Usuario que solicitó la exportación.', on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_exportacion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
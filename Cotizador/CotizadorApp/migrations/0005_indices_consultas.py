@@ -0,0 +1,21 @@
+# Generated by Django 4.2.21 on 2026-10-18 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CotizadorApp', '0004_trabajo_exportacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cotizacion',
+            index=models.Index(fields=['user', 'fecha'], name='cotizacion_user_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', 'nombre'], name='producto_categoria_nombre_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    from CotizadorApp.busqueda import backend_para
+
+    backend = backend_para(schema_editor.connection)
+    if backend is not None:
+        backend.crear(schema_editor)
+
+
+def eliminar_indice(apps, schema_editor):
+    from CotizadorApp.busqueda import backend_para
+
+    backend = backend_para(schema_editor.connection)
+    if backend is not None:
+        backend.eliminar(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CotizadorApp', '0005_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
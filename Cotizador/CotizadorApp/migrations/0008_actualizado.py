@@ -0,0 +1,27 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CotizadorApp', '0007_version_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cotizacion',
+            name='actualizado',
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now,
+                help_text='Último cambio de la cotización, sus detalles o los datos del cliente.'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='versioncatalogo',
+            name='actualizado',
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                help_text='Momento del último cambio del catálogo.'),
+        ),
+    ]
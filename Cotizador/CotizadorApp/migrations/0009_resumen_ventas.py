@@ -0,0 +1,47 @@
+# Generated by Django 4.2.21 on 2026-10-18 06:39
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CotizadorApp', '0008_actualizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiariaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(help_text='Día de la cotización (zona horaria del proyecto).')),
+                ('cantidad', models.BigIntegerField(default=0, help_text='Unidades vendidas.')),
+                ('monto', models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Suma de cantidad por precio unitario.', max_digits=16)),
+                ('lineas', models.BigIntegerField(default=0, help_text='Cantidad de detalles.')),
+                ('producto', models.ForeignKey(help_text='Producto vendido; nulo para productos eliminados.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='CotizadorApp.producto')),
+                ('clave', models.PositiveBigIntegerField(editable=False, help_text='Id del producto, o 0 para los productos eliminados.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(help_text='Día de la cotización (zona horaria del proyecto).')),
+                ('cantidad', models.BigIntegerField(default=0, help_text='Unidades vendidas.')),
+                ('monto', models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Suma de cantidad por precio unitario.', max_digits=16)),
+                ('lineas', models.BigIntegerField(default=0, help_text='Cantidad de detalles.')),
+                ('categoria', models.ForeignKey(help_text='Categoría de los productos vendidos; nula si no tienen.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='CotizadorApp.categoria')),
+                ('clave', models.PositiveBigIntegerField(editable=False, help_text='Id de la categoría, o 0 para los productos sin categoría.')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ventadiariaproducto',
+            constraint=models.UniqueConstraint(fields=('dia', 'clave'), name='venta_producto_dia_clave_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='ventadiariacategoria',
+            constraint=models.UniqueConstraint(fields=('dia', 'clave'), name='venta_categoria_dia_clave_unica'),
+        ),
+    ]
@@ -1,7 +1,25 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model
-from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from decimal import Decimal, ROUND_HALF_UP
+
+IVA = Decimal("0.19")
+CENTAVOS = Decimal("0.01")
+
+
+def calcular_totales(subtotal):
+    """
+    Devuelve la tupla (subtotal, iva, total) redondeada a centavos.
+    """
+    subtotal = Decimal(subtotal or 0).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+    iva = (subtotal * IVA).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+    return subtotal, iva, subtotal + iva
 
 # ========================
 # Modelo de Usuario Customizado
@@ -69,13 +87,155 @@ class Producto(models.Model):
     fecha_creacion = models.DateTimeField(
         auto_now_add=True, help_text="Fecha de creación del producto.")
 
+    class Meta:
+        indexes = [
+            # Listados y búsquedas por categoría ordenados por nombre.
+            models.Index(fields=['categoria', 'nombre'], name='producto_categoria_nombre_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nombre} ({self.categoria})"
 
 
+class VersionCatalogo(models.Model):
+    """
+    Contador global que cambia con cada escritura en productos o categorías.
+
+    Forma parte de la clave de la caché de respuestas del catálogo (ver
+    `cache_catalogo.py`): al incrementarlo, todas las entradas anteriores
+    dejan de usarse. Vive en la base de datos para que lo compartan todos
+    los procesos. Tiene una sola fila.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    actualizado = models.DateTimeField(
+        default=timezone.now, help_text="Momento del último cambio del catálogo.")
+
+    @classmethod
+    def actual(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def estado(cls):
+        """
+        Devuelve `(version, actualizado)`; `actualizado` es None si el
+        catálogo nunca cambió.
+        """
+        return cls.objects.filter(pk=1).values_list('version', 'actualizado').first() or (0, None)
+
+    @classmethod
+    def incrementar(cls):
+        ahora = timezone.now()
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1,
+                                               actualizado=ahora):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1, 'actualizado': ahora})
+
+
 # ========================
 # Cotización / Factura
 # ========================
+class CotizacionQuerySet(models.QuerySet):
+    """
+    Consultas reutilizables para cotizaciones.
+    """
+
+    def del_usuario(self, user):
+        """
+        Filtra las cotizaciones pertenecientes a `user`.
+        """
+        return self.filter(user=user)
+
+    def entre_fechas(self, start=None, end=None):
+        """
+        Filtra por fecha de creación entre `start` y `end` (ambas inclusive,
+        `date` o texto YYYY-MM-DD en la zona horaria actual); los límites
+        vacíos se ignoran.
+
+        Se filtra con el rango semiabierto [inicio de `start`, inicio del día
+        siguiente a `end`) sobre la columna tal cual, sin `fecha__date`, para
+        que la base de datos pueda usar el índice (user, fecha).
+
+        Raises:
+            ValidationError: Si alguna fecha no tiene un formato válido.
+        """
+        queryset = self
+        if start:
+            queryset = queryset.filter(fecha__gte=_inicio_del_dia(start))
+        if end:
+            queryset = queryset.filter(
+                fecha__lt=_inicio_del_dia(_como_fecha(end) + datetime.timedelta(days=1)))
+        return queryset
+
+    def con_subtotal_calculado(self):
+        """
+        Anota `subtotal_calculado` con la suma de cantidad * precio unitario
+        de los detalles, calculada en la base de datos.
+        """
+        suma = DetalleFactura.objects.filter(
+            cotizacion=models.OuterRef('pk')
+        ).values('cotizacion').annotate(
+            suma=models.Sum(models.F('cantidad') * models.F('precio_unitario'))
+        ).values('suma')
+        return self.annotate(subtotal_calculado=Coalesce(
+            models.Subquery(suma, output_field=models.DecimalField(
+                max_digits=14, decimal_places=2)),
+            Decimal('0')))
+
+    def con_detalles(self):
+        """
+        Carga el usuario y los detalles con su producto y categoría en un
+        número constante de consultas (evita el problema N+1 al serializar
+        o exportar).
+        """
+        return self.select_related('user').prefetch_related(prefetch_detalles())
+
+    def con_version_catalogo(self):
+        """
+        Anota `version_catalogo` y `catalogo_actualizado` con el estado del
+        catálogo (ver `VersionCatalogo.estado`) en la misma consulta. La caché
+        de PDF lo usa en su clave porque el PDF imprime los nombres de los
+        productos.
+        """
+        catalogo = VersionCatalogo.objects.filter(pk=1)
+        return self.annotate(
+            version_catalogo=Coalesce(
+                models.Subquery(catalogo.values('version')), 0,
+                output_field=models.PositiveBigIntegerField()),
+            catalogo_actualizado=models.Subquery(catalogo.values('actualizado')))
+
+
+def _como_fecha(valor):
+    if isinstance(valor, datetime.date):
+        return valor
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValidationError(f"Fecha inválida: {valor!r}. Use el formato YYYY-MM-DD.")
+    return fecha
+
+
+def _inicio_del_dia(valor):
+    """
+    Medianoche de la fecha dada en la zona horaria actual, como datetime aware.
+    """
+    return timezone.make_aware(
+        datetime.datetime.combine(_como_fecha(valor), datetime.time.min))
+
+
+def prefetch_detalles():
+    """
+    Prefetch de los detalles de una cotización con su producto y categoría.
+
+    Sirve también para `prefetch_related_objects` sobre cotizaciones ya cargadas.
+    """
+    return models.Prefetch(
+        'detalles',
+        queryset=DetalleFactura.objects.select_related(
+            'producto__categoria').order_by('id'),
+    )
+
+
 class Cotizacion(models.Model):
     """
     Encabezado de la factura o cotización.
@@ -88,29 +248,52 @@ class Cotizacion(models.Model):
     fecha = models.DateTimeField(
         auto_now_add=True, help_text="Fecha y hora de creación de la cotización.")
 
-    def __str__(self):
-        return f"Factura #{self.id} - {self.user.get_full_name()}"
+    subtotal = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0"), editable=False,
+        help_text="Suma de los totales de cada detalle.")
+    iva = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0"), editable=False,
+        help_text="IVA (19%) del subtotal.")
+    total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0"), editable=False,
+        help_text="Total con IVA incluido.")
+    version = models.PositiveIntegerField(
+        default=1, editable=False,
+        help_text="Se incrementa cada vez que cambia el contenido de la cotización.")
+    actualizado = models.DateTimeField(
+        auto_now=True,
+        help_text="Último cambio de la cotización, sus detalles o los datos del cliente.")
 
-    @property
-    def subtotal(self):
-        """
-        Retorna el subtotal sumando los totales de cada producto.
-        """
-        return sum(detalle.precio_total for detalle in self.detalles.all())
+    objects = CotizacionQuerySet.as_manager()
 
-    @property
-    def iva(self):
-        """
-        Calcula el IVA (19%) del subtotal.
-        """
-        return self.subtotal * Decimal("0.19")
+    class Meta:
+        indexes = [
+            # Listado por usuario ordenado y filtrado por fecha.
+            models.Index(fields=['user', 'fecha'], name='cotizacion_user_fecha_idx'),
+        ]
 
-    @property
-    def total(self):
+    def __str__(self):
+        return f"Factura #{self.id} - {self.user.get_full_name()}"
+
+    def recalcular_totales(self):
         """
-        Calcula el total con IVA incluido.
+        Recalcula subtotal, IVA y total a partir de los detalles y los
+        persiste con un único UPDATE, incrementando `version` y
+        actualizando `actualizado`.
         """
-        return self.subtotal + self.iva
+        subtotal = self.detalles.aggregate(
+            suma=models.Sum(
+                models.F('cantidad') * models.F('precio_unitario'),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2))
+        )['suma']
+        self.subtotal, self.iva, self.total = calcular_totales(subtotal)
+        self.actualizado = timezone.now()
+        Cotizacion.objects.filter(pk=self.pk).update(
+            subtotal=self.subtotal, iva=self.iva, total=self.total,
+            version=models.F('version') + 1, actualizado=self.actualizado)
+        # La versión se incrementó en la base de datos: se marca como diferida
+        # para que se vuelva a leer si se necesita.
+        self.__dict__.pop('version', None)
 
 
 # ========================
@@ -148,3 +331,132 @@ class DetalleFactura(models.Model):
         Devuelve el total de este ítem (cantidad * precio unitario).
         """
         return self.cantidad * self.precio_unitario
+
+
+# ========================
+# Resúmenes de ventas
+# ========================
+class VentaDiariaProducto(models.Model):
+    """
+    Ventas de un producto en un día: cantidad, monto neto (sin IVA) y número
+    de detalles. `producto` nulo agrupa los detalles de productos eliminados.
+
+    La fila de un día se identifica por `clave` y no por `producto`: los NULL
+    no se repiten para una restricción única y MySQL no admite restricciones
+    únicas condicionales.
+
+    Se mantiene de forma incremental al cambiar los detalles (ver
+    `resumen_ventas.py`) y se regenera con `reconstruir_resumen_ventas`.
+    """
+    dia = models.DateField(help_text="Día de la cotización (zona horaria del proyecto).")
+    producto = models.ForeignKey(
+        Producto, on_delete=models.CASCADE, null=True, related_name='ventas_diarias',
+        help_text="Producto vendido; nulo para productos eliminados.")
+    clave = models.PositiveBigIntegerField(
+        editable=False, help_text="Id del producto, o 0 para los productos eliminados.")
+    cantidad = models.BigIntegerField(default=0, help_text="Unidades vendidas.")
+    monto = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0"),
+                                help_text="Suma de cantidad por precio unitario.")
+    lineas = models.BigIntegerField(default=0, help_text="Cantidad de detalles.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'clave'], name='venta_producto_dia_clave_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} - producto {self.producto_id}: {self.monto}"
+
+
+class VentaDiariaCategoria(models.Model):
+    """
+    Ventas de una categoría en un día, derivadas de `VentaDiariaProducto`
+    según la categoría actual de cada producto. `categoria` nula agrupa los
+    productos sin categoría y los eliminados. Como en `VentaDiariaProducto`,
+    la fila de un día se identifica por `clave`.
+    """
+    dia = models.DateField(help_text="Día de la cotización (zona horaria del proyecto).")
+    categoria = models.ForeignKey(
+        Categoria, on_delete=models.CASCADE, null=True, related_name='ventas_diarias',
+        help_text="Categoría de los productos vendidos; nula si no tienen.")
+    clave = models.PositiveBigIntegerField(
+        editable=False, help_text="Id de la categoría, o 0 para los productos sin categoría.")
+    cantidad = models.BigIntegerField(default=0, help_text="Unidades vendidas.")
+    monto = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0"),
+                                help_text="Suma de cantidad por precio unitario.")
+    lineas = models.BigIntegerField(default=0, help_text="Cantidad de detalles.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'clave'], name='venta_categoria_dia_clave_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} - categoría {self.categoria_id}: {self.monto}"
+
+
+# ========================
+# Trabajos de exportación
+# ========================
+class TrabajoExportacion(models.Model):
+    """
+    Exportación solicitada por un usuario y generada en segundo plano.
+
+    La propia tabla funciona como cola: los trabajadores toman los trabajos
+    pendientes con un UPDATE condicional sobre `estado`.
+    """
+    TIPO_COTIZACIONES = 'cotizaciones'
+    TIPO_USUARIOS = 'usuarios'
+    TIPO_PRODUCTOS = 'productos'
+    TIPO_PDF = 'pdf'
+    TIPOS = [
+        (TIPO_COTIZACIONES, 'Cotizaciones'),
+        (TIPO_USUARIOS, 'Usuarios'),
+        (TIPO_PRODUCTOS, 'Productos'),
+        (TIPO_PDF, 'PDF de una cotización'),
+    ]
+    FORMATOS = [
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+        ('pdf', 'PDF'),
+    ]
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADO, 'Completado'),
+        (ERROR, 'Error'),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='trabajos_exportacion',
+        help_text="Usuario que solicitó la exportación.")
+    tipo = models.CharField(max_length=20, choices=TIPOS,
+                            help_text="Datos a exportar.")
+    formato = models.CharField(max_length=10, choices=FORMATOS,
+                               help_text="Formato del archivo generado.")
+    filtros = models.JSONField(default=dict, blank=True,
+                               help_text="Filtros aplicados a la exportación.")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE,
+                              db_index=True, help_text="Estado del trabajo.")
+    archivo = models.CharField(max_length=255, blank=True,
+                               help_text="Ruta del archivo generado, relativa al directorio de exportaciones.")
+    error = models.TextField(blank=True, help_text="Detalle del error, si lo hubo.")
+    creado = models.DateTimeField(auto_now_add=True,
+                                  help_text="Fecha de solicitud.")
+    iniciado = models.DateTimeField(null=True, blank=True,
+                                    help_text="Fecha en que un trabajador lo tomó.")
+    terminado = models.DateTimeField(null=True, blank=True,
+                                     help_text="Fecha de término.")
+    expira = models.DateTimeField(null=True, blank=True,
+                                  help_text="Fecha a partir de la cual se elimina el resultado.")
+
+    class Meta:
+        ordering = ['-creado']
+
+    def __str__(self):
+        return f"Exportación #{self.id} ({self.tipo}.{self.formato}) - {self.estado}"
@@ -0,0 +1,225 @@
+"""
+Paginación por cursor (keyset) para los listados de la API.
+
+En vez de `OFFSET`, cada página se pide a partir de los valores de orden del
+último elemento entregado: `WHERE (fecha, id) < (:fecha, :id) ORDER BY fecha
+DESC, id DESC LIMIT n`. La base de datos salta directamente a esa posición
+usando el índice, así que pedir la página 1 o la 10.000 cuesta lo mismo.
+
+A diferencia de `rest_framework.pagination.CursorPagination`, el cursor guarda
+el valor de *todos* los campos del orden (con el `id` como desempate), por lo
+que también es exacto cuando el primer campo se repite (p. ej. `?ordering=precio`).
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PaginacionCursor(BasePagination):
+    """
+    Paginación keyset con enlaces `next`/`previous` opacos.
+
+    El orden sale del `OrderingFilter` de la vista (`?ordering=`), de su
+    atributo `ordering` o del orden del modelo, y siempre se completa con `id`
+    para que sea total.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    mensaje_cursor_invalido = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.modelo = queryset.model
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        posicion, hacia_atras = self.decodificar_cursor(request)
+        orden = _invertir(self.ordering) if hacia_atras else self.ordering
+        queryset = queryset.order_by(*orden)
+        if posicion is not None:
+            queryset = queryset.filter(self._despues_de(orden, posicion))
+
+        # Se pide un elemento extra solo para saber si hay otra página.
+        resultados = list(queryset[:self.page_size + 1])
+        hay_mas = len(resultados) > self.page_size
+        self.page = resultados[:self.page_size]
+
+        if hacia_atras:
+            self.page.reverse()
+            self.has_next, self.has_previous = posicion is not None, hay_mas
+        else:
+            self.has_next, self.has_previous = hay_mas, posicion is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param],
+                                 strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Devuelve el orden como tupla de campos, siempre terminada en `id`.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = (ordering or getattr(view, 'ordering', None)
+                    or queryset.query.order_by or self.modelo._meta.ordering)
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        campos = []
+        for campo in ordering:
+            nombre = campo.lstrip('-')
+            if nombre == 'pk':
+                campo = campo.replace('pk', 'id')
+            assert '__' not in nombre, (
+                "La paginación por cursor solo admite campos del modelo o anotaciones.")
+            campos.append(campo)
+        if not any(campo.lstrip('-') == 'id' for campo in campos):
+            descendente = bool(campos) and campos[0].startswith('-')
+            campos.append('-id' if descendente else 'id')
+        return tuple(campos)
+
+    def _despues_de(self, orden, posicion):
+        """
+        Condición "fila posterior a `posicion`" en el orden dado, equivalente
+        a comparar las tuplas de valores: (a > x) OR (a = x AND b > y) OR ...
+        """
+        condiciones = []
+        for i, campo in enumerate(orden):
+            iguales = {c.lstrip('-'): posicion[c.lstrip('-')] for c in orden[:i]}
+            nombre = campo.lstrip('-')
+            operador = 'lt' if campo.startswith('-') else 'gt'
+            condiciones.append(Q(**iguales, **{f'{nombre}__{operador}': posicion[nombre]}))
+        return reduce(or_, condiciones)
+
+    def _campo(self, nombre):
+        """
+        Campo del modelo con ese nombre, o None si es una anotación (p. ej.
+        la `relevancia` de la búsqueda de texto completo).
+        """
+        try:
+            return self.modelo._meta.get_field(nombre)
+        except FieldDoesNotExist:
+            return None
+
+    def _posicion(self, instancia):
+        """
+        Valores de orden de un elemento de la página (instancia de modelo o
+        diccionario de `values()`); los de campos del modelo, como texto.
+        """
+        posicion = {}
+        for campo in self.ordering:
+            nombre = campo.lstrip('-')
+            if isinstance(instancia, dict):
+                valor = instancia[nombre]
+            else:
+                valor = getattr(instancia, nombre)
+            if self._campo(nombre) is not None:
+                valor = valor.isoformat() if hasattr(valor, 'isoformat') else str(valor)
+            posicion[nombre] = valor
+        return posicion
+
+    def decodificar_cursor(self, request):
+        """
+        Devuelve `(posicion, hacia_atras)`; la posición es None sin cursor.
+        """
+        codificado = request.query_params.get(self.cursor_query_param)
+        if codificado is None:
+            return None, False
+        try:
+            datos = json.loads(urlsafe_b64decode(codificado.encode('ascii')))
+            hacia_atras = bool(datos['r'])
+            valores = datos['p']
+            nombres = [campo.lstrip('-') for campo in self.ordering]
+            if len(valores) != len(nombres):
+                raise ValueError
+            # Se validan con el campo del modelo para responder 404 (y no 500)
+            # ante un cursor manipulado.
+            posicion = {}
+            for nombre, valor in zip(nombres, valores):
+                campo = self._campo(nombre)
+                if campo is not None:
+                    valor = campo.to_python(valor)
+                elif not isinstance(valor, (int, float, str)):
+                    raise ValueError
+                posicion[nombre] = valor
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.mensaje_cursor_invalido)
+        return posicion, hacia_atras
+
+    def codificar_cursor(self, instancia, hacia_atras):
+        posicion = self._posicion(instancia)
+        datos = {'p': [posicion[campo.lstrip('-')] for campo in self.ordering],
+                 'r': int(hacia_atras)}
+        codificado = urlsafe_b64encode(json.dumps(datos).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, codificado)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.codificar_cursor(self.page[-1], hacia_atras=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.codificar_cursor(self.page[0], hacia_atras=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': "Cursor de paginación (enlaces `next`/`previous`).",
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f"Elementos por página (máximo {self.max_page_size}).",
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+def _invertir(ordering):
+    return tuple(campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordering)
@@ -0,0 +1,166 @@
+"""
+Caché en disco de los PDF de cotizaciones.
+
+Cada PDF se guarda como `<id>-<version>-<huella>.pdf`, donde `version` cambia
+con cualquier edición de la cotización o sus detalles y `huella` resume los
+datos del cliente impresos en el PDF (ver `_crear_tabla_cliente`), la versión
+del catálogo (el PDF imprime los nombres de los productos, que cambian o se
+eliminan sin tocar la cotización) y el `FORMATO_PDF` del diseño. Una edición,
+un cambio del catálogo o de diseño cambia la clave, por lo que nunca se sirve
+un PDF desactualizado; las entradas antiguas se eliminan al guardar la nueva
+versión o por tamaño (se desalojan primero las menos usadas recientemente).
+"""
+import glob
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.http import FileResponse
+
+from .models import VersionCatalogo, prefetch_detalles
+from .utils import FORMATO_PDF, generar_pdf
+
+# Al superar el máximo se desaloja hasta quedar bajo esta fracción.
+FRACCION_TRAS_DESALOJO = 0.9
+
+
+def _configuracion():
+    return settings.PDF_CACHE
+
+
+def _directorio():
+    directorio = str(_configuracion()['DIRECTORIO'])
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def estado_catalogo(cotizacion):
+    """
+    `(version, actualizado)` del catálogo para `cotizacion`: los anotados por
+    `con_version_catalogo()` o, si no vienen, los de `VersionCatalogo.estado()`,
+    que se guardan en la instancia para no repetir la consulta.
+    """
+    if not hasattr(cotizacion, 'version_catalogo'):
+        cotizacion.version_catalogo, cotizacion.catalogo_actualizado = VersionCatalogo.estado()
+    return cotizacion.version_catalogo, cotizacion.catalogo_actualizado
+
+
+def clave(cotizacion):
+    """
+    Nombre de archivo de la entrada de caché de `cotizacion`.
+    """
+    user = cotizacion.user
+    version_catalogo, _ = estado_catalogo(cotizacion)
+    datos = "\x1f".join([
+        cotizacion.fecha.isoformat(), user.first_name, user.last_name,
+        user.email, user.telefono, user.rut, str(version_catalogo), str(FORMATO_PDF),
+    ])
+    huella = hashlib.sha1(datos.encode("utf-8")).hexdigest()[:16]
+    return f"{cotizacion.id}-{cotizacion.version}-{huella}.pdf"
+
+
+def _abrir(ruta):
+    try:
+        archivo = open(ruta, "rb")
+    except FileNotFoundError:
+        return None
+    # La fecha de modificación hace de marca de último uso para el desalojo.
+    os.utime(ruta)
+    return archivo
+
+
+def obtener(cotizacion):
+    """
+    Devuelve el PDF cacheado de `cotizacion` abierto en modo binario, o None.
+    """
+    return _abrir(os.path.join(_directorio(), clave(cotizacion)))
+
+
+def guardar(cotizacion, contenido):
+    """
+    Guarda el PDF de `cotizacion` y devuelve su ruta.
+
+    Reemplaza las versiones anteriores de la misma cotización y desaloja
+    entradas si se supera el tamaño máximo.
+    """
+    directorio = _directorio()
+    ruta = os.path.join(directorio, clave(cotizacion))
+    with tempfile.NamedTemporaryFile(dir=directorio, suffix=".tmp", delete=False) as tmp:
+        tmp.write(contenido)
+    os.replace(tmp.name, ruta)
+    for anterior in glob.glob(os.path.join(directorio, f"{cotizacion.id}-*.pdf")):
+        if anterior != ruta:
+            _eliminar(anterior)
+    _desalojar(directorio)
+    return ruta
+
+
+def _eliminar(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def _desalojar(directorio):
+    """
+    Elimina las entradas usadas hace más tiempo mientras el total supere el máximo.
+    """
+    maximo = _configuracion()['MAX_BYTES']
+    entradas = []
+    total = 0
+    for entrada in os.scandir(directorio):
+        if not entrada.name.endswith(".pdf"):
+            continue
+        try:
+            info = entrada.stat()
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime, info.st_size, entrada.path))
+        total += info.st_size
+    if total <= maximo:
+        return
+    for _, tamano, ruta in sorted(entradas):
+        if total <= maximo * FRACCION_TRAS_DESALOJO:
+            break
+        _eliminar(ruta)
+        total -= tamano
+
+
+def invalidar(cotizacion_id):
+    """
+    Elimina las entradas de caché de una cotización.
+    """
+    directorio = str(_configuracion()['DIRECTORIO'])
+    for ruta in glob.glob(os.path.join(directorio, f"{cotizacion_id}-*.pdf")):
+        _eliminar(ruta)
+
+
+def abrir_pdf(cotizacion):
+    """
+    Devuelve el PDF de `cotizacion` como archivo abierto en modo binario.
+
+    En un acierto se abre el archivo cacheado sin volver a renderizar; en un
+    fallo se cargan los detalles (si no venían precargados), se genera el PDF
+    con `generar_pdf` y se guarda para las próximas descargas.
+    """
+    archivo = obtener(cotizacion)
+    if archivo is not None:
+        return archivo
+
+    prefetch_related_objects([cotizacion], prefetch_detalles())
+    contenido = generar_pdf(cotizacion).getvalue()
+    ruta = guardar(cotizacion, contenido)
+    # Si otro proceso la desalojó entretanto, se sirve desde memoria.
+    return _abrir(ruta) or BytesIO(contenido)
+
+
+def respuesta_pdf(cotizacion):
+    """
+    `FileResponse` de descarga con el PDF (cacheado) de la cotización.
+    """
+    return FileResponse(abrir_pdf(cotizacion), as_attachment=True,
+                        filename=f"cotizacion_{cotizacion.id}.pdf")
@@ -0,0 +1,138 @@
+"""
+Descarga en lote de PDF de cotizaciones como un ZIP generado en streaming.
+
+ReportLab es CPU-bound y no libera el GIL, así que los PDF que no están en la
+caché se renderizan en un pool de procesos (`PDF_LOTE['PROCESOS']`). El
+proceso web solo lee los datos (`datos_pdf`), reparte el renderizado y va
+escribiendo cada entrada en el ZIP a medida que termina, sin esperar al resto.
+"""
+import multiprocessing
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from . import pdf_cache
+from .utils import datos_pdf, renderizar_pdf
+
+CHUNK_SIZE = 100
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _configuracion():
+    return settings.PDF_LOTE
+
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' evita heredar conexiones a la base de datos e hilos del
+            # proceso web; los procesos hijos solo importan ReportLab.
+            _pool = ProcessPoolExecutor(
+                max_workers=_configuracion()['PROCESOS'],
+                mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+class _BufferZip:
+    """
+    Destino de escritura no posicionable para `zipfile`: acumula lo escrito
+    hasta que el generador lo vacía hacia el cliente.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _nombre(cotizacion_id):
+    return f"cotizacion_{cotizacion_id}.pdf"
+
+
+def _renderizados(cotizaciones):
+    """
+    Itera pares (id, contenido PDF) a medida que están listos.
+
+    Los aciertos de caché salen de inmediato; el resto se renderiza en el pool
+    de procesos, con un máximo de `EN_VUELO` trabajos pendientes para acotar
+    la memoria, y se guarda en la caché al terminar.
+    """
+    procesos = _configuracion()['PROCESOS']
+    max_en_vuelo = _configuracion()['EN_VUELO']
+    pendientes = {}
+
+    def completados(bloquear):
+        if not pendientes:
+            return
+        listos, _ = wait(pendientes, timeout=None if bloquear else 0,
+                         return_when=FIRST_COMPLETED)
+        for futuro in listos:
+            cotizacion = pendientes.pop(futuro)
+            contenido = futuro.result()
+            pdf_cache.guardar(cotizacion, contenido)
+            yield cotizacion.id, contenido
+
+    for cotizacion in cotizaciones.iterator(chunk_size=CHUNK_SIZE):
+        archivo = pdf_cache.obtener(cotizacion)
+        if archivo is not None:
+            with archivo:
+                yield cotizacion.id, archivo.read()
+            continue
+
+        if procesos <= 0:
+            contenido = renderizar_pdf(datos_pdf(cotizacion))
+            pdf_cache.guardar(cotizacion, contenido)
+            yield cotizacion.id, contenido
+            continue
+
+        futuro = _obtener_pool().submit(renderizar_pdf, datos_pdf(cotizacion))
+        # Solo se conserva lo necesario para la clave de caché.
+        cotizacion._prefetched_objects_cache = {}
+        pendientes[futuro] = cotizacion
+        yield from completados(bloquear=len(pendientes) >= max_en_vuelo)
+
+    while pendientes:
+        yield from completados(bloquear=True)
+
+
+def generar_zip(cotizaciones):
+    """
+    Itera los bytes de un ZIP con un PDF por cotización.
+
+    Args:
+        cotizaciones: QuerySet de `Cotizacion` con `con_detalles()` aplicado.
+    """
+    buffer = _BufferZip()
+    fecha = timezone.localtime().timetuple()[:6]
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archivo_zip:
+        for cotizacion_id, contenido in _renderizados(cotizaciones):
+            # Los PDF ya vienen comprimidos: se guardan sin volver a comprimir.
+            archivo_zip.writestr(zipfile.ZipInfo(_nombre(cotizacion_id), fecha), contenido)
+            yield buffer.vaciar()
+    yield buffer.vaciar()
+
+
+def respuesta_zip(cotizaciones, nombre_archivo="cotizaciones.zip"):
+    """
+    `StreamingHttpResponse` con el ZIP de los PDF de `cotizaciones`.
+    """
+    response = StreamingHttpResponse(generar_zip(cotizaciones), content_type="application/zip")
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
@@ -0,0 +1,74 @@
+import json
+
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .exportacion_columnar import ARROW_CONTENT_TYPE, PARQUET_CONTENT_TYPE
+from .exporters import CSV_CONTENT_TYPE, NDJSON_CONTENT_TYPE, XLSX_CONTENT_TYPE
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Renderer de los formatos de exportación.
+
+    Solo se usa para negociar el formato (`?format=` o cabecera `Accept`): las
+    vistas de exportación devuelven directamente la respuesta en streaming.
+    Los errores (401, 404, ...) se devuelven como JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False).encode('utf-8')
+
+
+class XLSXRenderer(ExportRenderer):
+    media_type = XLSX_CONTENT_TYPE
+    format = 'xlsx'
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = CSV_CONTENT_TYPE.split(';')[0]
+    format = 'csv'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = NDJSON_CONTENT_TYPE
+    format = 'ndjson'
+
+
+class ParquetRenderer(ExportRenderer):
+    media_type = PARQUET_CONTENT_TYPE
+    format = 'parquet'
+
+
+class ArrowRenderer(ExportRenderer):
+    media_type = ARROW_CONTENT_TYPE
+    format = 'arrow'
+
+
+# El primero es el formato por omisión.
+EXPORT_RENDERERS = [XLSXRenderer, CSVRenderer, NDJSONRenderer]
+
+# Las cotizaciones también se exportan en formatos columnares (ver
+# exportacion_columnar.py).
+EXPORT_RENDERERS_COTIZACIONES = EXPORT_RENDERERS + [ParquetRenderer, ArrowRenderer]
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """
+    Igual que la negociación por omisión, pero si el cliente no pidió un
+    formato explícito y su `Accept` no coincide con ninguno (por ejemplo
+    `application/json`), se usa el primer renderer en vez de responder 406.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            if format_suffix or request.query_params.get(self.settings.URL_FORMAT_OVERRIDE):
+                raise
+            return renderers[0], renderers[0].media_type
@@ -0,0 +1,304 @@
+"""
+Resúmenes de ventas por día: por producto (`VentaDiariaProducto`) y por
+categoría (`VentaDiariaCategoria`).
+
+Los reportes leen estas tablas (unas pocas filas por día) en vez de recorrer
+todos los detalles. Se mantienen de forma incremental: cada cambio de detalles
+se traduce en deltas `{(dia, id): (cantidad, monto, lineas)}` que se suman
+con un INSERT ... ON CONFLICT DO NOTHING (para crear las filas que falten)
+y un único UPDATE `campo = campo + CASE ... END`, sin leer antes las filas.
+Las filas se identifican por `(dia, clave)`, con clave 0 para el id nulo
+(productos eliminados o sin categoría).
+
+Quién genera los deltas:
+
+- `CotizacionSerializer` al crear y editar (escrituras en bloque, sin señales),
+  con `aplicar_al_confirmar`: las filas de un día son las mismas para todas
+  las cotizaciones de ese día y no deben quedar bloqueadas mientras dura la
+  transacción de cada una.
+- Las señales de `DetalleFactura` para los guardados y borrados sueltos, y
+  la de `Cotizacion` al eliminarla.
+- Las señales de `Producto` y `Categoria` mueven los montos entre
+  categorías cuando cambia la categoría de un producto o se elimina algo.
+
+El monto es neto: cantidad por precio unitario, sin IVA. Las escrituras que
+no pasan por el ORM ni por el serializer se corrigen con
+`python manage.py reconstruir_resumen_ventas`.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import DetalleFactura, Producto, VentaDiariaCategoria, VentaDiariaProducto
+
+LOTE = 5000
+
+_MONTO = DecimalField(max_digits=16, decimal_places=2)
+
+
+def _dia(fecha):
+    return timezone.localdate(fecha)
+
+
+def contribucion(cotizacion, lineas):
+    """
+    Deltas de una cotización a partir de sus líneas: dicts con `producto`
+    (instancia o None), `cantidad` y `precio_unitario`.
+    """
+    dia = _dia(cotizacion.fecha)
+    cambios = defaultdict(lambda: [0, Decimal("0"), 0])
+    for linea in lineas:
+        producto = linea.get('producto')
+        valores = cambios[(dia, producto.pk if producto is not None else None)]
+        valores[0] += linea['cantidad']
+        valores[1] += linea['cantidad'] * linea['precio_unitario']
+        valores[2] += 1
+    return {clave: tuple(valores) for clave, valores in cambios.items()}
+
+
+def contribucion_detalle(fecha, producto_id, cantidad, precio_unitario):
+    """
+    Deltas de un único detalle de una cotización con la `fecha` dada.
+    """
+    return {(_dia(fecha), producto_id): (cantidad, cantidad * precio_unitario, 1)}
+
+
+def contribucion_guardada(cotizacion):
+    """
+    Deltas de los detalles guardados de `cotizacion`, con una consulta.
+    """
+    dia = _dia(cotizacion.fecha)
+    return {
+        (dia, fila['producto']): (fila['suma_cantidad'], fila['suma_monto'], fila['suma_lineas'])
+        for fila in DetalleFactura.objects.filter(cotizacion=cotizacion)
+        .values('producto').order_by()
+        .annotate(suma_cantidad=Sum('cantidad'),
+                  suma_monto=Sum(F('cantidad') * F('precio_unitario'), output_field=_MONTO),
+                  suma_lineas=Count('id'))
+    }
+
+
+def diferencia(antes, despues):
+    """
+    Deltas para pasar de la contribución `antes` a `despues`.
+    """
+    cero = (0, Decimal("0"), 0)
+    return {
+        clave: tuple(d - a for a, d in zip(antes.get(clave, cero), despues.get(clave, cero)))
+        for clave in antes.keys() | despues.keys()
+    }
+
+
+def negar(cambios):
+    return {clave: tuple(-valor for valor in valores) for clave, valores in cambios.items()}
+
+
+def _acumular(destino, clave, valores, signo=1):
+    actual = destino.get(clave, (0, Decimal("0"), 0))
+    destino[clave] = tuple(a + signo * v for a, v in zip(actual, valores))
+
+
+def _nueva_fila(modelo, campo, dia, id_, **valores):
+    """
+    Fila nueva de `modelo` para el día y el id (o None) de `campo`.
+    """
+    return modelo(dia=dia, clave=id_ or 0, **{f'{campo}_id': id_}, **valores)
+
+
+def _sumar(modelo, campo, cambios):
+    """
+    Suma `cambios` ({(dia, id): (cantidad, monto, lineas)}) a las filas de
+    `modelo`, creando las que falten. `campo` es la columna del id.
+    """
+    cambios = {(dia, id_ or 0): valores for (dia, id_), valores in cambios.items()
+               if any(valores)}
+    if not cambios:
+        return
+    claves = sorted(cambios)
+    modelo.objects.bulk_create(
+        [_nueva_fila(modelo, campo, dia, clave or None) for dia, clave in claves],
+        ignore_conflicts=True)
+
+    def delta(posicion, output_field=None):
+        return Case(*(When(dia=dia, clave=clave, then=Value(cambios[dia, clave][posicion]))
+                      for dia, clave in claves),
+                    default=Value(0), output_field=output_field)
+
+    # Las filas se filtran por día y clave por separado (un OR por clave puede
+    # exceder la profundidad de expresiones de SQLite); el CASE suma 0 a las
+    # combinaciones que no vienen en `cambios`.
+    modelo.objects.filter(dia__in={dia for dia, _ in claves},
+                          clave__in={clave for _, clave in claves}).update(
+        cantidad=F('cantidad') + delta(0),
+        monto=F('monto') + delta(1, _MONTO),
+        lineas=F('lineas') + delta(2))
+
+
+def aplicar(cambios):
+    """
+    Suma los deltas por producto y los correspondientes por categoría.
+    """
+    cambios = {clave: valores for clave, valores in cambios.items() if any(valores)}
+    if not cambios:
+        return
+    categorias = dict(Producto.objects.filter(
+        pk__in={producto_id for _, producto_id in cambios} - {None}
+    ).values_list('pk', 'categoria_id'))
+    por_categoria = {}
+    for (dia, producto_id), valores in cambios.items():
+        _acumular(por_categoria, (dia, categorias.get(producto_id)), valores)
+    with transaction.atomic():
+        _sumar(VentaDiariaProducto, 'producto', cambios)
+        _sumar(VentaDiariaCategoria, 'categoria', por_categoria)
+
+
+def aplicar_al_confirmar(cambios):
+    """
+    Como `aplicar`, pero al confirmarse la transacción en curso (de inmediato
+    si no hay una) y en una transacción propia y breve; si se revierte, los
+    deltas se descartan. Un error al aplicarlos se registra sin afectar la
+    escritura ya confirmada (se corrige con `reconstruir_resumen_ventas`).
+    """
+    cambios = {clave: valores for clave, valores in cambios.items() if any(valores)}
+    if cambios:
+        transaction.on_commit(lambda: aplicar(cambios), robust=True)
+
+
+def _ventas_del_producto(producto_id):
+    return list(VentaDiariaProducto.objects.filter(producto_id=producto_id)
+                .values_list('dia', 'cantidad', 'monto', 'lineas'))
+
+
+def mover_categoria(producto_id, desde, hacia):
+    """
+    Pasa las ventas del producto de la categoría `desde` a `hacia` (por un
+    cambio de categoría o su eliminación).
+    """
+    if desde == hacia:
+        return
+    cambios = {}
+    for dia, *valores in _ventas_del_producto(producto_id):
+        _acumular(cambios, (dia, desde), valores, -1)
+        _acumular(cambios, (dia, hacia), valores)
+    _sumar(VentaDiariaCategoria, 'categoria', cambios)
+
+
+def producto_eliminado(producto):
+    """
+    Antes de eliminar un producto, pasa sus ventas a las filas de productos
+    eliminados (sus detalles quedan con producto nulo) y a la categoría nula.
+    """
+    # La categoría de la instancia puede estar desactualizada (p. ej. si se
+    # eliminó la categoría después de cargarla).
+    categoria_id = Producto.objects.filter(pk=producto.pk).values_list(
+        'categoria_id', flat=True).first()
+    cambios, por_categoria = {}, {}
+    for dia, *valores in _ventas_del_producto(producto.pk):
+        _acumular(cambios, (dia, producto.pk), valores, -1)
+        _acumular(cambios, (dia, None), valores)
+        _acumular(por_categoria, (dia, categoria_id), valores, -1)
+        _acumular(por_categoria, (dia, None), valores)
+    with transaction.atomic():
+        _sumar(VentaDiariaProducto, 'producto', cambios)
+        _sumar(VentaDiariaCategoria, 'categoria', por_categoria)
+
+
+def categoria_eliminada(categoria):
+    """
+    Antes de eliminar una categoría, pasa sus ventas a la categoría nula
+    (sus productos quedan sin categoría).
+    """
+    cambios = {}
+    for dia, *valores in (VentaDiariaCategoria.objects.filter(categoria=categoria)
+                          .values_list('dia', 'cantidad', 'monto', 'lineas')):
+        _acumular(cambios, (dia, categoria.pk), valores, -1)
+        _acumular(cambios, (dia, None), valores)
+    _sumar(VentaDiariaCategoria, 'categoria', cambios)
+
+
+@transaction.atomic
+def reconstruir_categorias():
+    """
+    Regenera `VentaDiariaCategoria` a partir de `VentaDiariaProducto`. Úsese
+    tras cambiar categorías en bloque (`update()`, `bulk_update`).
+    """
+    VentaDiariaCategoria.objects.all().delete()
+    filas = (VentaDiariaProducto.objects.values('dia', 'producto__categoria').order_by()
+             .annotate(suma_cantidad=Sum('cantidad'), suma_monto=Sum('monto'),
+                       suma_lineas=Sum('lineas')))
+    return _insertar(VentaDiariaCategoria, 'categoria', filas, 'producto__categoria')
+
+
+@transaction.atomic
+def reconstruir():
+    """
+    Regenera ambos resúmenes desde los detalles. Devuelve la cantidad de
+    filas por producto y por categoría.
+    """
+    VentaDiariaProducto.objects.all().delete()
+    filas = (DetalleFactura.objects
+             .annotate(dia=TruncDate('cotizacion__fecha')).values('dia', 'producto').order_by()
+             .annotate(suma_cantidad=Sum('cantidad'),
+                       suma_monto=Sum(F('cantidad') * F('precio_unitario'), output_field=_MONTO),
+                       suma_lineas=Count('id')))
+    productos = _insertar(VentaDiariaProducto, 'producto', filas, 'producto')
+    return productos, reconstruir_categorias()
+
+
+def _insertar(modelo, campo, filas, columna):
+    total, lote = 0, []
+    for fila in filas.iterator(chunk_size=LOTE):
+        lote.append(_nueva_fila(modelo, campo, fila['dia'], fila[columna],
+                               cantidad=fila['suma_cantidad'], monto=fila['suma_monto'],
+                               lineas=fila['suma_lineas']))
+        if len(lote) == LOTE:
+            modelo.objects.bulk_create(lote)
+            total, lote = total + len(lote), []
+    modelo.objects.bulk_create(lote)
+    return total + len(lote)
+
+
+# ========================
+# Reportes
+# ========================
+def _en_rango(queryset, desde=None, hasta=None):
+    if desde is not None:
+        queryset = queryset.filter(dia__gte=desde)
+    if hasta is not None:
+        queryset = queryset.filter(dia__lte=hasta)
+    return queryset
+
+
+def _totales(queryset):
+    return (queryset.annotate(cantidad_total=Sum('cantidad'), monto_total=Sum('monto'),
+                              lineas_total=Sum('lineas'))
+            .filter(lineas_total__gt=0))
+
+
+def _fila(fila, **extra):
+    return {**extra, 'cantidad': fila['cantidad_total'], 'monto': fila['monto_total'],
+            'lineas': fila['lineas_total']}
+
+
+def ventas_por_producto(desde=None, hasta=None):
+    filas = _totales(_en_rango(VentaDiariaProducto.objects, desde, hasta)
+                     .values('producto', 'producto__nombre').order_by())
+    return [_fila(fila, producto=fila['producto'], nombre=fila['producto__nombre'])
+            for fila in filas.order_by('-monto_total', 'producto')]
+
+
+def ventas_por_categoria(desde=None, hasta=None):
+    filas = _totales(_en_rango(VentaDiariaCategoria.objects, desde, hasta)
+                     .values('categoria', 'categoria__nombre').order_by())
+    return [_fila(fila, categoria=fila['categoria'], nombre=fila['categoria__nombre'])
+            for fila in filas.order_by('-monto_total', 'categoria')]
+
+
+def ventas_mensuales(desde=None, hasta=None):
+    filas = _totales(_en_rango(VentaDiariaCategoria.objects, desde, hasta)
+                     .annotate(mes=TruncMonth('dia')).values('mes').order_by())
+    return [_fila(fila, mes=fila['mes'].strftime('%Y-%m')) for fila in filas.order_by('mes')]
@@ -1,5 +1,10 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Cotizacion, CustomUser, Categoria, Producto, DetalleFactura
+from .models import (
+    Cotizacion, CustomUser, Categoria, Producto, DetalleFactura, TrabajoExportacion,
+)
+from . import metricas, resumen_ventas, stock
+from .signals import recalculo_diferido
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -55,12 +60,57 @@ class ProductoSerializer(serializers.ModelSerializer):
                   'stock', 'fecha_creacion', 'categoria', 'categoria_id']
 
 
+class ProductoPrecargadoField(serializers.PrimaryKeyRelatedField):
+    """
+    `PrimaryKeyRelatedField` que, dentro de una lista de detalles, resuelve el
+    producto desde los productos que la lista cargó en una sola consulta.
+    """
+
+    def to_internal_value(self, data):
+        precargados = getattr(self.parent.parent, 'productos_precargados', None)
+        if precargados is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return precargados[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class DetalleFacturaListSerializer(serializers.ListSerializer):
+    """
+    Lista de detalles que valida todos los `producto_id` con una sola consulta.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(int(item['producto_id']))
+                except (TypeError, KeyError, ValueError):
+                    continue
+            self.productos_precargados = Producto.objects.select_related(
+                'categoria').in_bulk(ids)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.productos_precargados = None
+
+
 class DetalleFacturaSerializer(serializers.ModelSerializer):
     """
     Serializer para los detalles de cotización (productos, cantidades y precios).
+
+    Al actualizar una cotización, el `id` identifica el detalle existente a
+    modificar; los detalles sin `id` se crean.
     """
+    id = serializers.IntegerField(required=False)
     producto = ProductoSerializer(read_only=True)
-    producto_id = serializers.PrimaryKeyRelatedField(
+    producto_id = ProductoPrecargadoField(
         queryset=Producto.objects.all(), source='producto', write_only=True
     )
 
@@ -69,35 +119,214 @@ class DetalleFacturaSerializer(serializers.ModelSerializer):
         fields = ['id', 'producto', 'producto_id',
                   'cantidad', 'precio_unitario', 'precio_total']
         read_only_fields = ['precio_total']
+        list_serializer_class = DetalleFacturaListSerializer
 
 
 class CotizacionSerializer(serializers.ModelSerializer):
     """
     Serializer para cotizaciones, incluyendo detalles anidados.
+
+    Las escrituras son atómicas y usan un número constante de consultas:
+    los detalles nuevos se insertan con `bulk_create`, los modificados con
+    `bulk_update` y los que ya no vienen se eliminan en un solo DELETE.
+    El stock de los productos se reserva (o se ajusta a la diferencia) con un
+    único UPDATE condicional (ver `stock.py`) y la diferencia de ventas se
+    suma al resumen diario al confirmar la transacción (ver
+    `resumen_ventas.py`).
     """
     detalles = DetalleFacturaSerializer(many=True)
 
     class Meta:
         model = Cotizacion
-        fields = ['id', 'user', 'fecha', 'detalles']
-        read_only_fields = ['user']
+        fields = ['id', 'user', 'fecha', 'detalles', 'subtotal', 'iva', 'total']
+        read_only_fields = ['user', 'subtotal', 'iva', 'total']
 
+    CAMPOS_DETALLE = ['producto', 'cantidad', 'precio_unitario']
+
+    def to_representation(self, instance):
+        with metricas.medir('serializacion'):
+            return super().to_representation(instance)
+
+    @transaction.atomic
     def create(self, validated_data):
-        request = self.context.get("request")
-        user = request.user
         detalles_data = validated_data.pop('detalles')
 
-        cotizacion = Cotizacion.objects.create(**validated_data)
-        for detalle in detalles_data:
-            DetalleFactura.objects.create(cotizacion=cotizacion, **detalle)
-        return cotizacion
+        with recalculo_diferido():
+            cotizacion = Cotizacion.objects.create(**validated_data)
+            DetalleFactura.objects.bulk_create([
+                DetalleFactura(cotizacion=cotizacion, **self._sin_id(detalle))
+                for detalle in detalles_data
+            ])
+        cotizacion.recalcular_totales()
+        resumen_ventas.aplicar_al_confirmar(resumen_ventas.contribucion(cotizacion, detalles_data))
+        # Al final, para retener los bloqueos de los productos el menor tiempo.
+        self._ajustar_stock(stock.cantidades_de_lineas(detalles_data))
+        return Cotizacion.objects.con_detalles().get(pk=cotizacion.pk)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         detalles_data = validated_data.pop('detalles', [])
         instance = super().update(instance, validated_data)
 
         if detalles_data:
-            instance.detalles.all().delete()
-            for detalle in detalles_data:
-                DetalleFactura.objects.create(cotizacion=instance, **detalle)
-        return instance
+            reservado = stock.cantidades_reservadas(instance)
+            ventas = resumen_ventas.contribucion_guardada(instance)
+            with recalculo_diferido():
+                self._sincronizar_detalles(instance, detalles_data)
+        # También registra una nueva versión aunque no cambien los detalles.
+        instance.recalcular_totales()
+        if detalles_data:
+            resumen_ventas.aplicar_al_confirmar(resumen_ventas.diferencia(
+                ventas, resumen_ventas.contribucion(instance, detalles_data)))
+            self._ajustar_stock(stock.diferencia(
+                reservado, stock.cantidades_de_lineas(detalles_data)))
+        return Cotizacion.objects.con_detalles().get(pk=instance.pk)
+
+    @staticmethod
+    def _ajustar_stock(cambios):
+        """
+        Reserva (o libera) el stock; si no alcanza, la validación falla y la
+        transacción se revierte completa.
+        """
+        try:
+            stock.ajustar(cambios)
+        except stock.StockInsuficiente as exc:
+            raise serializers.ValidationError({'detalles': [
+                f"Stock insuficiente para el producto {producto_id}: "
+                f"solicitado {solicitado}, disponible {disponible}."
+                for producto_id, (solicitado, disponible) in sorted(exc.faltantes.items())
+            ]})
+
+    @staticmethod
+    def _sin_id(detalle):
+        return {campo: valor for campo, valor in detalle.items() if campo != 'id'}
+
+    def _sincronizar_detalles(self, cotizacion, detalles_data):
+        """
+        Aplica la diferencia entre los detalles actuales y los recibidos.
+        """
+        existentes = {detalle.id: detalle for detalle in cotizacion.detalles.all()}
+        nuevos, modificados, conservados = [], [], set()
+
+        for datos in detalles_data:
+            detalle_id = datos.get('id')
+            if detalle_id is None:
+                nuevos.append(DetalleFactura(cotizacion=cotizacion, **self._sin_id(datos)))
+                continue
+            detalle = existentes.get(detalle_id)
+            if detalle is None or detalle_id in conservados:
+                raise serializers.ValidationError({'detalles': [
+                    f"El detalle {detalle_id} no pertenece a la cotización o está repetido."
+                ]})
+            conservados.add(detalle_id)
+            cambios = {
+                campo: valor for campo, valor in self._sin_id(datos).items()
+                if getattr(detalle, campo) != valor
+            }
+            if cambios:
+                for campo, valor in cambios.items():
+                    setattr(detalle, campo, valor)
+                modificados.append(detalle)
+
+        eliminados = existentes.keys() - conservados
+        if eliminados:
+            DetalleFactura.objects.filter(id__in=eliminados).delete()
+        if modificados:
+            DetalleFactura.objects.bulk_update(modificados, self.CAMPOS_DETALLE)
+        if nuevos:
+            DetalleFactura.objects.bulk_create(nuevos)
+
+
+class TrabajoExportacionSerializer(serializers.ModelSerializer):
+    """
+    Serializer para solicitar y consultar exportaciones en segundo plano.
+    """
+    FILTROS_COTIZACIONES = {
+        'start_date': serializers.DateField(required=False),
+        'end_date': serializers.DateField(required=False),
+        'total__gte': serializers.DecimalField(max_digits=14, decimal_places=2, required=False),
+        'total__lte': serializers.DecimalField(max_digits=14, decimal_places=2, required=False),
+    }
+    FILTROS_PDF = {
+        'cotizacion': serializers.IntegerField(min_value=1),
+    }
+
+    class Meta:
+        model = TrabajoExportacion
+        fields = ['id', 'tipo', 'formato', 'filtros', 'estado', 'error',
+                  'creado', 'iniciado', 'terminado', 'expira']
+        read_only_fields = ['estado', 'error', 'creado', 'iniciado', 'terminado', 'expira']
+
+    def validate(self, attrs):
+        tipo, formato = attrs['tipo'], attrs['formato']
+        filtros = attrs.get('filtros') or {}
+        if not isinstance(filtros, dict):
+            raise serializers.ValidationError({'filtros': "Debe ser un objeto."})
+
+        if tipo == TrabajoExportacion.TIPO_PDF:
+            if formato != 'pdf':
+                raise serializers.ValidationError({'formato': "El tipo pdf solo admite formato pdf."})
+            try:
+                cotizacion = self.FILTROS_PDF['cotizacion'].run_validation(filtros.get('cotizacion'))
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({'filtros': {'cotizacion': exc.detail}})
+            user = self.context['request'].user
+            if not Cotizacion.objects.del_usuario(user).filter(pk=cotizacion).exists():
+                raise serializers.ValidationError({'filtros': "Cotización no encontrada."})
+            attrs['filtros'] = {'cotizacion': cotizacion}
+            return attrs
+
+        if formato == 'pdf':
+            raise serializers.ValidationError({'formato': "Formato no disponible para este tipo."})
+        if tipo == TrabajoExportacion.TIPO_COTIZACIONES:
+            desconocidos = filtros.keys() - self.FILTROS_COTIZACIONES.keys()
+            if desconocidos:
+                raise serializers.ValidationError(
+                    {'filtros': f"Filtros no soportados: {', '.join(sorted(desconocidos))}."})
+            validados = {}
+            for nombre, valor in filtros.items():
+                campo = self.FILTROS_COTIZACIONES[nombre]
+                try:
+                    validados[nombre] = campo.to_representation(campo.to_internal_value(valor))
+                except serializers.ValidationError as exc:
+                    raise serializers.ValidationError({'filtros': {nombre: exc.detail}})
+            attrs['filtros'] = validados
+        elif filtros:
+            raise serializers.ValidationError({'filtros': "Este tipo no admite filtros."})
+        return attrs
+
+
+class FiltroReporteVentasSerializer(serializers.Serializer):
+    """
+    Rango de días (ambos inclusive) de los reportes de ventas.
+    """
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'desde' in attrs and 'hasta' in attrs and attrs['desde'] > attrs['hasta']:
+            raise serializers.ValidationError({'hasta': "Debe ser posterior o igual a 'desde'."})
+        return attrs
+
+
+class ReporteVentasSerializer(serializers.Serializer):
+    """
+    Fila de un reporte de ventas: unidades, monto neto y cantidad de detalles.
+    """
+    cantidad = serializers.IntegerField()
+    monto = serializers.DecimalField(max_digits=16, decimal_places=2)
+    lineas = serializers.IntegerField()
+
+
+class VentasPorProductoSerializer(ReporteVentasSerializer):
+    producto = serializers.IntegerField(allow_null=True)
+    nombre = serializers.CharField(allow_null=True)
+
+
+class VentasPorCategoriaSerializer(ReporteVentasSerializer):
+    categoria = serializers.IntegerField(allow_null=True)
+    nombre = serializers.CharField(allow_null=True)
+
+
+class VentasMensualesSerializer(ReporteVentasSerializer):
+    mes = serializers.CharField()
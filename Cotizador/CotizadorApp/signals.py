@@ -0,0 +1,184 @@
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import autenticacion, cache_catalogo, pdf_cache, resumen_ventas
+from .models import Categoria, Cotizacion, DetalleFactura, Producto
+
+_estado = threading.local()
+
+
+@contextmanager
+def recalculo_diferido():
+    """
+    Suspende el recálculo automático de totales y del resumen de ventas por
+    cada detalle guardado o eliminado. Quien lo usa debe llamar a
+    `Cotizacion.recalcular_totales()` una sola vez al terminar y aplicar la
+    diferencia de ventas con `resumen_ventas.aplicar()` (o
+    `aplicar_al_confirmar()`).
+    """
+    _estado.diferido = getattr(_estado, 'diferido', 0) + 1
+    try:
+        yield
+    finally:
+        _estado.diferido -= 1
+
+
+def _recalculo_suspendido():
+    return getattr(_estado, 'diferido', 0) > 0
+
+
+def _borrado_de_detalles(origin):
+    """
+    Indica si el borrado se originó en los propios detalles (y no en una
+    cascada desde la cotización o el usuario, donde no hay nada que recalcular).
+    """
+    modelo = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return modelo is DetalleFactura
+
+
+@receiver(post_save, sender=DetalleFactura)
+def totales_al_guardar_detalle(sender, instance, **kwargs):
+    """
+    Mantiene sincronizados los totales de la cotización al crear o editar un detalle.
+    """
+    if not _recalculo_suspendido():
+        Cotizacion(pk=instance.cotizacion_id).recalcular_totales()
+
+
+@receiver(post_delete, sender=DetalleFactura)
+def totales_al_eliminar_detalle(sender, instance, origin=None, **kwargs):
+    """
+    Mantiene sincronizados los totales de la cotización al eliminar un detalle.
+    """
+    if not _recalculo_suspendido() and _borrado_de_detalles(origin):
+        Cotizacion(pk=instance.cotizacion_id).recalcular_totales()
+
+
+@receiver(pre_save, sender=DetalleFactura)
+def ventas_antes_de_guardar_detalle(sender, instance, raw=False, **kwargs):
+    """
+    Guarda en la instancia los valores previos del detalle para descontarlos
+    del resumen de ventas.
+    """
+    instance._venta_anterior = None
+    if raw or instance.pk is None or _recalculo_suspendido():
+        return
+    instance._venta_anterior = DetalleFactura.objects.filter(pk=instance.pk).values_list(
+        'cotizacion__fecha', 'producto_id', 'cantidad', 'precio_unitario').first()
+
+
+@receiver(post_save, sender=DetalleFactura)
+def ventas_al_guardar_detalle(sender, instance, raw=False, **kwargs):
+    """
+    Aplica al resumen de ventas la diferencia de un detalle guardado suelto.
+    """
+    if raw or _recalculo_suspendido():
+        return
+    cambios = resumen_ventas.contribucion_detalle(
+        instance.cotizacion.fecha, instance.producto_id, instance.cantidad,
+        instance.precio_unitario)
+    anterior = getattr(instance, '_venta_anterior', None)
+    if anterior is not None:
+        cambios = resumen_ventas.diferencia(resumen_ventas.contribucion_detalle(*anterior), cambios)
+    resumen_ventas.aplicar(cambios)
+
+
+@receiver(post_delete, sender=DetalleFactura)
+def ventas_al_eliminar_detalle(sender, instance, origin=None, **kwargs):
+    """
+    Descuenta del resumen de ventas un detalle eliminado. El borrado de una
+    cotización completa lo descuenta `ventas_al_eliminar_cotizacion`.
+    """
+    if not _recalculo_suspendido() and _borrado_de_detalles(origin):
+        resumen_ventas.aplicar(resumen_ventas.negar(resumen_ventas.contribucion_detalle(
+            instance.cotizacion.fecha, instance.producto_id, instance.cantidad,
+            instance.precio_unitario)))
+
+
+@receiver(pre_delete, sender=Cotizacion)
+def ventas_al_eliminar_cotizacion(sender, instance, **kwargs):
+    """
+    Descuenta del resumen de ventas todos los detalles de la cotización, con
+    una consulta, antes de que la cascada los elimine.
+    """
+    resumen_ventas.aplicar(resumen_ventas.negar(resumen_ventas.contribucion_guardada(instance)))
+
+
+@receiver(post_delete, sender=Cotizacion)
+def pdf_al_eliminar_cotizacion(sender, instance, **kwargs):
+    """
+    Elimina de la caché los PDF de una cotización borrada.
+    """
+    pdf_cache.invalidar(instance.pk)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def version_catalogo_al_escribir(sender, **kwargs):
+    """
+    Invalida la caché de respuestas del catálogo ante cualquier cambio.
+    """
+    cache_catalogo.invalidar()
+
+
+@receiver(pre_save, sender=Producto)
+def categoria_antes_de_guardar_producto(sender, instance, raw=False, **kwargs):
+    instance._categoria_anterior = None if raw or instance.pk is None else (
+        Producto.objects.filter(pk=instance.pk).values_list('categoria_id', flat=True).first())
+
+
+@receiver(post_save, sender=Producto)
+def ventas_al_cambiar_categoria(sender, instance, created, raw=False, **kwargs):
+    """
+    Pasa las ventas del producto a su nueva categoría en el resumen.
+    """
+    if not (created or raw):
+        resumen_ventas.mover_categoria(
+            instance.pk, getattr(instance, '_categoria_anterior', None), instance.categoria_id)
+
+
+@receiver(pre_delete, sender=Producto)
+def ventas_al_eliminar_producto(sender, instance, **kwargs):
+    resumen_ventas.producto_eliminado(instance)
+
+
+@receiver(pre_delete, sender=Categoria)
+def ventas_al_eliminar_categoria(sender, instance, **kwargs):
+    resumen_ventas.categoria_eliminada(instance)
+
+
+# Datos del cliente que aparecen en el PDF y las exportaciones.
+CAMPOS_CLIENTE = {'first_name', 'last_name', 'email', 'telefono', 'rut'}
+
+
+@receiver(post_save, sender=get_user_model())
+def cotizaciones_al_cambiar_cliente(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Marca como actualizadas las cotizaciones del usuario si cambian sus datos
+    (invalida el Last-Modified de sus PDF). Ignora guardados parciales que no
+    los tocan, como el `last_login` de cada inicio de sesión.
+    """
+    if created or (update_fields is not None and not CAMPOS_CLIENTE & set(update_fields)):
+        return
+    Cotizacion.objects.filter(user=instance).update(actualizado=timezone.now())
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def autenticacion_al_escribir_usuario(sender, instance, **kwargs):
+    """
+    Quita al usuario del caché de autenticación. Se repite al confirmar la
+    transacción por si otra petición lo volvió a cachear con los datos viejos.
+    """
+    autenticacion.invalidar(instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: autenticacion.invalidar(instance.pk))
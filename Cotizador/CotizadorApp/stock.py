@@ -0,0 +1,122 @@
+"""
+Reserva de stock de productos para las cotizaciones.
+
+Cada cambio de stock de una cotización se aplica con un único UPDATE
+condicional sobre todos sus productos:
+
+    UPDATE producto
+       SET stock = stock - CASE id WHEN 1 THEN 3 WHEN 7 THEN -2 ... END
+     WHERE id IN (1, 7, ...)
+       AND stock >= CASE id WHEN 1 THEN 3 WHEN 7 THEN -2 ... END
+
+Sin lecturas previas (read-modify-write) ni SELECT ... FOR UPDATE: la base de
+datos bloquea cada fila solo durante la sentencia y recorre los `id` en el
+orden de la clave primaria, por lo que dos cotizaciones que comparten
+productos siempre toman los bloqueos en el mismo orden y no se interbloquean.
+Si a algún producto no le alcanza el stock, la sentencia actualiza menos filas
+de las esperadas: se deshace (savepoint) y se lanza `StockInsuficiente`, que
+en el serializer revierte también la cotización.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, When
+
+from . import cache_catalogo
+from .models import DetalleFactura, Producto
+
+
+class StockInsuficiente(Exception):
+    """
+    No hay stock suficiente para reservar. `faltantes` mapea cada producto
+    sin stock suficiente a `(solicitado, disponible)`.
+    """
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        super().__init__(", ".join(
+            f"producto {producto_id}: solicitado {solicitado}, disponible {disponible}"
+            for producto_id, (solicitado, disponible) in sorted(faltantes.items())))
+
+
+class _Incompleto(Exception):
+    pass
+
+
+def cantidades_de_lineas(lineas):
+    """
+    Suma las cantidades por producto de una lista de dicts con `producto`
+    (instancia o None) y `cantidad`.
+    """
+    cantidades = Counter()
+    for linea in lineas:
+        if linea.get('producto') is not None:
+            cantidades[linea['producto'].pk] += linea['cantidad']
+    return cantidades
+
+
+def cantidades_reservadas(cotizacion):
+    """
+    Cantidades por producto de los detalles guardados de `cotizacion`.
+    """
+    return Counter(dict(
+        DetalleFactura.objects.filter(cotizacion=cotizacion, producto__isnull=False)
+        .values('producto').annotate(total=Sum('cantidad')).order_by()
+        .values_list('producto', 'total')))
+
+
+def ajustar(cambios):
+    """
+    Aplica `cambios` ({producto_id: delta}) al stock: un delta positivo
+    reserva (solo si alcanza) y uno negativo libera. Se aplican todos o
+    ninguno.
+
+    Raises:
+        StockInsuficiente: si algún delta positivo supera el stock disponible.
+    """
+    cambios = {producto_id: delta for producto_id, delta in cambios.items() if delta}
+    if not cambios:
+        return
+    delta = Case(*(When(pk=producto_id, then=valor)
+                   for producto_id, valor in sorted(cambios.items())))
+    try:
+        # Savepoint: si la sentencia no actualiza todas las filas, se deshace
+        # sola, sin depender de que quien llama revierta su transacción.
+        with transaction.atomic():
+            actualizados = Producto.objects.filter(
+                pk__in=sorted(cambios), stock__gte=delta).update(stock=F('stock') - delta)
+            if actualizados != len(cambios):
+                raise _Incompleto
+    except _Incompleto:
+        disponibles = dict(Producto.objects.filter(pk__in=cambios).values_list('pk', 'stock'))
+        faltantes = {
+            producto_id: (solicitado, disponibles.get(producto_id, 0))
+            for producto_id, solicitado in cambios.items()
+            if solicitado > 0 and disponibles.get(producto_id, 0) < solicitado
+        }
+        if faltantes:
+            raise StockInsuficiente(faltantes)
+        # Solo faltaban productos ya eliminados cuyo stock se liberaba.
+        ajustar({producto_id: valor for producto_id, valor in cambios.items()
+                 if producto_id in disponibles})
+        return
+
+    # El catálogo muestra el stock: se invalida su caché al confirmar, fuera
+    # de la transacción para no retener el bloqueo del contador de versión.
+    transaction.on_commit(cache_catalogo.invalidar)
+
+
+def reservar(cantidades):
+    ajustar(cantidades)
+
+
+def liberar(cantidades):
+    ajustar({producto_id: -cantidad for producto_id, cantidad in cantidades.items()})
+
+
+def diferencia(antes, despues):
+    """
+    Cambios de stock para pasar de las cantidades `antes` a `despues`.
+    """
+    return {producto_id: despues.get(producto_id, 0) - antes.get(producto_id, 0)
+            for producto_id in antes.keys() | despues.keys()}
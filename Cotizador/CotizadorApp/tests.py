@@ -1,11 +1,54 @@
+import asyncio
+import csv
+import datetime
+import importlib
+import json
 import os
+import tempfile
+import threading
+import types
+import zipfile
+from io import StringIO
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
 from django.conf import settings
-from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APITestCase
-from .models import Cotizacion
+from django.contrib.auth.hashers import check_password
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+from django.db.models import Count, QuerySet, Sum
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from rest_framework import status, viewsets
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from .models import (
+    Cotizacion, CustomUser, Categoria, Producto, DetalleFactura, TrabajoExportacion,
+    VentaDiariaCategoria, VentaDiariaProducto, VersionCatalogo,
+)
+from . import (
+    alta_usuarios, autenticacion, base_datos, busqueda, cache_catalogo, datos_sinteticos,
+    exportacion_columnar, jobs, metricas, pdf_cache, pdf_lote, resumen_ventas, stock,
+)
+from .descargas_asincronas import envolver, vista_asincrona
+from .serializers import CotizacionSerializer
+from .views import CotizacionViewSet, ProductoViewSet, UserViewSet
+from .exporters import XLSX_CONTENT_TYPE
+from .lectura import CAMPOS_USUARIO, ListadoRapidoMixin, listado_usuarios
+from .utils import ALTO_FILA, TablaProductos, generar_pdf, renderizar_pdf
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from openpyxl import load_workbook
+from reportlab.platypus import Flowable, Table
 
 if not settings.configured:
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Cotizador.settings')
@@ -14,15 +57,29 @@ if not settings.configured:
 
 class CotizacionTests(APITestCase):
     def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = override_settings(
+            PDF_CACHE={'DIRECTORIO': directorio.name, 'MAX_BYTES': 10 * 1024 * 1024})
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='test@example.com',
+            rut='11111111-1', telefono='912345678',
+            first_name='Test', last_name='Nombre')
+        self.client.force_authenticate(self.user)
+        self.producto = Producto.objects.create(
+            nombre='Martillo', precio=Decimal('100.00'), stock=1000)
         self.cotizacion_data = {
-            'nombre': 'Test Nombre',
-            'email': 'test@example.com',
-            'detalles': 'Test Detalles',
-            'cantidad': 10,
-            'precio': 100.00,
-            'fecha': timezone.now()
+            'detalles': [
+                {'producto_id': self.producto.id, 'cantidad': 10, 'precio_unitario': '100.00'},
+            ],
         }
-        self.cotizacion = Cotizacion.objects.create(**self.cotizacion_data)
+        self.cotizacion = Cotizacion.objects.create(user=self.user)
+        DetalleFactura.objects.create(
+            cotizacion=self.cotizacion, producto=self.producto,
+            cantidad=10, precio_unitario=Decimal('100.00'))
 
     def test_create_cotizacion(self):
         """
@@ -32,8 +89,9 @@ class CotizacionTests(APITestCase):
         response = self.client.post(url, self.cotizacion_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Cotizacion.objects.count(), 2)
-        self.assertEqual(Cotizacion.objects.last().nombre,
-                         self.cotizacion_data['nombre'])
+        self.assertEqual(response.data['user'], self.user.id)
+        self.assertEqual(response.data['detalles'][0]['producto']['nombre'], 'Martillo')
+        self.assertEqual(response.data['total'], '1190.00')
 
     def test_list_cotizaciones(self):
         """
@@ -42,26 +100,25 @@ class CotizacionTests(APITestCase):
         url = reverse('cotizacion-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['nombre'],
-                         self.cotizacion_data['nombre'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['id'], self.cotizacion.id)
+        self.assertEqual(response.data['results'][0]['total'], '1190.00')
 
     def test_update_cotizacion(self):
         """
         Verifica que se pueda actualizar una cotización existente.
         """
         updated_data = {
-            'nombre': 'Updated Nombre',
-            'email': 'updated@example.com',
-            'detalles': 'Updated Detalles',
-            'cantidad': 20,
-            'precio': 200.00
+            'detalles': [
+                {'producto_id': self.producto.id, 'cantidad': 20, 'precio_unitario': '200.00'},
+            ],
         }
         url = reverse('cotizacion-detail', kwargs={'pk': self.cotizacion.id})
         response = self.client.put(url, updated_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.cotizacion.refresh_from_db()
-        self.assertEqual(self.cotizacion.nombre, updated_data['nombre'])
+        self.assertEqual(self.cotizacion.subtotal, Decimal('4000.00'))
+        self.assertEqual(self.cotizacion.detalles.get().cantidad, 20)
 
     def test_delete_cotizacion(self):
         """
@@ -83,43 +140,2321 @@ class CotizacionTests(APITestCase):
         self.assertEqual(response['Content-Disposition'],
                          f'attachment; filename="cotizacion_{self.cotizacion.id}.pdf"')
 
-    def test_filter_by_email(self):
+    def test_filter_by_total(self):
         """
-        Verifica que el filtrado por email funcione correctamente.
+        Verifica que el filtrado por rango de total funcione correctamente.
         """
         response = self.client.get(
-            reverse('cotizacion-list'), {'email': self.cotizacion.email})
+            reverse('cotizacion-list'), {'total__gte': '1000', 'total__lte': '2000'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['email'], self.cotizacion.email)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.cotizacion.id])
+        response = self.client.get(reverse('cotizacion-list'), {'total__gte': '2000'})
+        self.assertEqual(response.data['results'], [])
 
-    def test_search_by_detalles(self):
+    def test_search_by_producto(self):
         """
-        Verifica que la búsqueda en el campo 'detalles' funcione correctamente.
+        Verifica que la búsqueda por nombre de producto funcione correctamente.
         """
         response = self.client.get(
-            reverse('cotizacion-list'), {'search': 'Test'})
+            reverse('cotizacion-list'), {'search': 'Marti'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
-        self.assertIn('Test', response.data[0]['detalles'])
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get(reverse('cotizacion-list'), {'search': 'Destornillador'})
+        self.assertEqual(response.data['results'], [])
 
-    def test_filter_by_date_range(self):
+    def test_orden_por_fecha_y_solo_propias(self):
         """
-        Verifica que el filtro por rango de fechas funcione correctamente.
+        Verifica el orden por fecha descendente y que solo se listen las
+        cotizaciones del usuario autenticado.
         """
         # Cotización con fecha de ayer
-        ayer = timezone.now() - timedelta(days=1)
-        Cotizacion.objects.create(
-            nombre='Pasado',
-            email='past@example.com',
-            detalles='Vieja cotización',
-            cantidad=1,
-            precio=1.00,
-            fecha=ayer
-        )
-        # Filtro desde hoy en adelante (debería excluir la de ayer)
+        ayer = Cotizacion.objects.create(user=self.user)
+        Cotizacion.objects.filter(pk=ayer.pk).update(fecha=timezone.now() - timedelta(days=1))
+        otro = CustomUser.objects.create_user(
+            username='otro', password='secreta123', email='otro@example.com',
+            rut='22222222-2', telefono='912345678')
+        Cotizacion.objects.create(user=otro)
+
+        response = self.client.get(reverse('cotizacion-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']],
+                         [self.cotizacion.id, ayer.id])
+
+
+class ConsultasCotizacionTests(APITestCase):
+    """
+    Verifica que los listados, el detalle y las exportaciones de cotizaciones
+    ejecuten un número constante de consultas, sin importar cuántas
+    cotizaciones o detalles existan.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678',
+            first_name='Ana', last_name='Pérez')
+        self.client.force_authenticate(self.user)
+        self.categoria = Categoria.objects.create(nombre='Herramientas')
+        self._crear_cotizaciones(2, 2)
+
+    def _crear_cotizaciones(self, cantidad, detalles_por_cotizacion):
+        for _ in range(cantidad):
+            cotizacion = Cotizacion.objects.create(user=self.user)
+            for i in range(detalles_por_cotizacion):
+                producto = Producto.objects.create(
+                    categoria=self.categoria, nombre=f'Producto {i}',
+                    precio=Decimal('10.00'), stock=100)
+                DetalleFactura.objects.create(
+                    cotizacion=cotizacion, producto=producto, cantidad=2,
+                    precio_unitario=Decimal('10.00'))
+        return cotizacion
+
+    def _contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def _assert_constante(self, url_factory, esperado):
+        antes = self._contar_consultas(url_factory())
+        self._crear_cotizaciones(5, 4)
+        despues = self._contar_consultas(url_factory())
+        self.assertEqual(antes, esperado)
+        self.assertEqual(despues, esperado)
+
+    # Los listados y el detalle suman las consultas de sus validadores de GET
+    # condicional (agregado para el ETag y versión del catálogo).
+
+    def test_listado_consultas_constantes(self):
+        self._assert_constante(lambda: reverse('cotizacion-list'), 4)
+
+    def test_detalle_consultas_constantes(self):
+        cotizacion = Cotizacion.objects.first()
+        self._assert_constante(
+            lambda: reverse('cotizacion-detail', kwargs={'pk': cotizacion.id}), 3)
+
+    def test_descargar_pdf_consultas_constantes(self):
+        self._assert_constante(
+            lambda: reverse('cotizacion-descargar-pdf',
+                            kwargs={'pk': Cotizacion.objects.last().id}), 2)
+
+    def test_exportar_pdf_consultas_constantes(self):
+        self._assert_constante(
+            lambda: reverse('export-cotizacion-pdf',
+                            kwargs={'pk': Cotizacion.objects.last().id}), 2)
+
+    def test_exportar_excel_consultas_constantes(self):
+        self._assert_constante(
+            lambda: reverse('cotizacion-exportar-a-excel-cotizaciones'), 3)
+
+    def test_export_cotizaciones_consultas_constantes(self):
+        self._assert_constante(lambda: reverse('export-cotizaciones'), 3)
+
+
+class TotalesCotizacionTests(APITestCase):
+    """
+    Verifica que subtotal, IVA y total persistidos se mantengan sincronizados
+    con los detalles y puedan usarse para filtrar y ordenar.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.user)
+        self.producto = Producto.objects.create(
+            nombre='Martillo', precio=Decimal('10.00'), stock=100)
+
+    def _crear(self, *cantidades):
+        response = self.client.post(reverse('cotizacion-list'), {
+            'detalles': [
+                {'producto_id': self.producto.id, 'cantidad': cantidad,
+                 'precio_unitario': '10.00'}
+                for cantidad in cantidades
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def test_crear_calcula_totales(self):
+        response = self._crear(1, 2)
+        self.assertEqual(response.data['subtotal'], '30.00')
+        self.assertEqual(response.data['iva'], '5.70')
+        self.assertEqual(response.data['total'], '35.70')
+        cotizacion = Cotizacion.objects.get(pk=response.data['id'])
+        self.assertEqual(cotizacion.total, Decimal('35.70'))
+
+    def test_actualizar_recalcula_totales(self):
+        cotizacion_id = self._crear(1).data['id']
+        response = self.client.put(
+            reverse('cotizacion-detail', kwargs={'pk': cotizacion_id}),
+            {'detalles': [{'producto_id': self.producto.id, 'cantidad': 5,
+                           'precio_unitario': '2.00'}]},
+            format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Cotizacion.objects.get(pk=cotizacion_id).subtotal,
+                         Decimal('10.00'))
+
+    def test_cambios_directos_en_detalles_recalculan(self):
+        cotizacion = Cotizacion.objects.get(pk=self._crear(1, 2).data['id'])
+        detalle = cotizacion.detalles.first()
+        detalle.cantidad = 10
+        detalle.save()
+        cotizacion.refresh_from_db()
+        self.assertEqual(cotizacion.subtotal, Decimal('120.00'))
+
+        detalle.delete()
+        cotizacion.refresh_from_db()
+        self.assertEqual(cotizacion.subtotal, Decimal('20.00'))
+        self.assertEqual(cotizacion.total, Decimal('23.80'))
+
+    def test_filtrar_y_ordenar_por_total(self):
+        self._crear(1)
+        self._crear(5)
+        self._crear(10)
+        response = self.client.get(
+            reverse('cotizacion-list'),
+            {'total__gte': '50', 'total__lte': '100', 'ordering': 'total'})
+        self.assertEqual([item['total'] for item in response.data['results']], ['59.50'])
+
+        response = self.client.get(reverse('cotizacion-list'), {'ordering': '-total'})
+        self.assertEqual([item['total'] for item in response.data['results']],
+                         ['119.00', '59.50', '11.90'])
+
+    def test_comando_recalcula_y_verifica(self):
+        cotizacion_id = self._crear(3).data['id']
+        sincronizada_id = self._crear(1).data['id']
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        Cotizacion.objects.filter(pk=cotizacion_id).update(
+            subtotal=0, iva=0, total=0, actualizado=hace_una_hora)
+        antes = dict(Cotizacion.objects.values_list('pk', 'version'))
+
+        with self.assertRaises(CommandError):
+            call_command('recalcular_totales', '--verificar', stdout=StringIO())
+        call_command('recalcular_totales', stdout=StringIO())
+        call_command('recalcular_totales', '--verificar', stdout=StringIO())
+        cotizacion = Cotizacion.objects.get(pk=cotizacion_id)
+        self.assertEqual(cotizacion.total, Decimal('35.70'))
+        # Los PDF en caché y los ETag con los totales anteriores dejan de valer.
+        self.assertEqual(cotizacion.version, antes[cotizacion_id] + 1)
+        self.assertGreater(cotizacion.actualizado, hace_una_hora)
+        self.assertEqual(Cotizacion.objects.get(pk=sincronizada_id).version,
+                         antes[sincronizada_id])
+
+    def test_migracion_completa_totales(self):
+        cotizacion_id = self._crear(3).data['id']
+        Cotizacion.objects.filter(pk=cotizacion_id).update(subtotal=0, iva=0, total=0)
+        migracion = importlib.import_module('CotizadorApp.migrations.0002_totales_cotizacion')
+        migracion.completar_totales(django_apps, None)
+        cotizacion = Cotizacion.objects.get(pk=cotizacion_id)
+        self.assertEqual((cotizacion.subtotal, cotizacion.iva, cotizacion.total),
+                         (Decimal('30.00'), Decimal('5.70'), Decimal('35.70')))
+
+
+class ExportacionExcelTests(APITestCase):
+    """
+    Verifica el contenido de la exportación XLSX en streaming.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678',
+            first_name='Ana', last_name='Pérez')
+        self.client.force_authenticate(self.user)
+        producto = Producto.objects.create(
+            nombre='Martillo', precio=Decimal('10.00'), stock=100)
+        self.cotizacion = Cotizacion.objects.create(user=self.user)
+        DetalleFactura.objects.create(
+            cotizacion=self.cotizacion, producto=producto, cantidad=3,
+            precio_unitario=Decimal('10.50'))
+        DetalleFactura.objects.create(
+            cotizacion=self.cotizacion, producto=None, cantidad=1,
+            precio_unitario=Decimal('2.00'))
+        otro = CustomUser.objects.create_user(
+            username='otro', password='secreta123', email='otro@example.com',
+            rut='22222222-2', telefono='912345678')
+        ajena = Cotizacion.objects.create(user=otro)
+        DetalleFactura.objects.create(
+            cotizacion=ajena, producto=producto, cantidad=1,
+            precio_unitario=Decimal('1.00'))
+
+    def _leer_filas(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="cotizaciones.xlsx"')
+        libro = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        return [list(fila) for fila in libro.active.iter_rows(values_only=True)]
+
+    def test_exporta_solo_detalles_del_usuario(self):
+        for url in (reverse('cotizacion-exportar-a-excel-cotizaciones'),
+                    reverse('export-cotizaciones')):
+            filas = self._leer_filas(self.client.get(url))
+            fecha = self.cotizacion.fecha.strftime("%d-%m-%Y")
+            self.assertEqual(filas, [
+                ["ID Cotización", "Fecha", "Cliente", "Email", "Producto",
+                 "Cantidad", "Precio Unitario", "Precio Total"],
+                [self.cotizacion.id, fecha, "Ana Pérez", "cliente@example.com",
+                 "Martillo", 3, 10.5, 31.5],
+                [self.cotizacion.id, fecha, "Ana Pérez", "cliente@example.com",
+                 "Eliminado", 1, 2, 2],
+            ])
+
+    def test_no_escribe_archivos_en_el_directorio_actual(self):
+        antes = set(os.listdir(os.getcwd()))
+        self.client.get(reverse('export-cotizaciones'))
+        self.assertEqual(set(os.listdir(os.getcwd())), antes)
+
+
+class ExportacionFormatosTests(APITestCase):
+    """
+    Verifica la negociación de formato (xlsx, csv, ndjson) de las exportaciones.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678',
+            first_name='Ana', last_name='Pérez')
+        self.client.force_authenticate(self.user)
+        categoria = Categoria.objects.create(nombre='Herramientas')
+        self.producto = Producto.objects.create(
+            categoria=categoria, nombre='Martillo, grande', descripcion='Acero',
+            precio=Decimal('10.50'), stock=7)
+        self.cotizacion = Cotizacion.objects.create(user=self.user)
+        DetalleFactura.objects.create(
+            cotizacion=self.cotizacion, producto=self.producto, cantidad=3,
+            precio_unitario=Decimal('10.50'))
+
+    def _contenido(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_cotizaciones_csv(self):
+        for url in (reverse('cotizacion-exportar-a-excel-cotizaciones'),
+                    reverse('export-cotizaciones')):
+            response = self.client.get(url, {'format': 'csv'})
+            self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+            self.assertEqual(response['Content-Disposition'],
+                             'attachment; filename="cotizaciones.csv"')
+            filas = list(csv.reader(StringIO(self._contenido(response))))
+            self.assertEqual(filas[0][0], 'ID Cotización')
+            self.assertEqual(filas[1], [
+                str(self.cotizacion.id),
+                DjangoJSONEncoder().default(self.cotizacion.fecha),
+                'Ana Pérez', 'cliente@example.com', 'Martillo, grande',
+                '3', '10.50', '31.50'])
+
+    def test_cotizaciones_ndjson_por_accept(self):
+        response = self.client.get(
+            reverse('cotizacion-exportar-a-excel-cotizaciones'),
+            HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lineas = self._contenido(response).splitlines()
+        self.assertEqual(len(lineas), 1)
+        fila = json.loads(lineas[0])
+        self.assertEqual(fila['cotizacion_id'], self.cotizacion.id)
+        self.assertEqual(fila['cliente'], 'Ana Pérez')
+        self.assertEqual(fila['precio_total'], '31.50')
+
+    def test_productos_y_usuarios(self):
+        response = self.client.get(
+            reverse('producto-exportar-a-excel-productos'), {'format': 'ndjson'})
+        self.assertEqual(json.loads(self._contenido(response)), {
+            'id': self.producto.id, 'nombre': 'Martillo, grande',
+            'descripcion': 'Acero', 'precio': '10.50',
+            'categoria': 'Herramientas', 'stock': 7})
+
+        response = self.client.get(
+            reverse('usuario-exportar-a-excel-usuarios'), {'format': 'csv'})
+        self.assertEqual(self._contenido(response).splitlines(), [
+            'ID,Nombre,Apellido,RUT,Email',
+            f'{self.user.id},Ana,Pérez,11111111-1,cliente@example.com'])
+
+    def test_xlsx_por_omision(self):
+        response = self.client.get(
+            reverse('producto-exportar-a-excel-productos'),
+            HTTP_ACCEPT='application/json')
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        libro = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(list(libro['Productos'].iter_rows(values_only=True))[1],
+                         (self.producto.id, 'Martillo, grande', 'Acero', 10.5,
+                          'Herramientas', 7))
+
+    def test_formato_desconocido(self):
+        response = self.client.get(reverse('export-cotizaciones'), {'format': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(exportacion_columnar.disponible(), "requiere pyarrow")
+class ExportacionColumnarTests(APITestCase):
+    """
+    Verifica la exportación de cotizaciones en Parquet y Arrow IPC.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678',
+            first_name='Ana', last_name='Pérez')
+        self.client.force_authenticate(self.user)
+        self.producto = Producto.objects.create(
+            nombre='Martillo, grande', precio=Decimal('10.50'), stock=100)
+        self.cotizacion = Cotizacion.objects.create(user=self.user)
+        DetalleFactura.objects.create(
+            cotizacion=self.cotizacion, producto=self.producto, cantidad=3,
+            precio_unitario=Decimal('10.50'))
+
+    def _tabla(self, response, formato):
+        import pyarrow.ipc
+        import pyarrow.parquet
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        contenido = b''.join(response.streaming_content)
+        if formato == 'parquet':
+            return pyarrow.parquet.read_table(BytesIO(contenido))
+        return pyarrow.ipc.open_stream(contenido).read_all()
+
+    def test_parquet(self):
         response = self.client.get(
-            reverse('cotizacion-list'), {'start_date': timezone.now().date().isoformat()})
+            reverse('cotizacion-exportar-a-excel-cotizaciones'), {'format': 'parquet'})
+        self.assertEqual(response['Content-Type'], exportacion_columnar.PARQUET_CONTENT_TYPE)
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="cotizaciones.parquet"')
+        tabla = self._tabla(response, 'parquet')
+        self.assertEqual(tabla.schema, exportacion_columnar.esquema_cotizaciones())
+        self.assertEqual(tabla.to_pylist(), [{
+            'cotizacion_id': self.cotizacion.id, 'fecha': self.cotizacion.fecha,
+            'cliente': 'Ana Pérez', 'email': 'cliente@example.com',
+            'producto': 'Martillo, grande', 'cantidad': 3,
+            'precio_unitario': Decimal('10.50'), 'precio_total': Decimal('31.50'),
+        }])
+
+    def test_arrow_por_accept(self):
+        response = self.client.get(reverse('export-cotizaciones'),
+                                   HTTP_ACCEPT=exportacion_columnar.ARROW_CONTENT_TYPE)
+        self.assertEqual(response['Content-Type'], exportacion_columnar.ARROW_CONTENT_TYPE)
+        tabla = self._tabla(response, 'arrow')
+        self.assertEqual(tabla.column('precio_total').to_pylist(), [Decimal('31.50')])
+
+    def test_lotes_y_producto_eliminado(self):
+        otro = Producto.objects.create(nombre='Taladro', precio=Decimal('99.99'), stock=10)
+        DetalleFactura.objects.create(cotizacion=self.cotizacion, producto=otro, cantidad=2,
+                                      precio_unitario=Decimal('99.99'))
+        DetalleFactura.objects.create(cotizacion=self.cotizacion, producto=self.producto,
+                                      cantidad=1, precio_unitario=Decimal('10.50'))
+        otro.delete()
+        lotes = list(exportacion_columnar.lotes_cotizaciones(
+            Cotizacion.objects.filter(user=self.user), filas_por_lote=2))
+        self.assertEqual([lote.num_rows for lote in lotes], [2, 1])
+        self.assertEqual(lotes[0].column('producto').to_pylist(),
+                         ['Martillo, grande', 'Eliminado'])
+        self.assertEqual(lotes[0].column('precio_total').to_pylist(),
+                         [Decimal('31.50'), Decimal('199.98')])
+        # Los nombres se guardan una vez por lote.
+        self.assertEqual(len(lotes[1].column('cliente').dictionary), 1)
+
+    def test_sin_pyarrow(self):
+        with mock.patch('CotizadorApp.exportacion_columnar.pa', None):
+            response = self.client.get(reverse('export-cotizaciones'), {'format': 'parquet'})
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+
+class EscrituraDetallesTests(APITestCase):
+    """
+    Verifica las escrituras anidadas en bloque de `CotizacionSerializer`.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.user)
+        categoria = Categoria.objects.create(nombre='Herramientas')
+        self.productos = [
+            Producto.objects.create(categoria=categoria, nombre=f'Producto {i}',
+                                    precio=Decimal('10.00'), stock=100)
+            for i in range(40)
+        ]
+
+    def _lineas(self, cantidad):
+        return [{'producto_id': producto.id, 'cantidad': 1, 'precio_unitario': '10.00'}
+                for producto in self.productos[:cantidad]]
+
+    def _crear(self, lineas):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse('cotizacion-list'), {'detalles': lineas}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response, len(ctx.captured_queries)
+
+    def _actualizar(self, cotizacion_id, lineas):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.put(
+                reverse('cotizacion-detail', kwargs={'pk': cotizacion_id}),
+                {'detalles': lineas}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response, len(ctx.captured_queries)
+
+    def test_crear_con_consultas_constantes(self):
+        _, pocas = self._crear(self._lineas(2))
+        response, muchas = self._crear(self._lineas(40))
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(len(response.data['detalles']), 40)
+        self.assertEqual(response.data['subtotal'], '400.00')
+
+    def _diff(self, detalles):
+        """
+        Modifica la primera línea, conserva la mitad, elimina el resto y agrega dos.
+        """
+        conservar = detalles[:len(detalles) // 2]
+        lineas = [{'id': d['id'], 'producto_id': d['producto']['id'],
+                   'cantidad': d['cantidad'], 'precio_unitario': d['precio_unitario']}
+                  for d in conservar]
+        lineas[0]['cantidad'] = 5
+        return lineas + self._lineas(2)
+
+    def test_actualizar_con_consultas_constantes(self):
+        chica = self._crear(self._lineas(4))[0].data
+        grande = self._crear(self._lineas(40))[0].data
+
+        _, pocas = self._actualizar(chica['id'], self._diff(chica['detalles']))
+        response, muchas = self._actualizar(grande['id'], self._diff(grande['detalles']))
+        self.assertEqual(pocas, muchas)
+
+        ids_conservados = [d['id'] for d in grande['detalles'][:20]]
+        detalles = response.data['detalles']
+        self.assertEqual([d['id'] for d in detalles[:20]], ids_conservados)
+        self.assertEqual(len(detalles), 22)
+        self.assertEqual(detalles[0]['cantidad'], 5)
+        self.assertEqual(response.data['subtotal'], '260.00')
+        self.assertEqual(DetalleFactura.objects.filter(cotizacion_id=grande['id']).count(), 22)
+
+    def test_detalle_ajeno_revierte_la_actualizacion(self):
+        propia = self._crear(self._lineas(2))[0].data
+        ajena = self._crear(self._lineas(1))[0].data
+        lineas = self._lineas(3) + [{
+            'id': ajena['detalles'][0]['id'], 'producto_id': self.productos[0].id,
+            'cantidad': 9, 'precio_unitario': '1.00'}]
+        response = self.client.put(
+            reverse('cotizacion-detail', kwargs={'pk': propia['id']}),
+            {'detalles': lineas}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(DetalleFactura.objects.filter(cotizacion_id=propia['id']).count(), 2)
+
+    def test_producto_inexistente(self):
+        response = self.client.post(reverse('cotizacion-list'), {'detalles': [
+            {'producto_id': 999999, 'cantidad': 1, 'precio_unitario': '1.00'},
+            {'producto_id': 'abc', 'cantidad': 1, 'precio_unitario': '1.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errores = response.data['detalles']
+        self.assertEqual(errores[0]['producto_id'][0].code, 'does_not_exist')
+        self.assertEqual(errores[1]['producto_id'][0].code, 'incorrect_type')
+
+
+class CachePDFTests(APITestCase):
+    """
+    Verifica la caché de PDF de cotizaciones y su invalidación.
+    """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        configuracion = override_settings(
+            PDF_CACHE={'DIRECTORIO': self.directorio, 'MAX_BYTES': 10 * 1024 * 1024})
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678',
+            first_name='Ana', last_name='Pérez')
+        self.client.force_authenticate(self.user)
+        self.producto = Producto.objects.create(
+            nombre='Martillo', precio=Decimal('10.00'), stock=100)
+        response = self.client.post(reverse('cotizacion-list'), {'detalles': [
+            {'producto_id': self.producto.id, 'cantidad': 1, 'precio_unitario': '10.00'},
+        ]}, format='json')
+        self.cotizacion = Cotizacion.objects.get(pk=response.data['id'])
+        self.url = reverse('cotizacion-descargar-pdf', kwargs={'pk': self.cotizacion.id})
+
+    def _descargar(self, url=None):
+        with mock.patch('CotizadorApp.pdf_cache.generar_pdf', wraps=generar_pdf) as render:
+            response = self.client.get(url or self.url)
+            contenido = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        return contenido, render.call_count
+
+    def _archivos(self):
+        return sorted(os.listdir(self.directorio))
+
+    def test_acierto_no_renderiza(self):
+        primero, renders = self._descargar()
+        self.assertEqual(renders, 1)
+        with CaptureQueriesContext(connection) as ctx:
+            segundo, renders = self._descargar()
+        self.assertEqual(renders, 0)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(primero, segundo)
+        _, renders = self._descargar(
+            reverse('export-cotizacion-pdf', kwargs={'pk': self.cotizacion.id}))
+        self.assertEqual(renders, 0)
+
+    def test_editar_detalles_invalida(self):
+        self._descargar()
+        antes = self._archivos()
+        detalle = self.cotizacion.detalles.get()
+        self.client.put(reverse('cotizacion-detail', kwargs={'pk': self.cotizacion.id}), {
+            'detalles': [{'id': detalle.id, 'producto_id': self.producto.id,
+                          'cantidad': 3, 'precio_unitario': '10.00'}]}, format='json')
+        _, renders = self._descargar()
+        self.assertEqual(renders, 1)
+        self.assertEqual(len(self._archivos()), 1)
+        self.assertNotEqual(self._archivos(), antes)
+
+        detalle.refresh_from_db()
+        detalle.delete()
+        _, renders = self._descargar()
+        self.assertEqual(renders, 1)
+
+    def test_editar_cliente_invalida(self):
+        self._descargar()
+        self.user.telefono = '987654321'
+        self.user.save()
+        _, renders = self._descargar()
+        self.assertEqual(renders, 1)
+
+    def _producto_impreso(self):
+        with mock.patch('CotizadorApp.utils.renderizar_pdf', wraps=renderizar_pdf) as render:
+            _, renders = self._descargar()
+        self.assertEqual(renders, 1)
+        return render.call_args.args[0]['detalles'][0][0]
+
+    def test_cambios_del_catalogo_invalidan(self):
+        self._descargar()
+        self.producto.nombre = 'Martillo de goma'
+        self.producto.save()
+        self.assertEqual(self._producto_impreso(), 'Martillo de goma')
+
+        # El SET_NULL de los detalles es un UPDATE sin señales.
+        self.producto.delete()
+        self.assertEqual(self._producto_impreso(), 'Producto eliminado')
+
+    def test_eliminar_cotizacion_borra_entradas(self):
+        self._descargar()
+        self.assertEqual(len(self._archivos()), 1)
+        self.cotizacion.delete()
+        self.assertEqual(self._archivos(), [])
+
+    def test_desalojo_por_tamano(self):
+        contenido, _ = self._descargar()
+        maximo = len(contenido) * 2 + len(contenido) // 2
+        with override_settings(PDF_CACHE={'DIRECTORIO': self.directorio, 'MAX_BYTES': maximo}):
+            for _ in range(3):
+                response = self.client.post(reverse('cotizacion-list'), {'detalles': [
+                    {'producto_id': self.producto.id, 'cantidad': 1,
+                     'precio_unitario': '10.00'}]}, format='json')
+                self._descargar(reverse('cotizacion-descargar-pdf',
+                                        kwargs={'pk': response.data['id']}))
+            total = sum(os.path.getsize(os.path.join(self.directorio, nombre))
+                        for nombre in self._archivos())
+            self.assertLessEqual(total, maximo)
+            self.assertNotIn(f'{self.cotizacion.id}-', ''.join(self._archivos()))
+
+
+class MotorPDFTests(APITestCase):
+    """
+    Verifica la tabla de productos paginada y los estilos compartidos del PDF.
+    """
+
+    def _datos(self, lineas):
+        return {
+            'id': 7, 'fecha': '01/01/2024', 'nombre': 'Ana Pérez', 'email': 'ana@example.com',
+            'telefono': '912345678', 'rut': '11111111-1',
+            'detalles': [(f'Producto {i}', 2, Decimal('1.50'), Decimal('3.00'))
+                         for i in range(lineas)],
+            'subtotal': Decimal('3.00') * lineas, 'iva': Decimal('0'),
+            'total': Decimal('3.00') * lineas,
+        }
+
+    def test_division_por_pagina(self):
+        detalles = self._datos(100)['detalles']
+        primera, resto = TablaProductos(detalles).split(480, 12 * ALTO_FILA)
+        # Encabezado, 10 líneas y la suma acumulada.
+        self.assertEqual(primera._cellvalues[0][0], 'Descripción')
+        self.assertEqual(len(primera._cellvalues), 12)
+        self.assertEqual(primera._cellvalues[-1][-1], '$ 30,00')
+        self.assertEqual((resto.inicio, resto.acumulado), (10, Decimal('30.00')))
+        self.assertIs(resto.detalles, detalles)
+
+        siguiente, _ = resto.split(480, 12 * ALTO_FILA)
+        self.assertEqual(siguiente._cellvalues[1][0], 'Producto 10')
+        self.assertEqual(siguiente._cellvalues[-1][-1], '$ 60,00')
+        # Sin espacio para encabezado, una línea y la suma: pasa a la página siguiente.
+        self.assertEqual(resto.split(480, 2 * ALTO_FILA), [])
+
+    def test_cotizacion_grande(self):
+        contenido = renderizar_pdf(self._datos(2000))
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        # Unas 36 líneas por página.
+        self.assertGreater(contenido.count(b'/Type /Page\n'), 2000 // 40)
+
+    def test_tablas_alineadas(self):
+        def es_tabla(flowable):
+            return isinstance(flowable, TablaProductos) or (
+                isinstance(flowable, Table)
+                and flowable._cellvalues[0][0] in ('Nro de factura:', 'Descripción'))
+
+        original = Flowable._hAlignAdjust
+        for lineas in (3, 200):
+            posiciones = []
+
+            def alinear(flowable, x, sW=0):
+                x = original(flowable, x, sW)
+                # Solo las que ubica el frame (las anidadas no reciben `sW`).
+                if sW and es_tabla(flowable):
+                    posiciones.append(x)
+                return x
+
+            with mock.patch.object(Flowable, '_hAlignAdjust', autospec=True,
+                                   side_effect=alinear):
+                renderizar_pdf(self._datos(lineas))
+            # La del cliente y las de productos (una por página).
+            self.assertGreaterEqual(len(posiciones), 2)
+            self.assertEqual(set(posiciones), {posiciones[0]}, lineas)
+
+    def test_estilos_construidos_una_vez(self):
+        with mock.patch('reportlab.lib.styles.getSampleStyleSheet') as hoja, \
+                mock.patch('CotizadorApp.utils.getSampleStyleSheet') as hoja_utils:
+            renderizar_pdf(self._datos(10))
+        hoja.assert_not_called()
+        hoja_utils.assert_not_called()
+
+    def test_clave_de_cache_incluye_formato(self):
+        user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678')
+        cotizacion = Cotizacion.objects.create(user=user)
+        anterior = pdf_cache.clave(cotizacion)
+        with mock.patch('CotizadorApp.pdf_cache.FORMATO_PDF', 1):
+            self.assertNotEqual(pdf_cache.clave(cotizacion), anterior)
+
+
+class TrabajosExportacionTests(APITestCase):
+    """
+    Verifica la cola de exportaciones en segundo plano.
+    """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        self._configurar('sincrono')
+
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678',
+            first_name='Ana', last_name='Pérez')
+        self.client.force_authenticate(self.user)
+        producto = Producto.objects.create(
+            nombre='Martillo', precio=Decimal('10.00'), stock=100)
+        self.cotizacion = Cotizacion.objects.create(user=self.user)
+        DetalleFactura.objects.create(
+            cotizacion=self.cotizacion, producto=producto, cantidad=3,
+            precio_unitario=Decimal('10.00'))
+
+    def _configurar(self, modo):
+        configuracion = override_settings(EXPORT_JOBS={
+            'MODO': modo, 'CONCURRENCIA': 1, 'RETENCION_HORAS': 1,
+            'TIEMPO_MAXIMO_MINUTOS': 5, 'DIRECTORIO': self.directorio,
+        })
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+    def _solicitar(self, **datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('exportacion-list'), datos, format='json')
+        return response
+
+    def _descargar(self, trabajo_id):
+        return self.client.get(reverse('exportacion-descargar', kwargs={'pk': trabajo_id}))
+
+    def test_exportacion_csv_completa(self):
+        response = self._solicitar(tipo='cotizaciones', formato='csv',
+                                   filtros={'total__gte': '10'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        trabajo = self.client.get(
+            reverse('exportacion-detail', kwargs={'pk': response.data['id']})).data
+        self.assertEqual(trabajo['estado'], 'completado')
+        self.assertIsNotNone(trabajo['expira'])
+
+        descarga = self._descargar(trabajo['id'])
+        self.assertEqual(descarga['Content-Disposition'],
+                         'attachment; filename="cotizaciones.csv"')
+        filas = b''.join(descarga.streaming_content).decode().splitlines()
+        self.assertEqual(len(filas), 2)
+        self.assertIn('Martillo', filas[1])
+
+    def test_exportacion_pdf(self):
+        response = self._solicitar(tipo='pdf', formato='pdf',
+                                   filtros={'cotizacion': self.cotizacion.id})
+        descarga = self._descargar(response.data['id'])
+        self.assertTrue(b''.join(descarga.streaming_content).startswith(b'%PDF'))
+
+    def test_validaciones(self):
+        otro = CustomUser.objects.create_user(
+            username='otro', password='secreta123', email='otro@example.com',
+            rut='22222222-2', telefono='912345678')
+        ajena = Cotizacion.objects.create(user=otro)
+        for datos in (
+            {'tipo': 'pdf', 'formato': 'pdf', 'filtros': {'cotizacion': ajena.id}},
+            {'tipo': 'pdf', 'formato': 'pdf', 'filtros': {'cotizacion': 'abc'}},
+            {'tipo': 'pdf', 'formato': 'pdf', 'filtros': {'cotizacion': [self.cotizacion.id]}},
+            {'tipo': 'pdf', 'formato': 'pdf', 'filtros': {'cotizacion': {'id': 1}}},
+            {'tipo': 'pdf', 'formato': 'pdf', 'filtros': {}},
+            {'tipo': 'pdf', 'formato': 'csv', 'filtros': {'cotizacion': self.cotizacion.id}},
+            {'tipo': 'productos', 'formato': 'pdf'},
+            {'tipo': 'cotizaciones', 'formato': 'csv', 'filtros': {'nombre': 'x'}},
+            {'tipo': 'cotizaciones', 'formato': 'csv', 'filtros': {'start_date': 'ayer'}},
+        ):
+            response = self._solicitar(**datos)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, datos)
+        self.assertFalse(TrabajoExportacion.objects.exists())
+
+    def test_trabajos_de_otro_usuario_no_visibles(self):
+        trabajo_id = self._solicitar(tipo='productos', formato='ndjson').data['id']
+        otro = CustomUser.objects.create_user(
+            username='otro', password='secreta123', email='otro@example.com',
+            rut='22222222-2', telefono='912345678')
+        self.client.force_authenticate(otro)
+        self.assertEqual(self._descargar(trabajo_id).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('exportacion-list')).data['results'], [])
+
+    def test_modo_externo_y_comando(self):
+        self._configurar('externo')
+        trabajo_id = self._solicitar(tipo='usuarios', formato='xlsx').data['id']
+        self.assertEqual(self._descargar(trabajo_id).status_code, status.HTTP_409_CONFLICT)
+
+        call_command('procesar_exportaciones', '--una-vez', '--concurrencia', '1',
+                     stdout=StringIO())
+        descarga = self._descargar(trabajo_id)
+        libro = load_workbook(BytesIO(b''.join(descarga.streaming_content)))
+        self.assertEqual(libro['Usuarios'].max_row, 2)
+
+    def test_un_trabajo_no_se_toma_dos_veces(self):
+        self._configurar('externo')
+        self._solicitar(tipo='productos', formato='csv')
+        self.assertIsNotNone(jobs.tomar_siguiente())
+        self.assertIsNone(jobs.tomar_siguiente())
+
+    def test_error_y_limpieza_de_expirados(self):
+        self._configurar('externo')
+        trabajo_id = self._solicitar(tipo='pdf', formato='pdf',
+                                     filtros={'cotizacion': self.cotizacion.id}).data['id']
+        self.cotizacion.delete()
+        jobs.procesar_pendientes()
+        trabajo = TrabajoExportacion.objects.get(pk=trabajo_id)
+        self.assertEqual(trabajo.estado, TrabajoExportacion.ERROR)
+        self.assertTrue(trabajo.error)
+
+        ok_id = self._solicitar(tipo='productos', formato='csv').data['id']
+        jobs.procesar_pendientes()
+        carpeta = os.path.join(self.directorio, str(ok_id))
+        self.assertTrue(os.path.isdir(carpeta))
+        TrabajoExportacion.objects.update(expira=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.limpiar_expirados(), 2)
+        self.assertFalse(os.path.exists(carpeta))
+        self.assertFalse(TrabajoExportacion.objects.exists())
+
+
+class DescargaLotePDFTests(APITestCase):
+    """
+    Verifica la descarga de varias cotizaciones como ZIP de PDF.
+    """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = override_settings(
+            PDF_CACHE={'DIRECTORIO': directorio.name, 'MAX_BYTES': 10 * 1024 * 1024},
+            PDF_LOTE={'PROCESOS': 0, 'EN_VUELO': 2})
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.user)
+        martillo = Producto.objects.create(nombre='Martillo', precio=Decimal('10.00'), stock=9)
+        clavo = Producto.objects.create(nombre='Clavo', precio=Decimal('1.00'), stock=9)
+        self.cotizaciones = []
+        for producto in (martillo, clavo, martillo):
+            cotizacion = Cotizacion.objects.create(user=self.user)
+            DetalleFactura.objects.create(cotizacion=cotizacion, producto=producto,
+                                          cantidad=1, precio_unitario=producto.precio)
+            self.cotizaciones.append(cotizacion)
+        ajena = Cotizacion.objects.create(user=CustomUser.objects.create_user(
+            username='otro', password='secreta123', email='otro@example.com',
+            rut='22222222-2', telefono='912345678'))
+        DetalleFactura.objects.create(cotizacion=ajena, producto=martillo,
+                                      cantidad=1, precio_unitario=martillo.precio)
+
+    def _zip(self, **params):
+        response = self.client.get(reverse('cotizacion-descargar-pdfs'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archivo = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        for nombre in archivo.namelist():
+            self.assertTrue(archivo.read(nombre).startswith(b'%PDF'))
+        return sorted(archivo.namelist())
+
+    def test_zip_con_pdfs_del_usuario(self):
+        self.assertEqual(self._zip(), sorted(
+            f'cotizacion_{c.id}.pdf' for c in self.cotizaciones))
+
+    def test_respeta_filtros_del_listado(self):
+        self.assertEqual(self._zip(search='Clavo'),
+                         [f'cotizacion_{self.cotizaciones[1].id}.pdf'])
+
+    def test_pool_de_procesos_y_cache(self):
+        with override_settings(PDF_LOTE={'PROCESOS': 2, 'EN_VUELO': 2}):
+            with mock.patch('CotizadorApp.pdf_lote._obtener_pool',
+                            wraps=pdf_lote._obtener_pool) as pool:
+                self.assertEqual(len(self._zip()), 3)
+            self.assertEqual(pool.call_count, 3)
+            # La segunda descarga sale completa de la caché, sin usar el pool.
+            with mock.patch('CotizadorApp.pdf_lote._obtener_pool') as pool:
+                self.assertEqual(len(self._zip()), 3)
+            pool.assert_not_called()
+
+
+class PaginacionCursorTests(APITestCase):
+    """
+    Verifica la paginación por cursor de los listados.
+    """
+
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.user = CustomUser.objects.create_user(
+            username='admin', password='secreta123', email='admin@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.user)
+        # Precios repetidos para comprobar el desempate por id.
+        Producto.objects.bulk_create(
+            Producto(nombre=f'Producto {i:02d}', precio=Decimal(i % 3), stock=1)
+            for i in range(25))
+
+    def _recorrer(self, url, params):
+        """
+        Sigue los enlaces `next` y devuelve (ids en orden, respuestas).
+        """
+        ids, respuestas = [], []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            respuestas.append(response)
+            ids.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                return ids, respuestas
+            response = self.client.get(response.data['next'])
+
+    def test_recorre_todo_sin_repetir_con_valores_repetidos(self):
+        ids, respuestas = self._recorrer(
+            reverse('producto-list'), {'ordering': 'precio', 'page_size': 4})
+        esperado = list(Producto.objects.order_by('precio', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+        self.assertEqual(len(respuestas), 7)
+        self.assertIsNone(respuestas[0].data['previous'])
+
+    def test_orden_descendente_y_pagina_anterior(self):
+        ids, respuestas = self._recorrer(
+            reverse('producto-list'), {'ordering': '-nombre', 'page_size': 10})
+        self.assertEqual(ids, list(Producto.objects.order_by('-nombre')
+                                   .values_list('id', flat=True)))
+        tercera = respuestas[2]
+        anterior = self.client.get(tercera.data['previous'])
+        self.assertEqual(anterior.data['results'], respuestas[1].data['results'])
+        self.assertIsNotNone(anterior.data['next'])
+
+    def test_consultas_sin_offset_y_constantes(self):
+        url = reverse('producto-list')
+        response = self.client.get(url, {'page_size': 5})
+        for _ in range(3):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(response.data['next'])
+            # Versión del catálogo (caché) y la página.
+            self.assertEqual(len(consultas), 2)
+            self.assertNotIn('OFFSET', consultas[1]['sql'].upper())
+
+    def test_tamano_de_pagina_acotado(self):
+        with mock.patch('CotizadorApp.pagination.PaginacionCursor.max_page_size', 7):
+            response = self.client.get(reverse('producto-list'), {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 7)
+
+    def test_cursor_invalido(self):
+        response = self.client.get(reverse('producto-list'), {'cursor': 'basura'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cotizaciones_por_fecha(self):
+        for _ in range(5):
+            Cotizacion.objects.create(user=self.user)
+        ids, _ = self._recorrer(reverse('cotizacion-list'), {'page_size': 2})
+        self.assertEqual(ids, list(Cotizacion.objects.order_by('-fecha', '-id')
+                                   .values_list('id', flat=True)))
+
+
+class IndicesConsultasTests(APITestCase):
+    """
+    Verifica que los filtros de fecha y los listados usen los índices
+    compuestos (plan de consulta de SQLite).
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.user)
+
+    def test_rango_de_fechas_usa_indice_usuario_fecha(self):
+        queryset = Cotizacion.objects.del_usuario(self.user).entre_fechas(
+            '2025-01-01', '2025-01-31').order_by('-fecha', '-id')
+        plan = queryset.explain()
+        self.assertIn('cotizacion_user_fecha_idx', plan)
+        self.assertIn('fecha>? AND fecha<?', plan.replace('=', ''))
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_rango_semiabierto_en_zona_horaria_actual(self):
+        queryset = Cotizacion.objects.entre_fechas('2025-03-01', '2025-03-01')
+        sql = str(queryset.query)
+        self.assertNotIn('django_datetime_cast_date', sql)
+        limites = [condicion.rhs for condicion in queryset.query.where.children]
+        self.assertEqual(limites, [
+            timezone.make_aware(datetime.datetime(2025, 3, 1)),
+            timezone.make_aware(datetime.datetime(2025, 3, 2)),
+        ])
+
+    def test_limites_del_dia_local(self):
+        temprano = Cotizacion.objects.create(user=self.user)
+        tarde = Cotizacion.objects.create(user=self.user)
+        # 00:30 y 23:30 del 2025-03-01 en Santiago (UTC-3), que en UTC caen en
+        # días distintos.
+        Cotizacion.objects.filter(pk=temprano.pk).update(
+            fecha=datetime.datetime(2025, 3, 1, 3, 30, tzinfo=datetime.timezone.utc))
+        Cotizacion.objects.filter(pk=tarde.pk).update(
+            fecha=datetime.datetime(2025, 3, 2, 2, 30, tzinfo=datetime.timezone.utc))
+        with timezone.override('America/Santiago'):
+            ids = list(Cotizacion.objects.entre_fechas('2025-03-01', '2025-03-01')
+                       .values_list('id', flat=True))
+        self.assertCountEqual(ids, [temprano.pk, tarde.pk])
+        with timezone.override('America/Santiago'):
+            ids = list(Cotizacion.objects.entre_fechas(end='2025-02-28')
+                       .values_list('id', flat=True))
+        self.assertEqual(ids, [])
+
+    def test_listado_pagina_por_indice(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('cotizacion-list'),
+                            {'start_date': '2025-01-01', 'end_date': '2025-12-31'})
+        sql = consultas[0]['sql']
+        self.assertNotIn('django_datetime_cast_date', sql)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(fila[-1]) for fila in cursor.fetchall())
+        self.assertIn('cotizacion_user_fecha_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_fecha_invalida(self):
+        response = self.client.get(reverse('cotizacion-list'), {'start_date': '2025-13-45'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_productos_por_categoria_y_nombre(self):
+        queryset = Producto.objects.filter(categoria_id=1).order_by('nombre')
+        plan = queryset.explain()
+        self.assertIn('producto_categoria_nombre_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class BusquedaProductosTests(APITestCase):
+    """
+    Verifica la búsqueda de productos con el índice de texto completo.
+    """
+
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            username='admin', password='secreta123', email='admin@example.com',
+            rut='11111111-1', telefono='912345678'))
+        self.martillo = Producto.objects.create(
+            nombre='Martillo de carpintero', descripcion='Mango de madera', precio=10, stock=1)
+        self.mazo = Producto.objects.create(
+            nombre='Mazo', descripcion='Similar a un martillo, de goma', precio=12, stock=1)
+        self.cafe = Producto.objects.create(
+            nombre='Café de grano', descripcion='Tostado medio', precio=5, stock=1)
+
+    def _buscar(self, termino, **params):
+        response = self.client.get(reverse('producto-list'), {'search': termino, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['results']]
+
+    def test_prefijo_ordenado_por_relevancia(self):
+        # La coincidencia en el nombre pesa más que en la descripción.
+        self.assertEqual(self._buscar('marti'), [self.martillo.id, self.mazo.id])
+
+    def test_todas_las_palabras_y_sin_acentos(self):
+        self.assertEqual(self._buscar('martillo goma'), [self.mazo.id])
+        self.assertEqual(self._buscar('cafe'), [self.cafe.id])
+
+    def test_operadores_y_puntuacion_no_rompen_la_consulta(self):
+        self.assertEqual(self._buscar('"mazo"* -(^'), [self.mazo.id])
+        self.assertEqual(len(self._buscar('  ¡¿  ')), 3)
+
+    def test_indice_sincronizado_con_escrituras(self):
+        Producto.objects.filter(pk=self.cafe.pk).update(nombre='Té verde')
+        Producto.objects.bulk_create([Producto(nombre='Cafetera', precio=30, stock=1)])
+        self.mazo.delete()
+        self.assertEqual(self._buscar('te'), [self.cafe.id])
+        self.assertEqual(self._buscar('caf'), [Producto.objects.get(nombre='Cafetera').id])
+        self.assertEqual(self._buscar('goma'), [])
+
+    def test_pagina_por_relevancia(self):
+        Producto.objects.bulk_create(
+            Producto(nombre=f'Martillo {i}', precio=1, stock=1) for i in range(7))
+        ids = []
+        response = self.client.get(reverse('producto-list'), {'search': 'martillo', 'page_size': 3})
+        while True:
+            ids.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(ids), 9)
+        self.assertEqual(len(set(ids)), 9)
+        self.assertEqual(ids[-1], self.mazo.id)
+
+    def test_ordering_explicito(self):
+        self.assertEqual(self._buscar('marti', ordering='-precio'),
+                         [self.mazo.id, self.martillo.id])
+
+    def test_usa_el_indice_y_no_like(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self._buscar('martillo')
+        self.assertIn('MATCH', consultas[-1]['sql'])
+        self.assertNotIn('LIKE', consultas[-1]['sql'])
+
+    def test_comando_reconstruye(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""INSERT INTO "cotizadorapp_producto_fts"("cotizadorapp_producto_fts")
+                              VALUES ('delete-all')""")
+        self.assertEqual(self._buscar('mazo'), [])
+        salida = StringIO()
+        call_command('reconstruir_busqueda', stdout=salida)
+        self.assertIn('3 productos', salida.getvalue())
+        self.assertEqual(self._buscar('mazo'), [self.mazo.id])
+
+    def test_backend_incompleto_no_se_instancia(self):
+        class SinBuscar(busqueda.BackendBusqueda):
+            def crear(self, schema_editor):
+                pass
+
+            def eliminar(self, schema_editor):
+                pass
+
+            def reconstruir(self, connection):
+                pass
+
+        with self.assertRaises(TypeError):
+            SinBuscar()
+
+
+class CacheCatalogoTests(APITestCase):
+    """
+    Verifica la caché versionada de respuestas de productos y categorías.
+    """
+
+    def setUp(self):
+        caches['catalogo'].clear()
+        cache_catalogo.reiniciar_estadisticas()
+        self.admin = CustomUser.objects.create_superuser(
+            username='admin', password='secreta123', email='admin@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.admin)
+        self.categoria = Categoria.objects.create(nombre='Herramientas')
+        self.producto = Producto.objects.create(
+            categoria=self.categoria, nombre='Martillo', precio=Decimal('10.00'), stock=5)
+
+    def _get(self, url, params=None):
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_segunda_peticion_sale_de_la_cache(self):
+        url = reverse('producto-list')
+        self.assertEqual(self._get(url)['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self._get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(response.data['results'][0]['nombre'], 'Martillo')
+
+    def test_clave_incluye_parametros(self):
+        url = reverse('producto-list')
+        self._get(url, {'ordering': 'precio', 'page_size': 5})
+        self.assertEqual(self._get(url, {'page_size': 5, 'ordering': 'precio'})['X-Cache'], 'HIT')
+        self.assertEqual(self._get(url, {'ordering': '-precio'})['X-Cache'], 'MISS')
+
+    def test_escrituras_invalidan(self):
+        detalle = reverse('producto-detail', kwargs={'pk': self.producto.pk})
+        categorias = reverse('categoria-list')
+        self._get(detalle)
+        self._get(categorias)
+        self.client.patch(detalle, {'precio': '12.00'}, format='json')
+        response = self._get(detalle)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['precio'], '12.00')
+
+        Categoria.objects.create(nombre='Pinturas')
+        response = self._get(categorias)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.producto.delete()
+        self.assertEqual(self._get(reverse('producto-list')).data['results'], [])
+
+    def test_errores_no_se_cachean(self):
+        url = reverse('producto-detail', kwargs={'pk': 9999})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(cache_catalogo.estadisticas()['fallos'], 2)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'catalogo': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                     'LOCATION': 'catalogo-acotada', 'OPTIONS': {'MAX_ENTRIES': 3}},
+    })
+    def test_desalojo_acotado(self):
+        url = reverse('producto-list')
+        for tamano in range(1, 11):
+            self._get(url, {'page_size': tamano})
+        self.assertLessEqual(len(caches['catalogo']._cache), 3)
+
+    def test_estadisticas(self):
+        url = reverse('producto-list')
+        self._get(url)
+        self._get(url)
+        self._get(url)
+        estadisticas = self._get(reverse('producto-estadisticas-cache')).data
+        self.assertEqual(estadisticas['aciertos'], 2)
+        self.assertEqual(estadisticas['fallos'], 1)
+        self.assertEqual(estadisticas['tasa_aciertos'], 0.6667)
+
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='22222222-2', telefono='912345678'))
+        response = self.client.get(reverse('producto-estadisticas-cache'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GetCondicionalTests(APITestCase):
+    """
+    Verifica ETag / Last-Modified y las respuestas 304 de cotizaciones.
+    """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = override_settings(
+            PDF_CACHE={'DIRECTORIO': directorio.name, 'MAX_BYTES': 10 * 1024 * 1024})
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678', first_name='Ana')
+        self.client.force_authenticate(self.user)
+        self.producto = Producto.objects.create(nombre='Martillo', precio=Decimal('10.00'), stock=9)
+        self.cotizacion = Cotizacion.objects.create(user=self.user)
+        self.detalle = DetalleFactura.objects.create(
+            cotizacion=self.cotizacion, producto=self.producto, cantidad=1,
+            precio_unitario=Decimal('10.00'))
+
+    def _url(self, nombre):
+        return reverse(nombre, kwargs={'pk': self.cotizacion.pk})
+
+    def _revalidar(self, url, **cabeceras):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **cabeceras)
+
+    def test_detalle_304_sin_serializar(self):
+        url = self._url('cotizacion-detail')
+        original = CotizacionSerializer.to_representation
+        with mock.patch.object(CotizacionSerializer, 'to_representation',
+                               autospec=True, side_effect=original) as serializar:
+            self.client.get(url)
+            response = self._revalidar(url)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(serializar.call_count, 2)  # solo los dos GET sin validador
+        self.assertIn('ETag', response)
+
+    def test_detalle_if_modified_since(self):
+        url = self._url('cotizacion-detail')
+        ultima = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    def test_save_directo_invalida(self):
+        url = self._url('cotizacion-detail')
+        antes = self.client.get(url)
+        self.cotizacion.refresh_from_db()
+        version = self.cotizacion.version
+        self.cotizacion.fecha -= timedelta(days=3)
+        self.cotizacion.save()
+        self.assertEqual(Cotizacion.objects.get(pk=self.cotizacion.pk).version, version)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=antes['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['fecha'], antes.data['fecha'])
+
+    def test_cambios_en_detalles_producto_o_cliente_invalidan(self):
+        url = self._url('cotizacion-detail')
+        pdf = self._url('cotizacion-descargar-pdf')
+        etag = self.client.get(url)['ETag']
+        etag_pdf = self.client.get(pdf)['ETag']
+
+        DetalleFactura.objects.create(cotizacion=self.cotizacion, producto=self.producto,
+                                      cantidad=2, precio_unitario=Decimal('10.00'))
+        nuevo = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(nuevo.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(nuevo.data['detalles']), 2)
+        self.assertEqual(self.client.get(pdf, HTTP_IF_NONE_MATCH=etag_pdf).status_code,
+                         status.HTTP_200_OK)
+
+        etag = nuevo['ETag']
+        self.producto.stock = 3
+        self.producto.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_200_OK)
+
+        respuesta_pdf = self.client.get(pdf)
+        self.user.first_name = 'Beatriz'
+        self.user.save()
+        self.assertEqual(self.client.get(pdf, HTTP_IF_NONE_MATCH=respuesta_pdf['ETag']).status_code,
+                         status.HTTP_200_OK)
+        self.cotizacion.refresh_from_db()
+        self.assertGreater(self.cotizacion.actualizado.timestamp(),
+                           datetime.datetime.strptime(
+                               respuesta_pdf['Last-Modified'], '%a, %d %b %Y %H:%M:%S GMT'
+                           ).replace(tzinfo=datetime.timezone.utc).timestamp())
+
+    def test_pdf_cambio_de_nombre_de_producto_invalida(self):
+        pdf = self._url('cotizacion-descargar-pdf')
+        # Last-Modified tiene resolución de segundos.
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        Cotizacion.objects.filter(pk=self.cotizacion.pk).update(actualizado=hace_una_hora)
+        VersionCatalogo.objects.update(actualizado=hace_una_hora)
+        anterior = self.client.get(pdf)
+        self.producto.nombre = 'Martillo de goma'
+        self.producto.save()
+        self.assertEqual(self.client.get(pdf, HTTP_IF_NONE_MATCH=anterior['ETag']).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(
+            self.client.get(pdf, HTTP_IF_MODIFIED_SINCE=anterior['Last-Modified']).status_code,
+            status.HTTP_200_OK)
+
+    def test_pdf_304_sin_generar(self):
+        for nombre in ('cotizacion-descargar-pdf', 'export-cotizacion-pdf'):
+            with mock.patch('CotizadorApp.pdf_cache.abrir_pdf',
+                            wraps=pdf_cache.abrir_pdf) as abrir:
+                response = self._revalidar(self._url(nombre))
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(abrir.call_count, 1)
+
+    def test_listado_y_exportaciones(self):
+        for url in (reverse('cotizacion-list'),
+                    reverse('cotizacion-exportar-a-excel-cotizaciones') + '?format=csv',
+                    reverse('export-cotizaciones')):
+            response = self._revalidar(url)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+        url = reverse('cotizacion-list')
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], etag)
+        Cotizacion.objects.create(user=self.user).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        self.cotizacion.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_200_OK)
+
+
+class ListadoRapidoTests(APITestCase):
+    """
+    Verifica que los listados rápidos (armados desde `values()`) produzcan
+    exactamente el mismo JSON que los serializers.
+    """
+
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678', first_name='Ána', last_name='Pérez')
+        CustomUser.objects.create_user(
+            username='otro', password='secreta123', email='otro@example.com',
+            rut='22222222-2', telefono='912345678')
+        self.client.force_authenticate(self.user)
+        categoria = Categoria.objects.create(nombre='Herramientas')
+        self.productos = [
+            Producto.objects.create(categoria=categoria, nombre='Martillo', descripcion='Acero',
+                                    precio=Decimal('10.5'), stock=3),
+            Producto.objects.create(nombre='Clavo sin categoría', precio=Decimal('0.99'), stock=0),
+            Producto.objects.create(categoria=categoria, nombre='Taladro',
+                                    precio=Decimal('1234.00'), stock=7),
+        ]
+        for i in range(4):
+            cotizacion = Cotizacion.objects.create(user=self.user)
+            for j, producto in enumerate(self.productos[:i + 1]):
+                DetalleFactura.objects.create(cotizacion=cotizacion, producto=producto,
+                                              cantidad=j + 1, precio_unitario=producto.precio)
+        # Detalle cuyo producto fue eliminado.
+        eliminado = Producto.objects.create(nombre='Descontinuado', precio=1, stock=1)
+        DetalleFactura.objects.create(cotizacion=cotizacion, producto=eliminado,
+                                      cantidad=1, precio_unitario=Decimal('1.00'))
+        eliminado.delete()
+
+    def _recorrer(self, url, params):
+        contenidos = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            contenidos.append(response.content)
+            siguiente = json.loads(response.content)['next']
+            if siguiente is None:
+                return contenidos
+            response = self.client.get(siguiente)
+
+    def _assert_equivalente(self, vista, url, params):
+        caches['catalogo'].clear()
+        rapido = self._recorrer(url, params)
+        caches['catalogo'].clear()
+        with mock.patch.object(vista, 'listado_rapido', False):
+            normal = self._recorrer(url, params)
+        self.assertEqual(rapido, normal)
+        return rapido
+
+    def test_productos(self):
+        url = reverse('producto-list')
+        for params in ({}, {'ordering': '-precio', 'page_size': 2},
+                       {'search': 'martillo'}, {'categoria': self.productos[0].categoria_id}):
+            self._assert_equivalente(ProductoViewSet, url, params)
+
+    def test_usuarios(self):
+        url = reverse('usuario-list')
+        self._assert_equivalente(UserViewSet, url, {'ordering': '-first_name', 'page_size': 1})
+        self._assert_equivalente(UserViewSet, url, {'search': 'pérez'})
+
+    def test_cotizaciones(self):
+        url = reverse('cotizacion-list')
+        paginas = self._assert_equivalente(CotizacionViewSet, url, {'page_size': 3})
+        self.assertEqual(len(paginas), 2)
+        self.assertIn(b'"producto":null', paginas[0])
+        self._assert_equivalente(CotizacionViewSet, url, {'ordering': 'total', 'search': 'Taladro'})
+
+    @override_settings(TIME_ZONE='America/Santiago')
+    def test_fechas_en_zona_horaria_local(self):
+        with timezone.override('America/Santiago'):
+            self._assert_equivalente(ProductoViewSet, reverse('producto-list'), {})
+            self._assert_equivalente(CotizacionViewSet, reverse('cotizacion-list'), {})
+
+    def test_cotizaciones_consultas_sin_instanciar_modelos(self):
+        with mock.patch.object(Cotizacion, '__init__', side_effect=AssertionError), \
+                mock.patch.object(DetalleFactura, '__init__', side_effect=AssertionError):
+            response = self.client.get(reverse('cotizacion-list'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(all(item['fecha'] >= timezone.now(
-        ).date().isoformat() for item in response.data))
+
+    def test_viewset_incompleto_falla_al_definirse(self):
+        with self.assertRaises(ImproperlyConfigured):
+            class SinConstructor(ListadoRapidoMixin, viewsets.ModelViewSet):
+                campos_listado = CAMPOS_USUARIO
+        with self.assertRaises(ImproperlyConfigured):
+            class SinCampos(ListadoRapidoMixin, viewsets.ModelViewSet):
+                construir_listado = staticmethod(listado_usuarios)
+
+        class SinListadoRapido(ListadoRapidoMixin, viewsets.ModelViewSet):
+            listado_rapido = False
+
+
+class ReservaStockTests(APITestCase):
+    """
+    Verifica la reserva de stock al crear, editar y eliminar cotizaciones.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.user)
+        self.martillo = Producto.objects.create(nombre='Martillo', precio=Decimal('10.00'), stock=10)
+        self.clavo = Producto.objects.create(nombre='Clavo', precio=Decimal('1.00'), stock=5)
+
+    def _stock(self):
+        return dict(Producto.objects.values_list('nombre', 'stock'))
+
+    def _crear(self, *lineas):
+        return self.client.post(reverse('cotizacion-list'), {'detalles': [
+            {'producto_id': producto.id, 'cantidad': cantidad, 'precio_unitario': '1.00'}
+            for producto, cantidad in lineas
+        ]}, format='json')
+
+    def test_crear_reserva_con_un_update(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self._crear((self.martillo, 2), (self.clavo, 1), (self.martillo, 3))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(self._stock(), {'Martillo': 5, 'Clavo': 4})
+        updates = [c['sql'] for c in consultas if c['sql'].startswith('UPDATE "CotizadorApp_producto"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"stock" >= (CASE', updates[0])
+
+    def test_stock_insuficiente_revierte_todo(self):
+        response = self._crear((self.martillo, 2), (self.clavo, 6))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['detalles'], [
+            f'Stock insuficiente para el producto {self.clavo.id}: solicitado 6, disponible 5.'])
+        self.assertEqual(self._stock(), {'Martillo': 10, 'Clavo': 5})
+        self.assertFalse(Cotizacion.objects.exists())
+        self.assertFalse(DetalleFactura.objects.exists())
+
+    def test_faltantes_con_stock_ya_descontado(self):
+        # El martillo alcanzaría (6 de 10): solo el clavo debe informarse.
+        with self.assertRaises(stock.StockInsuficiente) as error:
+            stock.reservar({self.martillo.id: 6, self.clavo.id: 9})
+        self.assertEqual(error.exception.faltantes, {self.clavo.id: (9, 5)})
+        self.assertEqual(self._stock(), {'Martillo': 10, 'Clavo': 5})
+
+    def test_editar_ajusta_la_diferencia(self):
+        cotizacion = self._crear((self.martillo, 4), (self.clavo, 2)).data
+        martillo, clavo = cotizacion['detalles']
+        response = self.client.patch(
+            reverse('cotizacion-detail', kwargs={'pk': cotizacion['id']}),
+            {'detalles': [
+                {'id': martillo['id'], 'producto_id': self.martillo.id, 'cantidad': 1,
+                 'precio_unitario': '1.00'},
+                {'producto_id': self.clavo.id, 'cantidad': 5, 'precio_unitario': '1.00'},
+            ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        # Martillo: 10 - 4 + 3 liberados; clavo: se liberan 2 y se reservan 5.
+        self.assertEqual(self._stock(), {'Martillo': 9, 'Clavo': 0})
+
+        response = self.client.patch(
+            reverse('cotizacion-detail', kwargs={'pk': cotizacion['id']}),
+            {'detalles': [{'producto_id': self.martillo.id, 'cantidad': 11,
+                           'precio_unitario': '1.00'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._stock(), {'Martillo': 9, 'Clavo': 0})
+        self.assertEqual(DetalleFactura.objects.filter(cotizacion_id=cotizacion['id']).count(), 2)
+
+    def test_eliminar_libera(self):
+        cotizacion = self._crear((self.martillo, 4), (self.clavo, 5)).data
+        self.clavo.delete()
+        response = self.client.delete(reverse('cotizacion-detail', kwargs={'pk': cotizacion['id']}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._stock(), {'Martillo': 10})
+
+    def test_invalida_cache_del_catalogo_al_confirmar(self):
+        version = cache_catalogo.estadisticas()['version']
+        with self.captureOnCommitCallbacks(execute=True):
+            self._crear((self.martillo, 1))
+        self.assertEqual(cache_catalogo.estadisticas()['version'], version + 1)
+
+
+class ResumenVentasTests(APITestCase):
+    """
+    Verifica el mantenimiento incremental de los resúmenes de ventas y los
+    reportes que los leen.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.admin = CustomUser.objects.create_superuser(
+            username='admin', password='secreta123', email='admin@example.com',
+            rut='22222222-2', telefono='987654321')
+        self.client.force_authenticate(self.user)
+        self.herramientas = Categoria.objects.create(nombre='Herramientas')
+        self.ferreteria = Categoria.objects.create(nombre='Ferretería')
+        self.martillo = Producto.objects.create(
+            nombre='Martillo', precio=Decimal('10.00'), stock=100, categoria=self.herramientas)
+        self.clavo = Producto.objects.create(
+            nombre='Clavo', precio=Decimal('1.00'), stock=1000, categoria=self.ferreteria)
+
+    def _crear(self, *lineas):
+        # El resumen se actualiza al confirmar la transacción.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('cotizacion-list'), {'detalles': [
+                {'producto_id': producto.id, 'cantidad': cantidad, 'precio_unitario': precio}
+                for producto, cantidad, precio in lineas
+            ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return response.data
+
+    def _resumenes(self):
+        return (
+            sorted(VentaDiariaProducto.objects.filter(lineas__gt=0)
+                   .values_list('dia', 'producto', 'cantidad', 'monto', 'lineas'),
+                   key=lambda fila: (fila[0], fila[1] or 0)),
+            sorted(VentaDiariaCategoria.objects.filter(lineas__gt=0)
+                   .values_list('dia', 'categoria', 'cantidad', 'monto', 'lineas'),
+                   key=lambda fila: (fila[0], fila[1] or 0)),
+        )
+
+    def _assert_igual_a_reconstruir(self):
+        incremental = self._resumenes()
+        resumen_ventas.reconstruir()
+        self.assertEqual(incremental, self._resumenes())
+        return incremental
+
+    def test_crear_y_editar_por_la_api(self):
+        primera = self._crear((self.martillo, 2, '10.00'), (self.clavo, 10, '1.50'),
+                              (self.martillo, 1, '9.00'))
+        self._crear((self.clavo, 4, '1.00'))
+        hoy = timezone.localdate()
+        productos, categorias = self._assert_igual_a_reconstruir()
+        self.assertEqual(productos, [
+            (hoy, self.martillo.id, 3, Decimal('29.00'), 2),
+            (hoy, self.clavo.id, 14, Decimal('19.00'), 2),
+        ])
+        self.assertEqual([fila[1:] for fila in categorias], [
+            (self.herramientas.id, 3, Decimal('29.00'), 2),
+            (self.ferreteria.id, 14, Decimal('19.00'), 2),
+        ])
+
+        martillo = primera['detalles'][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse('cotizacion-detail', kwargs={'pk': primera['id']}),
+                {'detalles': [{'id': martillo['id'], 'producto_id': self.martillo.id,
+                               'cantidad': 5, 'precio_unitario': '10.00'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        productos, _ = self._assert_igual_a_reconstruir()
+        self.assertEqual(productos, [
+            (hoy, self.martillo.id, 5, Decimal('50.00'), 1),
+            (hoy, self.clavo.id, 4, Decimal('4.00'), 1),
+        ])
+
+    def test_escrituras_sueltas_y_cambios_del_catalogo(self):
+        cotizacion = self._crear((self.martillo, 2, '10.00'), (self.clavo, 10, '1.00'))
+        otra = self._crear((self.clavo, 1, '1.00'))
+
+        detalle = DetalleFactura.objects.get(pk=cotizacion['detalles'][0]['id'])
+        detalle.producto, detalle.cantidad = self.clavo, 7
+        detalle.save()
+        self._assert_igual_a_reconstruir()
+
+        DetalleFactura.objects.create(cotizacion_id=otra['id'], producto=self.martillo,
+                                      cantidad=1, precio_unitario=Decimal('12.00'))
+        DetalleFactura.objects.get(pk=cotizacion['detalles'][1]['id']).delete()
+        self._assert_igual_a_reconstruir()
+
+        self.clavo.categoria = self.herramientas
+        self.clavo.save()
+        self._assert_igual_a_reconstruir()
+
+        self.herramientas.delete()
+        self._assert_igual_a_reconstruir()
+
+        self.martillo.delete()
+        self._assert_igual_a_reconstruir()
+
+        self.client.delete(reverse('cotizacion-detail', kwargs={'pk': cotizacion['id']}))
+        self.user.delete()
+        self.assertEqual(self._assert_igual_a_reconstruir(), ([], []))
+
+    def test_api_no_bloquea_el_resumen_en_su_transaccion(self):
+        # Las filas del día se actualizan recién al confirmar, y no si la
+        # escritura se revierte (aquí por falta de stock).
+        url = reverse('cotizacion-list')
+        with self.captureOnCommitCallbacks() as pendientes:
+            response = self.client.post(url, {'detalles': [
+                {'producto_id': self.martillo.id, 'cantidad': 2, 'precio_unitario': '10.00'}
+            ]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertFalse(VentaDiariaProducto.objects.exists())
+            self.assertFalse(VentaDiariaCategoria.objects.exists())
+            response = self.client.post(url, {'detalles': [
+                {'producto_id': self.clavo.id, 'cantidad': 5000, 'precio_unitario': '1.00'}
+            ]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for pendiente in pendientes:
+            pendiente()
+        self.assertEqual(list(VentaDiariaCategoria.objects.values_list('categoria', 'monto')),
+                         [(self.herramientas.id, Decimal('20.00'))])
+
+    def test_reportes(self):
+        self._crear((self.martillo, 2, '10.00'), (self.clavo, 10, '1.00'))
+        hoy = timezone.localdate()
+        url = reverse('reporte-ventas-productos')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, {'desde': hoy.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(response.data, [
+            {'cantidad': 2, 'monto': '20.00', 'lineas': 1,
+             'producto': self.martillo.id, 'nombre': 'Martillo'},
+            {'cantidad': 10, 'monto': '10.00', 'lineas': 1,
+             'producto': self.clavo.id, 'nombre': 'Clavo'},
+        ])
+
+        response = self.client.get(reverse('reporte-ventas-categorias'))
+        self.assertEqual([(fila['nombre'], fila['monto']) for fila in response.data],
+                         [('Herramientas', '20.00'), ('Ferretería', '10.00')])
+        response = self.client.get(reverse('reporte-ventas-mensual'))
+        self.assertEqual(response.data, [{'cantidad': 12, 'monto': '30.00', 'lineas': 2,
+                                          'mes': hoy.strftime('%Y-%m')}])
+
+        manana = hoy + datetime.timedelta(days=1)
+        self.assertEqual(self.client.get(url, {'desde': manana.isoformat()}).data, [])
+        response = self.client.get(url, {'desde': manana.isoformat(), 'hasta': hoy.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filas_nulas_unicas_sin_restricciones_condicionales(self):
+        # MySQL ignora las restricciones únicas condicionales (W036).
+        for modelo in (VentaDiariaProducto, VentaDiariaCategoria):
+            for restriccion in modelo._meta.constraints:
+                self.assertIsNone(restriccion.condition, restriccion.name)
+
+        hoy = timezone.localdate()
+        for _ in range(2):
+            resumen_ventas.aplicar({(hoy, None): (1, Decimal('5.00'), 1)})
+        self.assertEqual(
+            list(VentaDiariaProducto.objects.values_list('producto', 'clave', 'cantidad', 'monto')),
+            [(None, 0, 2, Decimal('10.00'))])
+        self.assertEqual(
+            list(VentaDiariaCategoria.objects.values_list('categoria', 'clave', 'cantidad')),
+            [(None, 0, 2)])
+
+    def test_comando_reconstruir(self):
+        self._crear((self.martillo, 2, '10.00'))
+        VentaDiariaProducto.objects.all().delete()
+        VentaDiariaCategoria.objects.all().delete()
+        salida = StringIO()
+        call_command('reconstruir_resumen_ventas', stdout=salida)
+        self.assertIn("1 filas por producto, 1 por categoría", salida.getvalue())
+        self.assertEqual(VentaDiariaProducto.objects.get().monto, Decimal('20.00'))
+
+
+class ImportacionProductosTests(APITestCase):
+    """
+    Verifica la importación masiva de productos desde CSV y XLSX.
+    """
+
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.admin = CustomUser.objects.create_superuser(
+            username='admin', password='secreta123', email='admin@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.admin)
+        self.herramientas = Categoria.objects.create(nombre='Herramientas')
+        self.martillo = Producto.objects.create(
+            nombre='Martillo', precio=Decimal('10.00'), stock=5, categoria=self.herramientas)
+        self.url = reverse('producto-importar')
+
+    def _importar(self, contenido, nombre='productos.csv'):
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+        return self.client.post(self.url, {'archivo': SimpleUploadedFile(nombre, contenido)},
+                                format='multipart')
+
+    def test_csv_crea_actualiza_e_informa_errores(self):
+        version = cache_catalogo.estadisticas()['version']
+        response = self._importar(
+            "﻿ID;Nombre;Descripción;Precio;Categoría;Stock\n"
+            f"{self.martillo.id};Martillo grande;Acero;12.50;Herramientas;7\n"
+            ";Taladro;;99.90;Eléctricos;3\n"
+            ";Cable;Cobre;1.00;Eléctricos;100\n"
+            ";Lija;;0.50;Sin categoría;10\n"
+            ";;;1.00;;1\n"
+            ";Sierra;;caro;;-1\n"
+            "999999;Fantasma;;1.00;;1\n"
+            ";;;;;\n")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(
+            {clave: valor for clave, valor in response.data.items() if clave != 'errores'},
+            {'creados': 3, 'actualizados': 1, 'categorias_creadas': 1, 'total_errores': 3})
+        errores = {error['fila']: set(error['errores']) for error in response.data['errores']}
+        self.assertEqual(errores, {6: {'nombre'}, 7: {'precio', 'stock'}, 8: {'id'}})
+
+        self.martillo.refresh_from_db()
+        self.assertEqual((self.martillo.nombre, self.martillo.descripcion, self.martillo.precio,
+                          self.martillo.stock, self.martillo.categoria_id),
+                         ('Martillo grande', 'Acero', Decimal('12.50'), 7, self.herramientas.id))
+        electricos = Categoria.objects.get(nombre='Eléctricos')
+        self.assertEqual(set(electricos.productos.values_list('nombre', flat=True)),
+                         {'Taladro', 'Cable'})
+        self.assertIsNone(Producto.objects.get(nombre='Lija').categoria_id)
+        self.assertEqual(cache_catalogo.estadisticas()['version'], version + 1)
+        # El índice de búsqueda se sincroniza con los triggers.
+        response = self.client.get(reverse('producto-list'), {'search': 'taladro'})
+        self.assertEqual([p['nombre'] for p in response.data['results']], ['Taladro'])
+
+    def test_xlsx_exportado_se_reimporta(self):
+        exportado = self.client.get(reverse('producto-exportar-a-excel-productos'))
+        libro = load_workbook(BytesIO(b''.join(exportado.streaming_content)))
+        hoja = libro.active
+        hoja.cell(row=2, column=4, value=15)
+        hoja.append([None, 'Destornillador', '', 3.5, 'Herramientas', 20])
+        contenido = BytesIO()
+        libro.save(contenido)
+
+        response = self._importar(contenido.getvalue(), 'productos.xlsx')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual((response.data['creados'], response.data['actualizados']), (1, 1))
+        self.martillo.refresh_from_db()
+        self.assertEqual(self.martillo.precio, Decimal('15.00'))
+        self.assertEqual(Producto.objects.get(nombre='Destornillador').precio, Decimal('3.50'))
+
+    def test_consultas_constantes_por_bloque(self):
+        def importar(cantidad):
+            # Categorías nuevas en cada llamada, para que ambas las creen.
+            filas = "".join(f",Producto {i},,1.00,Categoría {cantidad}-{i % 3},1\n"
+                            for i in range(cantidad))
+            with CaptureQueriesContext(connection) as consultas:
+                response = self._importar("ID,Nombre,Descripción,Precio,Categoría,Stock\n" + filas)
+            self.assertEqual(response.data['creados'], cantidad)
+            return len(consultas)
+
+        self.assertEqual(importar(10), importar(100))
+
+    def test_archivos_invalidos_y_permisos(self):
+        response = self._importar("Nombre,Precio\nMartillo,1\n")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['archivo'], ["Faltan columnas: Stock"])
+        response = self._importar("Nombre,Precio,Stock\n", 'productos.txt')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._importar(b"no es un xlsx", 'productos.xlsx')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        usuario = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='22222222-2', telefono='912345678')
+        self.client.force_authenticate(usuario)
+        response = self._importar("Nombre,Precio,Stock\nMartillo,1,1\n")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AltaMasivaUsuariosTests(APITestCase):
+    """
+    Verifica el alta masiva de usuarios con validación de unicidad en bloque.
+    """
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(
+            username='admin', password='secreta123', email='admin@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('usuario-alta-masiva')
+
+    def _usuario(self, i, **cambios):
+        return {'username': f'usuario{i}', 'email': f'usuario{i}@example.com',
+                'rut': f'{20000000 + i}-{i % 10}', 'telefono': '912345678',
+                'first_name': 'Nombre', 'last_name': f'Apellido {i}',
+                'password': f'clave-{i}', **cambios}
+
+    def test_crea_validos_e_informa_errores(self):
+        response = self.client.post(self.url, [
+            self._usuario(1),
+            self._usuario(2, email='admin@example.com'),
+            self._usuario(3, username='usuario1', rut='11111111-1'),
+            self._usuario(4, email='no-es-email'),
+            {k: v for k, v in self._usuario(5).items() if k != 'password'},
+            self._usuario(6),
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['creados'], 2)
+        self.assertEqual([u['username'] for u in response.data['usuarios']],
+                         ['usuario1', 'usuario6'])
+        errores = {error['indice']: set(error['errores']) for error in response.data['errores']}
+        self.assertEqual(errores, {1: {'email'}, 2: {'username', 'rut'}, 3: {'email'},
+                                   4: {'password'}})
+
+        user = CustomUser.objects.get(username='usuario6')
+        self.assertTrue(user.check_password('clave-6'))
+        self.assertEqual((user.last_name, user.rut), ('Apellido 6', '20000006-6'))
+
+    def test_consultas_constantes(self):
+        def alta(desde, cantidad):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.post(
+                    self.url, [self._usuario(i) for i in range(desde, desde + cantidad)],
+                    format='json')
+            self.assertEqual(response.data['creados'], cantidad)
+            return len(consultas)
+
+        self.assertEqual(alta(0, 2), alta(100, 20))
+
+    def test_carrera_con_otra_alta(self):
+        # Un usuario creado entre la validación y el INSERT se informa como error.
+        def crear_antes_de_insertar(bloque, resultado):
+            CustomUser.objects.create_user(**self._usuario(2, username='otro', email='otro@example.com'))
+            return insertar(bloque, resultado)
+
+        insertar = alta_usuarios._insertar
+        with mock.patch.object(alta_usuarios, '_insertar', crear_antes_de_insertar):
+            response = self.client.post(self.url, [self._usuario(1), self._usuario(2)],
+                                        format='json')
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual([error['indice'] for error in response.data['errores']], [1])
+        self.assertTrue(CustomUser.objects.filter(username='usuario1').exists())
+
+    def test_permisos_y_formato(self):
+        self.assertEqual(self.client.post(self.url, {'username': 'x'}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        with override_settings(ALTA_USUARIOS={**settings.ALTA_USUARIOS, 'MAX_FILAS': 1}):
+            response = self.client.post(self.url, [self._usuario(1), self._usuario(2)],
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(CustomUser.objects.create_user(**self._usuario(9)))
+        response = self.client.post(self.url, [self._usuario(1)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class HashesEnParaleloTests(APITestCase):
+    """
+    Verifica que los hashes calculados en el pool de procesos sean válidos.
+    """
+
+    def tearDown(self):
+        if alta_usuarios._pool is not None:
+            alta_usuarios._pool.shutdown()
+            alta_usuarios._pool = None
+
+    @override_settings(ALTA_USUARIOS={**settings.ALTA_USUARIOS, 'PROCESOS': 2})
+    def test_pool_de_procesos(self):
+        contrasenas = [f'clave-{i}' for i in range(4)]
+        with mock.patch.object(alta_usuarios, 'MINIMO_PARALELO', 1), \
+                mock.patch.object(alta_usuarios, 'HASHES_POR_TAREA', 1):
+            hashes = alta_usuarios.hashear(contrasenas)
+        self.assertIsNotNone(alta_usuarios._pool)
+        self.assertEqual(len(set(hashes)), 4)
+        for contrasena, hash_ in zip(contrasenas, hashes):
+            self.assertTrue(check_password(contrasena, hash_))
+
+
+class AutenticacionCacheadaTests(APITestCase):
+    """
+    Verifica el caché del usuario resuelto desde el JWT y su invalidación.
+    """
+
+    def setUp(self):
+        caches[autenticacion.CACHE_ALIAS].clear()
+        autenticacion.reiniciar_estadisticas()
+        self.admin = CustomUser.objects.create_superuser(
+            username='admin', password='secreta123', email='admin@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='22222222-2', telefono='912345678')
+        self.url = reverse('producto-list')
+
+    def _con_token(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def _consultas_de_usuario(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sum('customuser' in consulta['sql'] for consulta in consultas.captured_queries)
+
+    def test_segunda_peticion_sin_consultar_usuario(self):
+        self._con_token(self.user)
+        self.assertEqual(self._consultas_de_usuario(), 1)
+        self.assertEqual(self._consultas_de_usuario(), 0)
+        self.assertEqual(self._consultas_de_usuario(), 0)
+        estadisticas = autenticacion.estadisticas()
+        self.assertEqual((estadisticas['aciertos'], estadisticas['fallos']), (2, 1))
+        self.assertEqual(estadisticas['tasa_aciertos'], 0.6667)
+
+    def test_escritura_por_api_invalida(self):
+        self._con_token(self.user)
+        self._consultas_de_usuario()
+        self._con_token(self.admin)
+        response = self.client.patch(reverse('usuario-detail', args=[self.user.pk]),
+                                     {'first_name': 'Nuevo'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertIsNone(caches[autenticacion.CACHE_ALIAS].get(autenticacion.clave(self.user.pk)))
+
+        self._con_token(self.user)
+        self.assertEqual(self._consultas_de_usuario(), 1)
+        self.assertEqual(caches[autenticacion.CACHE_ALIAS].get(
+            autenticacion.clave(self.user.pk)).first_name, 'Nuevo')
+
+    def test_usuario_desactivado_o_eliminado(self):
+        self._con_token(self.user)
+        self._consultas_de_usuario()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_active = True
+        self.user.save()
+        self._consultas_de_usuario()
+        self.user.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactivo_en_cache_no_autentica(self):
+        # Aunque la invalidación no llegue (otro proceso), el acierto se verifica.
+        self._con_token(self.user)
+        self._consultas_de_usuario()
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.is_active = False
+        caches[autenticacion.CACHE_ALIAS].set(autenticacion.clave(self.user.pk), self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_estadisticas_solo_administradores(self):
+        url = reverse('usuario-estadisticas-autenticacion')
+        self._con_token(self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self._con_token(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data),
+                         {'aciertos', 'fallos', 'invalidaciones', 'tasa_aciertos'})
+
+
+class BaseDatosTests(APITestCase):
+    """
+    Verifica la configuración aplicada a las conexiones SQLite.
+    """
+
+    def test_pragmas_en_la_conexion(self):
+        valores = base_datos.pragmas(connection)
+        self.assertEqual(valores['busy_timeout'], settings.SQLITE_PRAGMAS['busy_timeout'])
+        # synchronous: 0=OFF, 1=NORMAL, 2=FULL.
+        self.assertEqual(valores['synchronous'], 1)
+        # La base de pruebas está en memoria y no admite WAL.
+        self.assertIn(valores['journal_mode'], ('wal', 'memory'))
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'synchronous': 'FULL'})
+    def test_pragmas_configurables(self):
+        # Una conexión nueva (fuera de la transacción del test) los aplica al abrirse.
+        nueva = connections.create_connection('default')
+        try:
+            self.assertEqual(base_datos.pragmas(nueva), {'busy_timeout': 1234, 'synchronous': 2})
+        finally:
+            nueva.close()
+
+    def test_conexiones_persistentes(self):
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+        self.assertGreater(connection.settings_dict['CONN_MAX_AGE'], 0)
+
+
+class MetricasTests(APITestCase):
+    """
+    Verifica la cabecera Server-Timing y el endpoint /metrics.
+    """
+
+    def setUp(self):
+        metricas.registro.reiniciar()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = override_settings(
+            PDF_CACHE={'DIRECTORIO': directorio.name, 'MAX_BYTES': 10 * 1024 * 1024})
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678')
+        self.client.force_authenticate(self.user)
+        producto = Producto.objects.create(nombre='Martillo', precio=Decimal('10.00'), stock=10)
+        self.cotizacion_id = self.client.post(reverse('cotizacion-list'), {'detalles': [
+            {'producto_id': producto.id, 'cantidad': 2, 'precio_unitario': '10.00'}]},
+            format='json').data['id']
+
+    def _tramos(self, response):
+        return {parte.split(';')[0].strip(): parte for parte in response['Server-Timing'].split(',')}
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('cotizacion-detail', args=[self.cotizacion_id]))
+        tramos = self._tramos(response)
+        self.assertEqual(set(tramos), {'total', 'sql', 'serializacion'})
+        self.assertRegex(tramos['sql'], r'sql;dur=[\d.]+;desc="\d+ consultas"')
+
+        response = self.client.get(reverse('cotizacion-exportar-a-excel-cotizaciones'))
+        self.assertIn('xlsx', self._tramos(response))
+        response = self.client.get(reverse('cotizacion-descargar-pdf', args=[self.cotizacion_id]))
+        self.assertIn('pdf', self._tramos(response))
+
+    def test_endpoint_metrics(self):
+        url = reverse('cotizacion-detail', args=[self.cotizacion_id])
+        self.client.get(url)
+        self.client.get(url)
+        with override_settings(METRICAS={**settings.METRICAS, 'TOKEN': 'secreto'}):
+            response = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        self.assertIn('cotizador_peticion_segundos_count{vista="cotizacion-detail",metodo="GET"} 2', texto)
+        self.assertIn('cotizador_peticion_segundos_bucket{vista="cotizacion-detail",metodo="GET",le="+Inf"} 2',
+                      texto)
+        self.assertIn('cotizador_peticiones_total{vista="cotizacion-list",metodo="POST",estado="201"} 1',
+                      texto)
+        self.assertRegex(texto, r'cotizador_consultas_sql_total\{vista="cotizacion-detail"\} [1-9]')
+        self.assertRegex(texto, r'cotizador_tramo_segundos_total\{vista="cotizacion-detail",tramo="serializacion"\} ')
+
+    def test_token(self):
+        # Sin token configurado no se publican.
+        with override_settings(METRICAS={**settings.METRICAS, 'TOKEN': ''}):
+            self.assertEqual(self.client.get(reverse('metricas')).status_code,
+                             status.HTTP_404_NOT_FOUND)
+        with override_settings(METRICAS={**settings.METRICAS, 'TOKEN': 'secreto'}):
+            self.assertEqual(self.client.get(reverse('metricas')).status_code,
+                             status.HTTP_403_FORBIDDEN)
+            self.assertEqual(self.client.get(reverse('metricas'),
+                                             HTTP_AUTHORIZATION='Bearer otro').status_code,
+                             status.HTTP_403_FORBIDDEN)
+            response = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_medir_fuera_de_peticion(self):
+        metricas.registro.reiniciar()
+        with metricas.medir('pdf'):
+            pass
+        self.assertNotIn('tramo=', metricas.registro.texto())
+
+
+class GeneracionDatosTests(APITestCase):
+    """
+    Verifica el comando `generar_datos` de datos sintéticos.
+    """
+
+    def _generar(self, **opciones):
+        salida = StringIO()
+        call_command('generar_datos', stdout=salida, **{
+            'usuarios': 3, 'categorias': 2, 'productos': 20, 'cotizaciones': 30,
+            'detalles': 4, **opciones})
+        return salida.getvalue()
+
+    def test_genera_datos_coherentes(self):
+        salida = self._generar(dias=10)
+        self.assertIn("30 cotizaciones, 120 detalles", salida)
+        self.assertEqual(
+            (CustomUser.objects.count(), Categoria.objects.count(), Producto.objects.count()),
+            (3, 2, 20))
+        self.assertEqual(DetalleFactura.objects.count(), 120)
+        # Cada cotización usa productos distintos.
+        self.assertFalse(DetalleFactura.objects.values('cotizacion', 'producto')
+                         .annotate(n=Count('id')).filter(n__gt=1).exists())
+        call_command('recalcular_totales', '--verificar', stdout=StringIO())
+        hace_diez_dias = timezone.now() - timedelta(days=10, minutes=1)
+        self.assertFalse(Cotizacion.objects.filter(fecha__lt=hace_diez_dias).exists())
+        self.assertGreater(Cotizacion.objects.values('fecha__date').distinct().count(), 1)
+
+        # El resumen de ventas queda reconstruido.
+        self.assertEqual(
+            VentaDiariaProducto.objects.aggregate(total=Sum('cantidad'))['total'],
+            DetalleFactura.objects.aggregate(total=Sum('cantidad'))['total'])
+
+        user = CustomUser.objects.first()
+        self.assertTrue(user.check_password(datos_sinteticos.CONTRASENA))
+        numero, digito = user.rut.split('-')
+        self.assertEqual(datos_sinteticos.digito_verificador(int(numero)), digito)
+
+    def test_no_modifica_el_modelo(self):
+        # Las fechas se asignan después de insertar: `auto_now_add` sigue
+        # activo para las cotizaciones creadas a la vez en el mismo proceso.
+        campo = Cotizacion._meta.get_field('fecha')
+        original = QuerySet.bulk_create
+        activos = []
+
+        def bulk_create(queryset, *args, **kwargs):
+            activos.append(campo.auto_now_add)
+            return original(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', autospec=True, side_effect=bulk_create):
+            self._generar(dias=30)
+        self.assertTrue(activos)
+        self.assertTrue(all(activos))
+        hace_un_dia = timezone.now() - timedelta(days=1)
+        self.assertTrue(Cotizacion.objects.filter(fecha__lt=hace_un_dia).exists())
+
+    def test_reproducible_y_acumulable(self):
+        self._generar(semilla=7)
+        precios = list(Producto.objects.order_by('id').values_list('precio', flat=True))
+        self._generar(semilla=7)
+        self.assertEqual(CustomUser.objects.count(), 6)
+        self.assertEqual(Categoria.objects.count(), 4)
+        self.assertEqual(Cotizacion.objects.count(), 60)
+        self.assertEqual(
+            list(Producto.objects.order_by('id').values_list('precio', flat=True)[20:]), precios)
+
+    def test_escala_y_errores(self):
+        with mock.patch.dict('CotizadorApp.management.commands.generar_datos.ESCALAS',
+                             {'pequena': (1, 1, 5, 2, 3)}):
+            call_command('generar_datos', '--escala', 'pequena', stdout=StringIO())
+        self.assertEqual(DetalleFactura.objects.count(), 6)
+        with self.assertRaises(CommandError):
+            self._generar(usuarios=0, cotizaciones=5)
+        with self.assertRaises(CommandError):
+            self._generar(productos=-1)
+
+    def test_digito_verificador(self):
+        self.assertEqual(datos_sinteticos.digito_verificador(11111111), '1')
+        self.assertEqual(datos_sinteticos.digito_verificador(12345678), '5')
+        self.assertEqual(datos_sinteticos.digito_verificador(10000013), 'K')
+
+
+def _urls_descargas_asincronas():
+    """
+    URLconf del proyecto con las descargas envueltas, como bajo `asgi.py`.
+    """
+    from Cotizador import urls as urls_proyecto
+    from . import urls as urls_app
+    modulo = types.ModuleType('urls_descargas_asincronas')
+    modulo.urlpatterns = [
+        path('api/', include(envolver(urls_app.urlpatterns, urls_app.DESCARGAS))),
+        *envolver(urls_proyecto.urlpatterns, ('export-cotizaciones', 'export-cotizacion-pdf')),
+    ]
+    return modulo
+
+
+class DescargasAsincronasTests(APITransactionTestCase):
+    """
+    Verifica que las descargas envueltas en `vista_asincrona` se sirvan como
+    streaming asíncrono con el mismo contenido que las vistas síncronas. Las
+    vistas corren en los hilos del pool, con otra conexión a la base de datos,
+    por eso los datos se confirman (APITransactionTestCase).
+    """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = override_settings(
+            PDF_CACHE={'DIRECTORIO': directorio.name, 'MAX_BYTES': 10 * 1024 * 1024})
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.user = CustomUser.objects.create_user(
+            username='cliente', password='secreta123', email='cliente@example.com',
+            rut='11111111-1', telefono='912345678', first_name='Ana', last_name='Pérez')
+        self.token = str(AccessToken.for_user(self.user))
+        self.urls = _urls_descargas_asincronas()
+        producto = Producto.objects.create(nombre='Martillo', precio=Decimal('10.50'), stock=10)
+        self.cotizacion = Cotizacion.objects.create(user=self.user)
+        DetalleFactura.objects.create(cotizacion=self.cotizacion, producto=producto,
+                                      cantidad=3, precio_unitario=Decimal('10.50'))
+
+    def _asincrona(self, url, token=True):
+        async def descargar():
+            headers = {'Authorization': f'Bearer {self.token}'} if token else {}
+            response = await self.async_client.get(url, headers=headers)
+            if not response.streaming:
+                return response, response.content
+            return response, b''.join([bloque async for bloque in response.streaming_content])
+
+        with override_settings(ROOT_URLCONF=self.urls):
+            return async_to_sync(descargar)()
+
+    def _sincrona(self, url):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_exportaciones(self):
+        for url in (f"{reverse('cotizacion-exportar-a-excel-cotizaciones')}?format=csv",
+                    f"{reverse('cotizacion-exportar-a-excel-cotizaciones')}?format=ndjson",
+                    f"{reverse('export-cotizaciones')}?format=csv",
+                    f"{reverse('producto-exportar-a-excel-productos')}?format=ndjson"):
+            response, contenido = self._asincrona(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.is_async)
+            self.assertIn('attachment; filename=', response['Content-Disposition'])
+            self.assertEqual(contenido, self._sincrona(url))
+
+        response, contenido = self._asincrona(reverse('export-cotizaciones'))
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        self.assertEqual(int(response['Content-Length']), len(contenido))
+        hoja = load_workbook(BytesIO(contenido)).active
+        self.assertEqual(hoja.cell(row=2, column=1).value, self.cotizacion.id)
+
+    def test_pdf(self):
+        for url in (reverse('cotizacion-descargar-pdf', args=[self.cotizacion.id]),
+                    reverse('export-cotizacion-pdf', kwargs={'pk': self.cotizacion.id})):
+            response, contenido = self._asincrona(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.is_async)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertTrue(contenido.startswith(b'%PDF'))
+            self.assertEqual(contenido, self._sincrona(url))
+            # Las métricas suman las consultas hechas en el hilo del pool.
+            self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="[1-9]\d* consultas"')
+
+        response, contenido = self._asincrona(reverse('cotizacion-descargar-pdfs'))
+        self.assertTrue(response.is_async)
+        with zipfile.ZipFile(BytesIO(contenido)) as archivo_zip:
+            self.assertEqual(len(archivo_zip.namelist()), 1)
+
+    def test_generador_se_envia_por_bloques(self):
+        recibido = threading.Event()
+        hilos = []
+
+        def partes():
+            hilos.append(threading.get_ident())
+            yield b'primero'
+            hilos.append(threading.get_ident())
+            # Solo sigue cuando el cliente ya recibió el primer bloque.
+            yield b'segundo' if recibido.wait(5) else b'sin streaming'
+
+        vista = vista_asincrona(lambda request: StreamingHttpResponse(partes()))
+
+        async def descargar():
+            response = await vista(RequestFactory().get('/'))
+            bloques = []
+            async for bloque in response.streaming_content:
+                bloques.append(bloque)
+                recibido.set()
+            return bloques
+
+        self.assertEqual(async_to_sync(descargar)(), [b'primero', b'segundo'])
+        # El cursor de un generador no puede cambiar de hilo.
+        self.assertEqual(len(set(hilos)), 1)
+        self.assertNotIn(threading.get_ident(), hilos)
+
+    def test_cuerpo_no_leido_libera_el_hilo(self):
+        cerrado = threading.Event()
+
+        class Partes:
+            def __iter__(self):
+                yield b'nunca'
+
+            def close(self):
+                cerrado.set()
+
+        vista = vista_asincrona(lambda request: StreamingHttpResponse(Partes()))
+
+        async def descartar():
+            for _ in range(2):
+                # Con un solo hilo, la segunda espera a que se libere el primero.
+                await asyncio.wait_for(vista(RequestFactory().get('/')), 5)
+
+        with override_settings(DESCARGAS_ASINCRONAS={'ACTIVAS': True, 'HILOS': 1}):
+            async_to_sync(descartar)()
+        self.assertTrue(cerrado.wait(5))
+
+    def test_respuestas_sin_archivo(self):
+        url = reverse('cotizacion-descargar-pdf', args=[self.cotizacion.id])
+        response, _ = self._asincrona(url, token=False)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        otro = CustomUser.objects.create_user(
+            username='otro', password='secreta123', email='otro@example.com',
+            rut='22222222-2', telefono='912345678')
+        ajena = Cotizacion.objects.create(user=otro)
+        response, _ = self._asincrona(reverse('cotizacion-descargar-pdf', args=[ajena.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(response.streaming)
@@ -1,9 +1,25 @@
+from django.conf import settings
 from rest_framework.routers import DefaultRouter
-from .views import CotizacionViewSet, UserViewSet, ProductoViewSet, CategoriaViewSet
+from .descargas_asincronas import envolver
+from .views import (
+    CotizacionViewSet, UserViewSet, ProductoViewSet, CategoriaViewSet,
+    TrabajoExportacionViewSet, ReporteVentasViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'cotizaciones', CotizacionViewSet, basename='cotizacion')
 router.register(r'usuarios', UserViewSet, basename='usuario')
 router.register(r'productos', ProductoViewSet, basename='producto')
 router.register(r'categorias', CategoriaViewSet, basename='categoria')
+router.register(r'exportaciones', TrabajoExportacionViewSet, basename='exportacion')
+router.register(r'reportes/ventas', ReporteVentasViewSet, basename='reporte-ventas')
 urlpatterns = router.urls
+
+# Rutas de descarga que se sirven como streaming asíncrono bajo ASGI.
+DESCARGAS = (
+    'cotizacion-descargar-pdf', 'cotizacion-descargar-pdfs',
+    'cotizacion-exportar-a-excel-cotizaciones', 'usuario-exportar-a-excel-usuarios',
+    'producto-exportar-a-excel-productos', 'exportacion-descargar',
+)
+if settings.DESCARGAS_ASINCRONAS['ACTIVAS']:
+    urlpatterns = envolver(urlpatterns, DESCARGAS)
@@ -1,130 +1,269 @@
 from io import BytesIO
-from decimal import Decimal
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.platypus import (
-    Table, TableStyle, SimpleDocTemplate, Paragraph, Spacer
+    Flowable, Table, TableStyle, SimpleDocTemplate, Paragraph, Spacer
 )
 from reportlab.lib.styles import getSampleStyleSheet
 
+from .metricas import medido
+
+# Cambia cuando cambia el diseño del PDF, para no servir PDF cacheados con
+# el diseño anterior (ver `pdf_cache.clave`).
+FORMATO_PDF = 3
+
+# Alto fijo de las filas de productos: permite calcular cuántas caben en cada
+# página sin medir la tabla completa.
+ALTO_FILA = 18
+
+ENCABEZADOS_PRODUCTOS = ["Descripción", "Unidades", "Precio Unitario", "Precio Total"]
+ANCHOS_PRODUCTOS = [200, 80, 100, 100]
+
+# Estilos construidos una vez por proceso y compartidos por todos los PDF.
+ESTILOS = getSampleStyleSheet()
+
+ESTILO_CLIENTE = TableStyle([
+    ('BOX', (0, 0), (-1, -1), 0, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+])
+
+ESTILO_PRODUCTOS = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+])
+
+# Última fila de las páginas que no terminan la tabla: suma acumulada.
+ESTILO_ACUMULADO = TableStyle([
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.whitesmoke),
+    ('SPAN', (0, -1), (-2, -1)),
+    ('ALIGN', (0, -1), (-2, -1), 'RIGHT'),
+])
+
+ESTILO_TOTALES = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('TEXTCOLOR', (0, 0), (0, -2), colors.black),
+    ('TEXTCOLOR', (0, -1), (-1, 0), colors.black),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+])
+
 
 def generar_pdf(cotizacion):
     """
     Genera un archivo PDF con una factura a partir del objeto `cotizacion`.
 
     Args:
-        cotizacion: Objeto con los atributos necesarios como `id`, `fecha`,
-                    `nombre`, `email`, `detalles`, `cantidad`, `precio`.
+        cotizacion: Instancia de `Cotizacion` con su usuario y detalles.
 
     Returns:
         BytesIO: Contenido del PDF generado en un buffer en memoria.
     """
+    return BytesIO(renderizar_pdf(datos_pdf(cotizacion)))
+
+
+def datos_pdf(cotizacion):
+    """
+    Extrae de `cotizacion` todo lo que imprime el PDF como tipos simples.
+
+    El resultado se puede enviar a otro proceso (no depende del ORM), lo que
+    permite renderizar varias cotizaciones en paralelo con `renderizar_pdf`.
+
+    Returns:
+        dict: Datos del cliente, líneas de detalle y totales.
+    """
+    user = cotizacion.user
+    return {
+        'id': cotizacion.id,
+        'fecha': cotizacion.fecha.strftime("%d/%m/%Y"),
+        'nombre': user.first_name + " " + user.last_name,
+        'email': user.email,
+        'telefono': user.telefono,
+        'rut': user.rut,
+        'detalles': [
+            (detalle.producto.nombre if detalle.producto else "Producto eliminado",
+             detalle.cantidad, detalle.precio_unitario, detalle.precio_total)
+            for detalle in cotizacion.detalles.all()
+        ],
+        'subtotal': cotizacion.subtotal,
+        'iva': cotizacion.iva,
+        'total': cotizacion.total,
+    }
+
+
+@medido('pdf')
+def renderizar_pdf(datos):
+    """
+    Renderiza el PDF a partir de los datos devueltos por `datos_pdf`.
+
+    La tabla de productos se arma página por página (ver `TablaProductos`),
+    con el encabezado repetido, la suma acumulada al pie de cada página que
+    no la termina y el número de página, así que el costo crece en forma
+    lineal con las líneas de la cotización.
+
+    Returns:
+        bytes: Contenido del PDF.
+    """
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
     elements = []
 
     # Secciones del PDF
-    elements.append(Paragraph("<b>Cotización</b>", styles['Title']))
+    elements.append(Paragraph("<b>Cotización</b>", ESTILOS['Title']))
     elements.append(Spacer(1, 12))
 
-    elements.append(_crear_tabla_cliente(cotizacion))
+    elements.append(_crear_tabla_cliente(datos))
     elements.append(Spacer(1, 20))
 
-    elements.append(_crear_tabla_productos(cotizacion))
+    elements.append(_crear_tabla_productos(datos['detalles']))
     elements.append(Spacer(1, 20))
 
-    elements.append(_crear_tabla_totales(cotizacion))
+    elements.append(_crear_tabla_totales(datos))
     elements.append(Spacer(1, 20))
 
-    elements.append(Paragraph("Gracias por su compra!", styles['title']))
+    elements.append(Paragraph("Gracias por su compra!", ESTILOS['title']))
     elements.append(Spacer(1, 20))
 
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+    def pie(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, doc.bottomMargin / 2,
+                               f"Cotización N° {datos['id']} - Página {doc.page}")
+        canvas.restoreState()
+
+    doc.build(elements, onFirstPage=pie, onLaterPages=pie)
+    return buffer.getvalue()
 
 def formato_pesos(valor):
     return "$ {:,.2f}".format(valor).replace(",", "X").replace(".", ",").replace("X", ".")
 
-def _crear_tabla_cliente(cotizacion):
+def _crear_tabla_cliente(datos_cotizacion):
     datos = [
-        ["Nro de factura:", str(cotizacion.id)],
-        ["Fecha de factura:", cotizacion.fecha.strftime("%d/%m/%Y")],
-        ["Nombre:", cotizacion.user.first_name + " " + cotizacion.user.last_name],
-        ["Email:", cotizacion.user.email],
-        ["Teléfono:", cotizacion.user.telefono],
-        ["RUT:", cotizacion.user.rut]
+        ["Nro de factura:", str(datos_cotizacion['id'])],
+        ["Fecha de factura:", datos_cotizacion['fecha']],
+        ["Nombre:", datos_cotizacion['nombre']],
+        ["Email:", datos_cotizacion['email']],
+        ["Teléfono:", datos_cotizacion['telefono']],
+        ["RUT:", datos_cotizacion['rut']]
     ]
     tabla = Table(datos, colWidths=[150, 330])
-    tabla.setStyle(TableStyle([
-        ('BOX', (0, 0), (-1, -1), 0, colors.black),
-        ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    tabla.setStyle(ESTILO_CLIENTE)
     return tabla
 
 
-def _crear_tabla_productos(cotizacion):
+class TablaProductos(Flowable):
     """
-    Crea una tabla con los productos asociados a la cotización.
+    Tabla de productos que se divide en una `Table` por página.
 
-    Returns:
-        Table: Tabla con productos, cantidades y precios.
+    Una sola `Table` con miles de filas se vuelve a medir y a copiar en cada
+    salto de página (costo cuadrático). Aquí las filas tienen alto fijo, así
+    que al dividirse se calcula cuántas caben en el espacio disponible y solo
+    se arma la `Table` de esa página, con el encabezado y, si la tabla sigue
+    en la página siguiente, una fila con la suma acumulada hasta ahí. El resto
+    queda como otra `TablaProductos` que comparte la lista de detalles.
+
+    Args:
+        detalles: Tuplas (producto, cantidad, precio unitario, precio total).
+        inicio: Primer detalle que falta por dibujar.
+        acumulado: Suma de los precios totales de los detalles anteriores.
     """
-    headers = ["Descripción", "Unidades", "Precio Unitario", "Precio Total"]
-    filas = [headers]
 
-    for detalle in cotizacion.detalles.all():
+    def __init__(self, detalles, inicio=0, acumulado=0):
+        super().__init__()
+        # Centrada como las demás tablas (`Table` se centra por defecto).
+        self.hAlign = 'CENTER'
+        self.detalles = detalles
+        self.inicio = inicio
+        self.acumulado = acumulado
+
+    def _alto(self, filas):
+        return filas * ALTO_FILA
+
+    def wrap(self, availWidth, availHeight):
+        # Alto si lo que falta cupiera en una sola tabla.
+        self.width = sum(ANCHOS_PRODUCTOS)
+        self.height = self._alto(len(self.detalles) - self.inicio + 1)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        # Encabezado, al menos una línea y la fila de suma acumulada.
+        cantidad = int(availHeight // ALTO_FILA) - 2
+        if cantidad < 1:
+            return []
+        fin = self.inicio + cantidad
+        acumulado = self.acumulado + sum(detalle[3] for detalle in self.detalles[self.inicio:fin])
+        return [
+            _tabla_productos(self.detalles[self.inicio:fin], acumulado),
+            TablaProductos(self.detalles, fin, acumulado),
+        ]
+
+    def draw(self):
+        tabla = _tabla_productos(self.detalles[self.inicio:])
+        tabla.wrapOn(self.canv, self.width, self.height)
+        tabla.drawOn(self.canv, 0, 0)
+
+
+def _tabla_productos(detalles, acumulado=None):
+    """
+    `Table` de una página de productos; con `acumulado`, agrega la fila de la
+    suma acumulada.
+    """
+    filas = [ENCABEZADOS_PRODUCTOS]
+    for producto, cantidad, precio_unitario, precio_total in detalles:
         filas.append([
-            detalle.producto.nombre if detalle.producto else "Producto eliminado",
-            detalle.cantidad,
-            f"{formato_pesos(detalle.precio_unitario)}",
-            f"{formato_pesos(detalle.precio_total)}"
+            producto,
+            cantidad,
+            f"{formato_pesos(precio_unitario)}",
+            f"{formato_pesos(precio_total)}"
         ])
+    if acumulado is not None:
+        filas.append(["Suma acumulada (continúa en la página siguiente):", "", "",
+                      formato_pesos(acumulado)])
 
-    tabla = Table(filas, colWidths=[200, 80, 100, 100])
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold')
-    ]))
+    tabla = Table(filas, colWidths=ANCHOS_PRODUCTOS, rowHeights=ALTO_FILA)
+    tabla.setStyle(ESTILO_PRODUCTOS)
+    if acumulado is not None:
+        tabla.setStyle(ESTILO_ACUMULADO)
     return tabla
 
 
+def _crear_tabla_productos(detalles):
+    """
+    Crea la tabla con los productos de los detalles de una cotización.
+
+    Args:
+        detalles: Tuplas (producto, cantidad, precio unitario, precio total).
+
+    Returns:
+        TablaProductos: Tabla con productos, cantidades y precios, paginada.
+    """
+    return TablaProductos(list(detalles))
 
-def _crear_tabla_totales(cotizacion):
+
+def _crear_tabla_totales(datos):
     """
-    Calcula los totales e IVA de todos los productos en la cotización.
+    Muestra los totales e IVA persistidos en la cotización.
 
     Returns:
         Table: Tabla de totales.
     """
-    subtotal = sum([detalle.precio_total for detalle in cotizacion.detalles.all()])
-    iva = subtotal * Decimal("0.19")
-    total = subtotal + iva
-
     datos_totales = [
-        ["Subtotal:", f"{formato_pesos(subtotal)}"],
-        ["IVA (19%):", f"{formato_pesos(iva)}"],
-        ["Total:", f"{formato_pesos(total)}"]
+        ["Subtotal:", f"{formato_pesos(datos['subtotal'])}"],
+        ["IVA (19%):", f"{formato_pesos(datos['iva'])}"],
+        ["Total:", f"{formato_pesos(datos['total'])}"]
     ]
 
     tabla = Table(datos_totales, colWidths=[250, 100])
-    tabla.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('TEXTCOLOR', (0, 0), (0, -2), colors.black),
-        ('TEXTCOLOR', (0, -1), (-1, 0), colors.black),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-    ]))
+    tabla.setStyle(ESTILO_TOTALES)
     return tabla
@@ -1,44 +1,80 @@
-from django.http import FileResponse, HttpResponse
+import os
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, filters
+from django.http import FileResponse
+from rest_framework import mixins, status, viewsets, filters
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
-from .models import Cotizacion, CustomUser, Categoria, Producto
-from .serializers import CotizacionSerializer, CustomUserSerializer, CategoriaSerializer, ProductoSerializer
-from .utils import generar_pdf
-import pandas as pd
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from .models import (
+    Cotizacion, CustomUser, Categoria, Producto, TrabajoExportacion, prefetch_detalles,
+)
+from .serializers import (
+    CotizacionSerializer, CustomUserSerializer, CategoriaSerializer, ProductoSerializer,
+    TrabajoExportacionSerializer, FiltroReporteVentasSerializer, VentasMensualesSerializer,
+    VentasPorCategoriaSerializer, VentasPorProductoSerializer,
+)
+from . import alta_usuarios, autenticacion, cache_catalogo, condicional, importacion, jobs, resumen_ventas, stock
+from .cache_catalogo import CacheCatalogoMixin
+from .busqueda import BusquedaProductosFilter
+from .lectura import (
+    CAMPOS_COTIZACION, CAMPOS_PRODUCTO, CAMPOS_USUARIO, ListadoRapidoMixin,
+    listado_cotizaciones, listado_productos, listado_usuarios,
+)
+from .pdf_cache import respuesta_pdf
+from .pdf_lote import respuesta_zip
+from .exportacion_columnar import respuesta_cotizaciones
+from .exporters import exportacion_productos, exportacion_usuarios, respuesta_exportacion
+from .renderers import EXPORT_RENDERERS, EXPORT_RENDERERS_COTIZACIONES, ExportContentNegotiation
 
 
-class CotizacionViewSet(viewsets.ModelViewSet):
+class CotizacionViewSet(ListadoRapidoMixin, viewsets.ModelViewSet):
     """
     ViewSet para manejar cotizaciones:
     - CRUD
-    - Filtros por usuario, fecha, búsqueda y orden
-    - Exportación a PDF y Excel
+    - Filtros por usuario, fecha, total, búsqueda y orden
+    - Exportación a PDF (individual o en lote como ZIP) y Excel
     """
     permission_classes = [IsAuthenticated]
     serializer_class = CotizacionSerializer
     filter_backends = [DjangoFilterBackend,
                        filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = {'total': ['gte', 'lte']}
     search_fields = ['detalles__producto__nombre']
-    ordering_fields = ['id', 'fecha']
+    ordering_fields = ['id', 'fecha', 'total']
     ordering = ['-fecha']
+    campos_listado = CAMPOS_COTIZACION
+    construir_listado = staticmethod(listado_cotizaciones)
 
     def get_queryset(self):
         """
         Devuelve solo las cotizaciones del usuario autenticado.
         """
         user = self.request.user
-        queryset = Cotizacion.objects.filter(user=user)
+        queryset = Cotizacion.objects.del_usuario(user)
+        if self.action in ('retrieve', 'descargar_pdf'):
+            # Los detalles solo se cargan si hay que serializar o generar el
+            # PDF (no ante un 304 ni con el PDF en caché).
+            queryset = queryset.select_related('user')
+        elif not (self.action == 'list' and self.listado_rapido):
+            # El listado rápido lee los detalles por su cuenta.
+            queryset = queryset.con_detalles()
+        if self.action in ('descargar_pdf', 'descargar_pdfs'):
+            # Parte de la clave de la caché de PDF, en la misma consulta.
+            queryset = queryset.con_version_catalogo()
 
-        start = self.request.query_params.get('start_date')
-        end = self.request.query_params.get('end_date')
-        if start:
-            queryset = queryset.filter(fecha__date__gte=start)
-        if end:
-            queryset = queryset.filter(fecha__date__lte=end)
-        return queryset
+        try:
+            return queryset.entre_fechas(
+                self.request.query_params.get('start_date'),
+                self.request.query_params.get('end_date'))
+        except DjangoValidationError as exc:
+            raise ValidationError({'detail': exc.messages})
 
     def perform_create(self, serializer):
         """
@@ -49,49 +85,65 @@ class CotizacionViewSet(viewsets.ModelViewSet):
             cotizacion.fecha = timezone.now()
             cotizacion.save()
 
+    def list(self, request, *args, **kwargs):
+        """
+        Listado con ETag: responde 304 si no cambió ninguna cotización.
+        """
+        return condicional.responder_listado(
+            request, self.filter_queryset(self.get_queryset()),
+            lambda: super(CotizacionViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Detalle con ETag y Last-Modified: responde 304 sin serializar.
+        """
+        cotizacion = self.get_object()
+
+        def generar():
+            prefetch_related_objects([cotizacion], prefetch_detalles())
+            return Response(self.get_serializer(cotizacion).data)
+
+        return condicional.responder_cotizacion(request, cotizacion, generar)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Libera el stock reservado por la cotización antes de eliminarla.
+        """
+        stock.liberar(stock.cantidades_reservadas(instance))
+        instance.delete()
+
     @action(detail=True, methods=['get'])
     def descargar_pdf(self, request, pk=None):
         """
-        Devuelve un archivo PDF de la cotización.
+        Devuelve un archivo PDF de la cotización (desde la caché si está
+        vigente, o 304 si el cliente ya lo tiene).
         """
         cotizacion = self.get_object()
-        buffer = generar_pdf(cotizacion)
-        return FileResponse(buffer, as_attachment=True, filename=f'cotizacion_{cotizacion.id}.pdf')
+        return condicional.responder_pdf(request, cotizacion, lambda: respuesta_pdf(cotizacion))
+
+    @action(detail=False, methods=['get'])
+    def descargar_pdfs(self, request):
+        """
+        Devuelve un ZIP con el PDF de cada cotización que cumple los filtros
+        del listado (start_date, end_date, search, total__gte/lte).
+        """
+        return respuesta_zip(self.filter_queryset(self.get_queryset()))
 
-    @action(detail=False, methods=["get"])
+    @action(detail=False, methods=["get"], renderer_classes=EXPORT_RENDERERS_COTIZACIONES,
+            content_negotiation_class=ExportContentNegotiation)
     def exportar_a_excel_cotizaciones(self, request):
         """
-        Exporta todas las cotizaciones del usuario autenticado a un archivo Excel.
-        """
-        queryset = self.get_queryset()
-        data = []
-
-        for c in queryset:
-            for detalle in c.detalles.all():
-                data.append({
-                    "ID Cotización": c.id,
-                    "Fecha": c.fecha.strftime("%d-%m-%Y"),
-                    "Cliente": f"{c.user.first_name} {c.user.last_name}",
-                    "Email": c.user.email,
-                    "Producto": detalle.producto.nombre if detalle.producto else "Eliminado",
-                    "Cantidad": detalle.cantidad,
-                    "Precio Unitario": float(detalle.precio_unitario),
-                    "Precio Total": float(detalle.precio_total),
-                })
-
-        df = pd.DataFrame(data)
-        file_name = "cotizaciones.xlsx"
-        with pd.ExcelWriter(file_name, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name="Cotizaciones")
-
-        with open(file_name, "rb") as f:
-            response = HttpResponse(f.read(
-            ), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-            return response
-
-
-class UserViewSet(viewsets.ModelViewSet):
+        Exporta todas las cotizaciones del usuario autenticado a Excel
+        (o a CSV/NDJSON/Parquet/Arrow con `?format=csv|ndjson|parquet|arrow`).
+        """
+        cotizaciones = self.get_queryset()
+        formato = request.accepted_renderer.format
+        return condicional.responder_listado(
+            request, cotizaciones, lambda: respuesta_cotizaciones(cotizaciones, formato), formato)
+
+
+class UserViewSet(ListadoRapidoMixin, viewsets.ModelViewSet):
     """
     ViewSet para la gestión de usuarios personalizados.
     Soporta filtrado, búsqueda, ordenamiento y exportación.
@@ -104,75 +156,172 @@ class UserViewSet(viewsets.ModelViewSet):
     search_fields = ['first_name', 'last_name', 'email', 'rut']
     ordering_fields = ['id', 'first_name', 'last_name']
     ordering = ['id']
+    campos_listado = CAMPOS_USUARIO
+    construir_listado = staticmethod(listado_usuarios)
 
-    @action(detail=False, methods=['get'])
-    def exportar_a_excel_usuarios(self, request):
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def alta_masiva(self, request):
         """
-        Exporta todos los usuarios a un archivo Excel.
+        Crea en bloque la lista de usuarios recibida (solo administradores).
+        Responde los usuarios creados y los errores por índice de la lista.
         """
-        queryset = self.get_queryset()
-        data = [{
-            "ID": user.id,
-            "Nombre": user.first_name,
-            "Apellido": user.last_name,
-            "RUT": user.rut,
-            "Email": user.email,
-        } for user in queryset]
+        filas = request.data
+        maximo = settings.ALTA_USUARIOS['MAX_FILAS']
+        if not isinstance(filas, list) or not filas:
+            raise ValidationError({'non_field_errors': ["Se espera una lista de usuarios."]})
+        if len(filas) > maximo:
+            raise ValidationError({'non_field_errors': [
+                f"Se admiten como máximo {maximo} usuarios por petición."]})
+        return Response(alta_usuarios.crear_usuarios(filas).como_dict())
 
-        df = pd.DataFrame(data)
-        file_name = "usuarios.xlsx"
-        with pd.ExcelWriter(file_name, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name="Usuarios")
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def estadisticas_autenticacion(self, request):
+        """
+        Aciertos y fallos del caché de usuarios autenticados (solo administradores).
+        """
+        return Response(autenticacion.estadisticas())
 
-        with open(file_name, "rb") as f:
-            response = HttpResponse(f.read(
-            ), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-            return response
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS,
+            content_negotiation_class=ExportContentNegotiation)
+    def exportar_a_excel_usuarios(self, request):
+        """
+        Exporta todos los usuarios a Excel (o a CSV/NDJSON con `?format=csv|ndjson`).
+        """
+        return respuesta_exportacion(exportacion_usuarios(self.get_queryset()),
+                                     request.accepted_renderer.format)
 
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(CacheCatalogoMixin, viewsets.ModelViewSet):
     """
-    ViewSet para gestionar categorías.
+    ViewSet para gestionar categorías (listado y detalle cacheados).
     """
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
 
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(CacheCatalogoMixin, ListadoRapidoMixin, viewsets.ModelViewSet):
     """
-    ViewSet para gestionar productos con filtro y exportación a Excel.
+    ViewSet para gestionar productos con filtro, búsqueda de texto completo
+    (ordenada por relevancia), listado y detalle cacheados, exportación a
+    Excel e importación masiva.
     """
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
     filter_backends = [DjangoFilterBackend,
-                       filters.SearchFilter, filters.OrderingFilter]
+                       BusquedaProductosFilter, filters.OrderingFilter]
     filterset_fields = ['categoria', 'nombre', 'precio']
     search_fields = ['nombre', 'descripcion']
     ordering_fields = ['id', 'nombre', 'precio']
+    campos_listado = CAMPOS_PRODUCTO
+    construir_listado = staticmethod(listado_productos)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def estadisticas_cache(self, request):
+        """
+        Aciertos y fallos de la caché del catálogo (solo administradores).
+        """
+        return Response(cache_catalogo.estadisticas())
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser],
+            parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Importa productos en bloque desde el archivo CSV o XLSX del campo
+        `archivo` (solo administradores). Las filas con ID actualizan el
+        producto y las demás lo crean; responde los totales y los errores por fila.
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            raise ValidationError({'archivo': ["Debe adjuntar un archivo CSV o XLSX."]})
+        formato = os.path.splitext(archivo.name)[1].lstrip('.').lower()
+        if formato not in importacion.FORMATOS:
+            raise ValidationError({'archivo': ["Formato no soportado; use .csv o .xlsx."]})
+        try:
+            resultado = importacion.importar_productos(importacion.filas_archivo(archivo, formato))
+        except importacion.ArchivoInvalido as exc:
+            raise ValidationError({'archivo': [str(exc)]})
+        return Response(resultado.como_dict())
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS,
+            content_negotiation_class=ExportContentNegotiation)
     def exportar_a_excel_productos(self, request):
         """
-        Exporta todos los productos a un archivo Excel.
-        """
-        queryset = self.get_queryset()
-        data = [{
-            "ID": p.id,
-            "Nombre": p.nombre,
-            "Descripción": p.descripcion,
-            "Precio": float(p.precio),
-            "Categoría": p.categoria.nombre if p.categoria else "Sin categoría",
-            "Stock": p.stock,
-        } for p in queryset]
-
-        df = pd.DataFrame(data)
-        file_name = "productos.xlsx"
-        with pd.ExcelWriter(file_name, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name="Productos")
-
-        with open(file_name, "rb") as f:
-            response = HttpResponse(f.read(
-            ), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-            return response
+        Exporta todos los productos a Excel (o a CSV/NDJSON con `?format=csv|ndjson`).
+        """
+        return respuesta_exportacion(exportacion_productos(self.get_queryset()),
+                                     request.accepted_renderer.format)
+
+
+class TrabajoExportacionViewSet(mixins.CreateModelMixin,
+                                mixins.ListModelMixin,
+                                mixins.RetrieveModelMixin,
+                                viewsets.GenericViewSet):
+    """
+    ViewSet para exportaciones en segundo plano:
+    - POST crea el trabajo (tipo, formato, filtros) y responde 202
+    - GET consulta el estado
+    - `descargar` entrega el archivo cuando está completado
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = TrabajoExportacionSerializer
+
+    def get_queryset(self):
+        """
+        Devuelve solo los trabajos del usuario autenticado.
+        """
+        return TrabajoExportacion.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        trabajo = serializer.save(user=request.user)
+        jobs.encolar(trabajo)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def descargar(self, request, pk=None):
+        """
+        Devuelve el archivo generado por el trabajo.
+        """
+        trabajo = self.get_object()
+        if trabajo.estado != TrabajoExportacion.COMPLETADO:
+            return Response({'detail': f"El trabajo está {trabajo.get_estado_display().lower()}."},
+                            status=status.HTTP_409_CONFLICT)
+        try:
+            archivo = open(jobs.ruta_archivo(trabajo), 'rb')
+        except FileNotFoundError:
+            return Response({'detail': "El archivo ya no está disponible."},
+                            status=status.HTTP_410_GONE)
+        return FileResponse(archivo, as_attachment=True,
+                            filename=os.path.basename(trabajo.archivo))
+
+
+class ReporteVentasViewSet(viewsets.ViewSet):
+    """
+    Reportes de ventas (solo administradores), leídos de los resúmenes
+    diarios. Aceptan `?desde=AAAA-MM-DD&hasta=AAAA-MM-DD`:
+    - `productos`: ventas por producto, de mayor a menor monto
+    - `categorias`: ventas por categoría, de mayor a menor monto
+    - `mensual`: ventas por mes
+    """
+    permission_classes = [IsAdminUser]
+
+    def _reporte(self, request, generar, serializer_class):
+        filtro = FiltroReporteVentasSerializer(data=request.query_params)
+        filtro.is_valid(raise_exception=True)
+        return Response(serializer_class(generar(**filtro.validated_data), many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def productos(self, request):
+        return self._reporte(request, resumen_ventas.ventas_por_producto,
+                             VentasPorProductoSerializer)
+
+    @action(detail=False, methods=['get'])
+    def categorias(self, request):
+        return self._reporte(request, resumen_ventas.ventas_por_categoria,
+                             VentasPorCategoriaSerializer)
+
+    @action(detail=False, methods=['get'])
+    def mensual(self, request):
+        return self._reporte(request, resumen_ventas.ventas_mensuales,
+                             VentasMensualesSerializer)
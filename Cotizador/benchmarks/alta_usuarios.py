@@ -0,0 +1,71 @@
+"""
+Benchmark del alta masiva de usuarios.
+
+Compara la creación uno a uno con `CustomUserSerializer` (validación de
+unicidad por usuario, hash e INSERT por fila) con `crear_usuarios` usando
+uno y varios procesos para los hashes. El costo está dominado por PBKDF2, así
+que la mejora con el pool escala con los núcleos disponibles.
+
+Uso:
+    python -m benchmarks.alta_usuarios --usuarios 500 --procesos 1 4 8
+"""
+import argparse
+import os
+
+from benchmarks.entorno import base_de_datos_temporal, medir
+from django.conf import settings
+from CotizadorApp import alta_usuarios
+from CotizadorApp.serializers import CustomUserSerializer
+
+
+def usuarios(desde, cantidad):
+    return [{'username': f'bench{i}', 'email': f'bench{i}@example.com',
+             'rut': f'{10000000 + i}-{i % 10}', 'telefono': '900000000',
+             'first_name': 'Bench', 'last_name': f'Usuario {i}', 'password': f'clave-{i}'}
+            for i in range(desde, desde + cantidad)]
+
+
+def uno_a_uno(filas):
+    for fila in filas:
+        serializer = CustomUserSerializer(data=fila)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--usuarios", type=int, default=500,
+                        help="Usuarios creados por método.")
+    parser.add_argument("--procesos", type=int, nargs="+",
+                        default=sorted({1, os.cpu_count() or 1}),
+                        help="Cantidades de procesos a medir para los hashes.")
+    args = parser.parse_args()
+
+    print(f"{'método':>20} {'usuarios':>9} {'segundos':>9} {'usuarios/s':>11}")
+
+    def informar(metodo, resultado):
+        print(f"{metodo:>20} {args.usuarios:>9} {resultado['segundos']:>9.2f} "
+              f"{args.usuarios / resultado['segundos']:>11.1f}")
+
+    with base_de_datos_temporal():
+        with medir(memoria=False) as resultado:
+            uno_a_uno(usuarios(0, args.usuarios))
+        informar("serializer por fila", resultado)
+
+        for indice, procesos in enumerate(args.procesos, start=1):
+            settings.ALTA_USUARIOS = {**settings.ALTA_USUARIOS, 'PROCESOS': procesos}
+            if alta_usuarios._pool is not None:
+                alta_usuarios._pool.shutdown()
+                alta_usuarios._pool = None
+            if procesos > 1:
+                # Arranca el pool fuera de la medición.
+                alta_usuarios.hashear(['x'] * alta_usuarios.MINIMO_PARALELO)
+            with medir(memoria=False) as resultado:
+                creados = alta_usuarios.crear_usuarios(
+                    usuarios(indice * args.usuarios, args.usuarios)).creados
+            assert len(creados) == args.usuarios
+            informar(f"masivo {procesos} proc.", resultado)
+
+
+if __name__ == "__main__":
+    main()
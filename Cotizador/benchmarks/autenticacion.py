@@ -0,0 +1,62 @@
+"""
+Benchmark de la autenticación JWT con y sin caché de usuarios.
+
+Autentica repetidamente peticiones con el token de varios usuarios usando
+`JWTAuthentication` de simplejwt (una consulta por petición) y
+`JWTAutenticacionCacheada`, e informa autenticaciones/segundo, consultas y la
+tasa de aciertos del caché.
+
+Uso:
+    python -m benchmarks.autenticacion --peticiones 20000 --usuarios 100
+"""
+import argparse
+
+from benchmarks.entorno import base_de_datos_temporal, crear_usuario, medir
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from CotizadorApp import autenticacion
+
+
+def autenticar(clase, peticiones):
+    instancia = clase()
+    for peticion in peticiones:
+        instancia.authenticate(peticion)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--peticiones", type=int, default=20000,
+                        help="Peticiones autenticadas por clase.")
+    parser.add_argument("--usuarios", type=int, default=100,
+                        help="Usuarios distintos entre los que se reparten las peticiones.")
+    args = parser.parse_args()
+
+    print(f"{'clase':>26} {'peticiones':>11} {'segundos':>9} {'aut./s':>9} "
+          f"{'consultas':>10} {'aciertos':>9}")
+
+    with base_de_datos_temporal():
+        fabrica = APIRequestFactory()
+        tokens = [str(AccessToken.for_user(crear_usuario(f"bench{i}")))
+                  for i in range(args.usuarios)]
+        peticiones = [fabrica.get("/", HTTP_AUTHORIZATION=f"Bearer {tokens[i % args.usuarios]}")
+                      for i in range(args.peticiones)]
+
+        caches[autenticacion.CACHE_ALIAS].clear()
+        autenticacion.reiniciar_estadisticas()
+        for clase in (JWTAuthentication, autenticacion.JWTAutenticacionCacheada):
+            with CaptureQueriesContext(connection) as consultas, \
+                    medir(memoria=False) as resultado:
+                autenticar(clase, peticiones)
+            tasa = (autenticacion.estadisticas()['tasa_aciertos']
+                    if clase is autenticacion.JWTAutenticacionCacheada else None)
+            print(f"{clase.__name__:>26} {args.peticiones:>11} {resultado['segundos']:>9.2f} "
+                  f"{args.peticiones / resultado['segundos']:>9.0f} {len(consultas):>10} "
+                  f"{'-' if tasa is None else f'{tasa:.2%}':>9}")
+
+
+if __name__ == "__main__":
+    main()
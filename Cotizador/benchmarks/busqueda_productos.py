@@ -0,0 +1,96 @@
+"""
+Benchmark de latencia de la búsqueda de productos.
+
+Compara `SearchFilter` (LIKE '%término%' sobre nombre y descripción) con el
+índice de texto completo de `CotizadorApp.busqueda`, pidiendo la primera
+página del listado para términos frecuentes, raros e inexistentes. LIKE debe
+crecer linealmente con el catálogo; el índice, con la cantidad de resultados.
+
+Uso:
+    python -m benchmarks.busqueda_productos --productos 10000 100000 300000
+"""
+import argparse
+import random
+import statistics
+from decimal import Decimal
+
+from benchmarks.entorno import base_de_datos_temporal, medir
+from django.db import connection
+from django.db.models import Q
+from CotizadorApp.busqueda import backend_para
+from CotizadorApp.models import Producto
+
+PAGINA = 50
+LOTE = 10000
+
+PALABRAS = (
+    "martillo taladro tornillo clavo tuerca llave sierra lija pintura brocha "
+    "cemento arena ladrillo cable enchufe ampolleta manguera pala rastrillo "
+    "cinta adhesivo pegamento madera acero plastico goma vidrio cobre bronce"
+).split()
+
+# (etiqueta, término): frecuente, prefijo, dos palabras, raro e inexistente.
+TERMINOS = [
+    ("frecuente", "martillo"),
+    ("prefijo", "tala"),
+    ("dos palabras", "cable cobre"),
+    ("raro", "sku99999"),
+    ("inexistente", "zzzz"),
+]
+
+
+def poblar_catalogo(cantidad, inicio):
+    azar = random.Random(inicio)
+    for desde in range(inicio, inicio + cantidad, LOTE):
+        Producto.objects.bulk_create([
+            Producto(
+                nombre=f"{' '.join(azar.sample(PALABRAS, 2)).capitalize()} sku{i}",
+                descripcion=" ".join(azar.choices(PALABRAS, k=12)),
+                precio=Decimal("9.99"), stock=10)
+            for i in range(desde, min(desde + LOTE, inicio + cantidad))
+        ])
+
+
+def buscar_like(termino):
+    condicion = Q()
+    for palabra in termino.split():
+        condicion &= Q(nombre__icontains=palabra) | Q(descripcion__icontains=palabra)
+    return list(Producto.objects.filter(condicion).order_by('id')[:PAGINA])
+
+
+def buscar_indice(termino):
+    backend = backend_para(connection)
+    return list(backend.buscar(Producto.objects.all(), termino)[:PAGINA])
+
+
+def latencia_ms(buscar, termino, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        with medir(memoria=False) as resultado:
+            buscar(termino)
+        tiempos.append(resultado['segundos'] * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--productos", type=int, nargs="+", default=[10000, 100000],
+                        help="Tamaños del catálogo a medir.")
+    parser.add_argument("--repeticiones", type=int, default=5,
+                        help="Repeticiones por término (se informa la mediana).")
+    args = parser.parse_args()
+
+    with base_de_datos_temporal():
+        print(f"{'productos':>10} {'término':>14} {'LIKE ms':>10} {'índice ms':>10}")
+        for objetivo in sorted(args.productos):
+            actuales = Producto.objects.count()
+            if objetivo > actuales:
+                poblar_catalogo(objetivo - actuales, actuales)
+            for etiqueta, termino in TERMINOS:
+                like = latencia_ms(buscar_like, termino, args.repeticiones)
+                indice = latencia_ms(buscar_indice, termino, args.repeticiones)
+                print(f"{objetivo:>10} {etiqueta:>14} {like:>10.2f} {indice:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Prueba de carga local: muchas descargas simultáneas hacia clientes lentos.
+
+Cada cliente recibe el cuerpo a `--kb-por-segundo` (se simula con una espera
+por bloque recibido). Se comparan tres formas de servir las mismas descargas
+en un solo proceso:
+
+- `wsgi`: un worker síncrono con `--hilos` hilos (como gunicorn con threads):
+  cada descarga ocupa un hilo y una conexión hasta que el cliente termina de
+  recibir, y las demás esperan turno;
+- `asgi`: `ASGIHandler` con las vistas tal cual; Django ejecuta cada vista
+  síncrona en un hilo propio de la petición (con su conexión) y arma el
+  cuerpo completo en memoria antes de enviarlo;
+- `asgi_asincrona`: `ASGIHandler` con las descargas envueltas por
+  `descargas_asincronas` (`--hilos` hilos de descarga: los PDF se leen por
+  bloques sin ocuparlos y el CSV se genera y envía en el hilo reservado).
+
+Informa la duración total, la latencia hasta el primer byte y hasta el final
+(mediana y p95), el máximo de hilos vivos del proceso y las conexiones a la
+base de datos que se abrieron.
+
+Uso:
+    python -m benchmarks.descargas_lentas --clientes 200 --kb-por-segundo 16
+    python -m benchmarks.descargas_lentas --descarga csv --cotizaciones 2000
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import threading
+import time
+import types
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.entorno import base_de_datos_temporal, crear_usuario, poblar
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.test.utils import setup_test_environment
+from django.urls import include, path, reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from Cotizador import urls as urls_proyecto
+from CotizadorApp import descargas_asincronas
+from CotizadorApp import urls as urls_app
+from CotizadorApp.models import Cotizacion
+
+MODOS = ('wsgi', 'asgi', 'asgi_asincrona')
+
+
+def urls_asincronas():
+    modulo = types.ModuleType('urls_descargas_asincronas')
+    modulo.urlpatterns = [
+        path('api/', include(descargas_asincronas.envolver(urls_app.urlpatterns, urls_app.DESCARGAS))),
+        *urls_proyecto.urlpatterns,
+    ]
+    return modulo
+
+
+class Recursos:
+    """
+    Registra el máximo de hilos vivos y las conexiones a la base de datos
+    abiertas mientras está activo.
+    """
+
+    def __init__(self):
+        self.maximo = threading.active_count()
+        self.conexiones = 0
+        self._fin = threading.Event()
+
+    def _contar(self, sender, connection, **kwargs):
+        self.conexiones += 1
+
+    def _muestrear(self):
+        while not self._fin.wait(0.005):
+            self.maximo = max(self.maximo, threading.active_count())
+
+    def __enter__(self):
+        connection_created.connect(self._contar)
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+        connection_created.disconnect(self._contar)
+
+
+def espera(bytes_recibidos, kb_por_segundo):
+    return bytes_recibidos / (kb_por_segundo * 1024)
+
+
+async def cliente_asgi(aplicacion, ruta, consulta, token, kb_por_segundo):
+    inicio = time.perf_counter()
+    resultado = {'estado': None, 'bytes': 0, 'primer_byte': None}
+    solicitado = False
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(),
+        'query_string': consulta.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+
+    async def receive():
+        nonlocal solicitado
+        if not solicitado:
+            solicitado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Event().wait()
+
+    async def send(mensaje):
+        if mensaje['type'] == 'http.response.start':
+            resultado['estado'] = mensaje['status']
+        elif mensaje.get('body'):
+            if resultado['primer_byte'] is None:
+                resultado['primer_byte'] = time.perf_counter() - inicio
+            resultado['bytes'] += len(mensaje['body'])
+            await asyncio.sleep(espera(len(mensaje['body']), kb_por_segundo))
+
+    await aplicacion(scope, receive, send)
+    resultado['total'] = time.perf_counter() - inicio
+    return resultado
+
+
+def correr_asgi(aplicacion, clientes, ruta, consulta, token, kb_por_segundo):
+    async def todos():
+        return await asyncio.gather(*[
+            cliente_asgi(aplicacion, ruta, consulta, token, kb_por_segundo)
+            for _ in range(clientes)])
+    return asyncio.run(todos())
+
+
+def correr_wsgi(clientes, hilos, ruta, consulta, token, kb_por_segundo):
+    aplicacion = WSGIHandler()
+
+    def cliente(llegada):
+        resultado = {'estado': None, 'bytes': 0, 'primer_byte': None}
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': ruta, 'QUERY_STRING': consulta,
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+
+        def start_response(estado, cabeceras):
+            resultado['estado'] = int(estado.split()[0])
+
+        cuerpo = aplicacion(environ, start_response)
+        try:
+            for bloque in cuerpo:
+                if bloque:
+                    if resultado['primer_byte'] is None:
+                        resultado['primer_byte'] = time.perf_counter() - llegada
+                    resultado['bytes'] += len(bloque)
+                    time.sleep(espera(len(bloque), kb_por_segundo))
+        finally:
+            cuerpo.close()
+        resultado['total'] = time.perf_counter() - llegada
+        return resultado
+
+    # Todos los clientes llegan a la vez; los que no tienen hilo esperan.
+    llegada = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(cliente, [llegada] * clientes))
+
+
+def p95(valores):
+    return sorted(valores)[max(int(len(valores) * 0.95) - 1, 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clientes", type=int, default=200,
+                        help="Descargas simultáneas.")
+    parser.add_argument("--kb-por-segundo", type=float, default=16,
+                        help="Velocidad de recepción de cada cliente.")
+    parser.add_argument("--hilos", type=int, default=8,
+                        help="Hilos del worker WSGI y del pool de descargas.")
+    parser.add_argument("--descarga", choices=('pdf', 'csv'), default='pdf',
+                        help="PDF (en caché) de una cotización o exportación CSV de cotizaciones.")
+    parser.add_argument("--lineas", type=int, default=300,
+                        help="Líneas de la cotización del PDF.")
+    parser.add_argument("--cotizaciones", type=int, default=500,
+                        help="Cotizaciones del usuario (exportación CSV).")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    args = parser.parse_args()
+
+    setup_test_environment()
+    # El modo `asgi` avisa en cada descarga que consume el iterador síncrono
+    # completo: es justamente lo que se mide.
+    warnings.filterwarnings('ignore', message='StreamingHttpResponse must consume synchronous')
+    with base_de_datos_temporal():
+        user = crear_usuario()
+        token = str(AccessToken.for_user(user))
+        if args.descarga == 'pdf':
+            poblar(user, 1, args.lineas, productos=max(args.lineas, 1))
+            ruta, consulta = reverse('cotizacion-descargar-pdf',
+                                     args=[Cotizacion.objects.get().id]), ''
+        else:
+            poblar(user, args.cotizaciones, 5)
+            ruta, consulta = reverse('cotizacion-exportar-a-excel-cotizaciones'), 'format=csv'
+
+        settings.DESCARGAS_ASINCRONAS = {**settings.DESCARGAS_ASINCRONAS, 'HILOS': args.hilos}
+        print(f"{args.clientes} clientes a {args.kb_por_segundo:g} KB/s, {args.hilos} hilos, "
+              f"descarga {args.descarga}")
+        print(f"{'modo':>15} {'segundos':>9} {'1er byte p50':>13} {'1er byte p95':>13} "
+              f"{'total p50':>10} {'total p95':>10} {'KB':>7} {'hilos máx.':>10} {'conexiones':>10} "
+              f"{'errores':>8}")
+        for modo in args.modos:
+            # Calentamiento (caché del PDF, del usuario y del pool), fuera de la medición.
+            correr_asgi(ASGIHandler(), 1, ruta, consulta, token, 10 ** 6)
+            with override_settings(ROOT_URLCONF=urls_asincronas()) if modo == 'asgi_asincrona' \
+                    else override_settings():
+                with Recursos() as recursos:
+                    inicio = time.perf_counter()
+                    if modo == 'wsgi':
+                        resultados = correr_wsgi(args.clientes, args.hilos, ruta, consulta,
+                                                 token, args.kb_por_segundo)
+                    else:
+                        resultados = correr_asgi(ASGIHandler(), args.clientes, ruta, consulta,
+                                                 token, args.kb_por_segundo)
+                    segundos = time.perf_counter() - inicio
+            errores = sum(1 for r in resultados if r['estado'] != 200)
+            primeros = [r['primer_byte'] or r['total'] for r in resultados]
+            totales = [r['total'] for r in resultados]
+            print(f"{modo:>15} {segundos:>9.2f} {statistics.median(primeros):>13.2f} "
+                  f"{p95(primeros):>13.2f} {statistics.median(totales):>10.2f} "
+                  f"{p95(totales):>10.2f} {resultados[0]['bytes'] / 1024:>7.0f} "
+                  f"{recursos.maximo:>10} {recursos.conexiones:>10} {errores:>8}", flush=True)
+        # Los hilos de descarga cierran sus conexiones al terminar, antes de
+        # borrar la base temporal.
+        descargas_asincronas.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Utilidades comunes para los benchmarks.
+
+Cada benchmark se ejecuta como script desde el directorio del proyecto
+(`python -m benchmarks.<nombre>`) sobre una base de datos SQLite temporal en
+disco, que se crea con las migraciones y se destruye al terminar.
+"""
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from decimal import Decimal
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Cotizador.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from CotizadorApp.models import (  # noqa: E402
+    Categoria, Cotizacion, CustomUser, DetalleFactura, Producto,
+)
+
+LOTE = 10000
+
+
+@contextmanager
+def base_de_datos_temporal():
+    """
+    Crea una base de datos de prueba en un archivo temporal y la elimina al salir.
+    """
+    directorio = tempfile.mkdtemp(prefix="cotizador-bench-")
+    connection.settings_dict["TEST"]["NAME"] = os.path.join(directorio, "bench.sqlite3")
+    nombre_original = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        # Con WAL quedan los archivos -wal y -shm si otros hilos dejaron
+        # conexiones abiertas.
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def crear_usuario(username="bench"):
+    return CustomUser.objects.create_user(
+        username=username, password="bench1234", email=f"{username}@example.com",
+        rut=f"{abs(hash(username)) % 10 ** 8}-0", telefono="900000000",
+        first_name="Bench", last_name="Mark")
+
+
+def poblar(user, cotizaciones, detalles_por_cotizacion, productos=100):
+    """
+    Inserta en bloque `cotizaciones` cotizaciones de `user` con
+    `detalles_por_cotizacion` detalles cada una.
+    """
+    categoria, _ = Categoria.objects.get_or_create(nombre="Bench")
+    catalogo = Producto.objects.bulk_create([
+        Producto(categoria=categoria, nombre=f"Producto {i}",
+                 precio=Decimal("9.99"), stock=1000)
+        for i in range(productos)
+    ])
+    creadas = 0
+    while creadas < cotizaciones:
+        bloque = min(LOTE // max(detalles_por_cotizacion, 1) or 1,
+                     cotizaciones - creadas)
+        nuevas = Cotizacion.objects.bulk_create(
+            [Cotizacion(user=user) for _ in range(bloque)])
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(cotizacion=cotizacion,
+                           producto=catalogo[(cotizacion.id + i) % productos],
+                           cantidad=1 + i % 5, precio_unitario=Decimal("9.99"))
+            for cotizacion in nuevas
+            for i in range(detalles_por_cotizacion)
+        ], batch_size=LOTE)
+        creadas += bloque
+
+
+@contextmanager
+def medir(memoria=True):
+    """
+    Mide tiempo transcurrido y pico de memoria Python (tracemalloc) del bloque.
+
+    tracemalloc hace bastante más lento el código medido; con `memoria=False`
+    solo se mide el tiempo y `pico_mb` queda en None.
+
+    Yields:
+        dict: Se completa con `segundos` y `pico_mb` al salir del bloque.
+    """
+    resultado = {}
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        yield resultado
+    finally:
+        resultado["segundos"] = time.perf_counter() - inicio
+        resultado["pico_mb"] = None
+        if memoria:
+            resultado["pico_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
@@ -0,0 +1,102 @@
+"""
+Benchmark de escrituras concurrentes sobre SQLite.
+
+Varios hilos, cada uno con su conexión, crean cotizaciones con detalles (una
+transacción por cotización) mientras otros leen el listado. Compara la
+configuración anterior de SQLite (journal DELETE, synchronous FULL, espera de
+5 s) con la de `settings.SQLITE_PRAGMAS` (WAL, synchronous NORMAL,
+busy_timeout) e informa escrituras y lecturas por segundo y cuántas
+operaciones fallaron con "database is locked".
+
+Uso:
+    python -m benchmarks.escrituras_concurrentes --escritores 1 4 8 --lectores 2
+"""
+import argparse
+import threading
+import time
+from decimal import Decimal
+
+from benchmarks.entorno import base_de_datos_temporal, crear_usuario
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from CotizadorApp.models import Cotizacion, DetalleFactura, Producto
+
+CONFIGURACIONES = {
+    'anterior': {'journal_mode': 'DELETE', 'busy_timeout': 5000, 'synchronous': 'FULL'},
+    'settings': dict(settings.SQLITE_PRAGMAS),
+}
+
+
+def escribir(user, productos, hasta, resultado):
+    try:
+        i = 0
+        while time.perf_counter() < hasta:
+            try:
+                with transaction.atomic():
+                    cotizacion = Cotizacion.objects.create(user=user)
+                    for j in range(3):
+                        DetalleFactura.objects.create(
+                            cotizacion=cotizacion, producto=productos[(i + j) % len(productos)],
+                            cantidad=1 + j, precio_unitario=Decimal("9.99"))
+                resultado['escrituras'] += 1
+            except OperationalError:
+                resultado['bloqueos'] += 1
+            i += 1
+    finally:
+        connections.close_all()
+
+
+def leer(hasta, resultado):
+    try:
+        while time.perf_counter() < hasta:
+            try:
+                list(Cotizacion.objects.order_by('-id').values('id', 'total')[:50])
+                resultado['lecturas'] += 1
+            except OperationalError:
+                resultado['bloqueos'] += 1
+    finally:
+        connections.close_all()
+
+
+def ejecutar(escritores, lectores, segundos):
+    user = crear_usuario()
+    productos = Producto.objects.bulk_create([
+        Producto(nombre=f"Producto {i}", precio=Decimal("9.99"), stock=10 ** 9)
+        for i in range(20)
+    ])
+    resultado = {'escrituras': 0, 'lecturas': 0, 'bloqueos': 0}
+    hasta = time.perf_counter() + segundos
+    hilos = ([threading.Thread(target=escribir, args=(user, productos, hasta, resultado))
+              for _ in range(escritores)]
+             + [threading.Thread(target=leer, args=(hasta, resultado))
+                for _ in range(lectores)])
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escritores", type=int, nargs="+", default=[1, 4, 8],
+                        help="Cantidades de hilos escritores a medir.")
+    parser.add_argument("--lectores", type=int, default=2,
+                        help="Hilos que leen el listado mientras tanto.")
+    parser.add_argument("--segundos", type=float, default=5,
+                        help="Duración de cada corrida.")
+    args = parser.parse_args()
+
+    print(f"{'config.':>9} {'escrit.':>8} {'escrit./s':>10} {'lect./s':>9} {'bloqueos':>9}")
+    for nombre, pragmas in CONFIGURACIONES.items():
+        settings.SQLITE_PRAGMAS = pragmas
+        for escritores in args.escritores:
+            # Base nueva por corrida: journal_mode=WAL queda grabado en el archivo.
+            with base_de_datos_temporal():
+                resultado = ejecutar(escritores, args.lectores, args.segundos)
+            print(f"{nombre:>9} {escritores:>8} {resultado['escrituras'] / args.segundos:>10.1f} "
+                  f"{resultado['lecturas'] / args.segundos:>9.1f} {resultado['bloqueos']:>9}")
+
+
+if __name__ == "__main__":
+    main()
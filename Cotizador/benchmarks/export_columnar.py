@@ -0,0 +1,97 @@
+"""
+Benchmark de la exportación columnar (Parquet / Arrow IPC) frente a XLSX.
+
+Para cada escala exporta las cotizaciones del usuario en XLSX, CSV, Parquet
+y Arrow IPC a un archivo temporal e informa el tiempo de exportación, el
+tamaño del archivo y el tiempo de volver a leerlo completo como lo haría la
+carga al warehouse (openpyxl en modo lectura, `csv`, pyarrow). Con
+`--memoria` mide además el pico de memoria Python de la exportación, en una
+corrida aparte.
+
+Requiere pyarrow.
+
+Uso:
+    python -m benchmarks.export_columnar --detalles 10000 100000 1000000
+"""
+import argparse
+import csv
+import os
+import tempfile
+
+from benchmarks.entorno import base_de_datos_temporal, crear_usuario, medir, poblar
+from openpyxl import load_workbook
+from CotizadorApp import exportacion_columnar
+from CotizadorApp.exporters import escribir_archivo, exportacion_cotizaciones
+from CotizadorApp.models import Cotizacion, DetalleFactura
+
+DETALLES_POR_COTIZACION = 10
+
+FORMATOS = ('xlsx', 'csv', 'parquet', 'arrow')
+
+
+def exportar(destino, cotizaciones, formato):
+    if formato in exportacion_columnar.FORMATOS:
+        exportacion_columnar.escribir_cotizaciones(destino, cotizaciones, formato)
+    else:
+        escribir_archivo(destino, exportacion_cotizaciones(cotizaciones), formato)
+
+
+def leer(ruta, formato):
+    """
+    Lee el archivo completo y devuelve la cantidad de filas de datos.
+    """
+    if formato == 'xlsx':
+        libro = load_workbook(ruta, read_only=True)
+        filas = sum(1 for _ in libro.active.iter_rows(values_only=True)) - 1
+        libro.close()
+        return filas
+    if formato == 'csv':
+        with open(ruta, newline='', encoding='utf-8') as archivo:
+            return sum(1 for _ in csv.reader(archivo)) - 1
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(ruta).num_rows
+    import pyarrow.ipc as ipc
+    with open(ruta, 'rb') as archivo:
+        return ipc.open_stream(archivo).read_all().num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--detalles", type=int, nargs="+", default=[10000, 100000],
+                        help="Escalas (cantidad total de detalles) a medir.")
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS, default=list(FORMATOS))
+    parser.add_argument("--memoria", action="store_true",
+                        help="Mide también el pico de memoria (corrida aparte con tracemalloc).")
+    args = parser.parse_args()
+    if not exportacion_columnar.disponible():
+        parser.error("Este benchmark requiere pyarrow (pip install pyarrow).")
+
+    with base_de_datos_temporal(), tempfile.TemporaryDirectory() as directorio:
+        user = crear_usuario()
+        print(f"{'detalles':>10} {'formato':>8} {'exportar s':>10} {'MB':>8} "
+              f"{'leer s':>8} {'pico MB':>8}")
+        for objetivo in sorted(args.detalles):
+            faltantes = objetivo - DetalleFactura.objects.count()
+            if faltantes > 0:
+                poblar(user, faltantes // DETALLES_POR_COTIZACION, DETALLES_POR_COTIZACION)
+            cotizaciones = Cotizacion.objects.del_usuario(user)
+            for formato in args.formatos:
+                ruta = os.path.join(directorio, f"cotizaciones.{formato}")
+                with open(ruta, 'wb') as destino, medir(memoria=False) as exportacion:
+                    exportar(destino, cotizaciones, formato)
+                with medir(memoria=False) as lectura:
+                    filas = leer(ruta, formato)
+                assert filas == DetalleFactura.objects.count(), (formato, filas)
+                pico = None
+                if args.memoria:
+                    with tempfile.TemporaryFile() as destino, medir(memoria=True) as memoria:
+                        exportar(destino, cotizaciones, formato)
+                    pico = memoria['pico_mb']
+                print(f"{objetivo:>10} {formato:>8} {exportacion['segundos']:>10.2f} "
+                      f"{os.path.getsize(ruta) / 1024 / 1024:>8.2f} {lectura['segundos']:>8.2f} "
+                      f"{'-' if pico is None else f'{pico:.1f}':>8}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
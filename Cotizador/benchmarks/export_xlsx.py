@@ -0,0 +1,82 @@
+"""
+Benchmark de memoria de la exportación XLSX de cotizaciones.
+
+Compara el pico de memoria Python del exportador en streaming con el camino
+anterior (lista de diccionarios + DataFrame de pandas) a distintas escalas.
+Con el exportador en streaming el pico debe mantenerse prácticamente
+constante aunque crezca la cantidad de detalles.
+
+Uso:
+    python -m benchmarks.export_xlsx --detalles 10000 100000 1000000
+"""
+import argparse
+import tempfile
+
+from benchmarks.entorno import (
+    base_de_datos_temporal, crear_usuario, medir, poblar,
+)
+from CotizadorApp.exporters import escribir_xlsx, exportacion_cotizaciones
+from CotizadorApp.models import Cotizacion, DetalleFactura
+
+DETALLES_POR_COTIZACION = 10
+
+
+def exportar_streaming(cotizaciones):
+    with tempfile.TemporaryFile() as destino:
+        escribir_xlsx(destino, exportacion_cotizaciones(cotizaciones))
+
+
+def exportar_pandas(cotizaciones):
+    import pandas as pd
+
+    data = []
+    for c in cotizaciones.con_detalles():
+        for detalle in c.detalles.all():
+            data.append({
+                "ID Cotización": c.id,
+                "Fecha": c.fecha.strftime("%d-%m-%Y"),
+                "Cliente": f"{c.user.first_name} {c.user.last_name}",
+                "Email": c.user.email,
+                "Producto": detalle.producto.nombre if detalle.producto else "Eliminado",
+                "Cantidad": detalle.cantidad,
+                "Precio Unitario": float(detalle.precio_unitario),
+                "Precio Total": float(detalle.precio_total),
+            })
+    with tempfile.TemporaryFile() as destino:
+        with pd.ExcelWriter(destino, engine='openpyxl') as writer:
+            pd.DataFrame(data).to_excel(writer, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--detalles", type=int, nargs="+",
+                        default=[10000, 100000],
+                        help="Escalas (cantidad total de detalles) a medir.")
+    parser.add_argument("--solo-tiempo", action="store_true",
+                        help="No medir memoria (tracemalloc distorsiona los tiempos).")
+    parser.add_argument("--pandas-hasta", type=int, default=100000,
+                        help="Escala máxima a la que se mide también el camino con pandas.")
+    args = parser.parse_args()
+
+    with base_de_datos_temporal():
+        user = crear_usuario()
+        print(f"{'detalles':>10} {'modo':>10} {'segundos':>10} {'pico MB':>10}")
+        for objetivo in sorted(args.detalles):
+            faltantes = objetivo - DetalleFactura.objects.count()
+            if faltantes > 0:
+                poblar(user, faltantes // DETALLES_POR_COTIZACION,
+                       DETALLES_POR_COTIZACION)
+            cotizaciones = Cotizacion.objects.del_usuario(user)
+            modos = [("streaming", exportar_streaming)]
+            if objetivo <= args.pandas_hasta:
+                modos.append(("pandas", exportar_pandas))
+            for modo, exportar in modos:
+                with medir(memoria=not args.solo_tiempo) as resultado:
+                    exportar(cotizaciones)
+                pico = resultado['pico_mb']
+                print(f"{objetivo:>10} {modo:>10} {resultado['segundos']:>10.2f} "
+                      f"{'-' if pico is None else f'{pico:.1f}':>10}")
+
+
+if __name__ == "__main__":
+    main()
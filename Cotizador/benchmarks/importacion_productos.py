@@ -0,0 +1,106 @@
+"""
+Benchmark de la importación masiva de productos.
+
+Genera un catálogo de proveedor en CSV y XLSX y compara la importación por
+bloques de `CotizadorApp.importacion` con la carga fila a fila a través de
+`ProductoSerializer` (lo que hace un POST por producto). La carga fila a fila
+se mide sobre una muestra y se informa en filas/segundo. Una segunda pasada
+reimporta el mismo archivo con IDs para medir las actualizaciones.
+
+Uso:
+    python -m benchmarks.importacion_productos --filas 100000 --muestra 2000 [--memoria]
+"""
+import argparse
+import csv
+import io
+import random
+
+from benchmarks.entorno import base_de_datos_temporal, medir
+from openpyxl import Workbook
+from CotizadorApp import importacion
+from CotizadorApp.models import Categoria, Producto
+from CotizadorApp.serializers import ProductoSerializer
+
+CATEGORIAS = 200
+ENCABEZADOS = ["ID", "Nombre", "Descripción", "Precio", "Categoría", "Stock"]
+
+
+def filas_catalogo(cantidad, ids=None):
+    azar = random.Random(cantidad)
+    for i in range(cantidad):
+        yield [ids[i] if ids else "", f"Producto proveedor {i}", "Descripción de prueba",
+               f"{azar.uniform(1, 500):.2f}", f"Categoría {i % CATEGORIAS}",
+               azar.randint(0, 1000)]
+
+
+def como_csv(filas):
+    texto = io.StringIO()
+    escritor = csv.writer(texto)
+    escritor.writerow(ENCABEZADOS)
+    escritor.writerows(filas)
+    return io.BytesIO(texto.getvalue().encode('utf-8'))
+
+
+def como_xlsx(filas):
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append(ENCABEZADOS)
+    for fila in filas:
+        hoja.append(fila)
+    destino = io.BytesIO()
+    libro.save(destino)
+    destino.seek(0)
+    return destino
+
+
+def fila_a_fila(muestra):
+    categorias = {}
+    for _, nombre, descripcion, precio, categoria, stock in filas_catalogo(muestra):
+        if categoria not in categorias:
+            categorias[categoria] = Categoria.objects.get_or_create(nombre=categoria)[0].pk
+        serializer = ProductoSerializer(data={
+            'nombre': nombre, 'descripcion': descripcion, 'precio': precio,
+            'stock': stock, 'categoria_id': categorias[categoria]})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+
+def importar(archivo, formato, memoria):
+    with medir(memoria=memoria) as resultado:
+        importacion.importar_productos(importacion.filas_archivo(archivo, formato))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=100000,
+                        help="Filas del archivo importado en bloque.")
+    parser.add_argument("--muestra", type=int, default=2000,
+                        help="Filas cargadas fila a fila con el serializer.")
+    parser.add_argument("--memoria", action="store_true",
+                        help="Mide también el pico de memoria (tracemalloc hace más lenta la importación).")
+    args = parser.parse_args()
+
+    print(f"{'método':>22} {'filas':>8} {'segundos':>9} {'filas/s':>9} {'pico MB':>8}")
+
+    def informar(metodo, filas, resultado):
+        pico = f"{resultado['pico_mb']:>8.1f}" if resultado['pico_mb'] is not None else f"{'-':>8}"
+        print(f"{metodo:>22} {filas:>8} {resultado['segundos']:>9.2f} "
+              f"{filas / resultado['segundos']:>9.0f} {pico}")
+
+    with base_de_datos_temporal():
+        with medir(memoria=False) as resultado:
+            fila_a_fila(args.muestra)
+        informar("serializer por fila", args.muestra, resultado)
+
+    for formato, generar in (('csv', como_csv), ('xlsx', como_xlsx)):
+        with base_de_datos_temporal():
+            informar(f"importar {formato}", args.filas,
+                     importar(generar(filas_catalogo(args.filas)), formato, args.memoria))
+            ids = list(Producto.objects.order_by('id').values_list('id', flat=True))
+            informar(f"reimportar {formato}", args.filas,
+                     importar(generar(filas_catalogo(args.filas, ids)), formato, args.memoria))
+
+
+if __name__ == "__main__":
+    main()
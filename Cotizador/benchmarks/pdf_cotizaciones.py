@@ -0,0 +1,90 @@
+"""
+Benchmark del renderizado de PDF de cotizaciones según la cantidad de líneas.
+
+Compara `renderizar_pdf` (tabla de productos dividida por página, estilos
+compartidos) con el diseño anterior, que ponía todas las líneas en una sola
+`Table`: ReportLab la vuelve a medir y copiar en cada salto de página, así
+que su costo crece con el cuadrado de las líneas. Por eso el diseño anterior
+solo se mide hasta `--max-lineas-anterior`.
+
+Informa segundos, páginas, tamaño del PDF y pico de memoria Python (medido en
+una corrida aparte con tracemalloc).
+
+Uso:
+    python -m benchmarks.pdf_cotizaciones --lineas 10 1000 50000
+"""
+import argparse
+from io import BytesIO
+from decimal import Decimal
+
+from benchmarks.entorno import medir
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+from CotizadorApp.utils import (
+    ESTILO_PRODUCTOS, ESTILOS, _crear_tabla_cliente, _crear_tabla_totales, formato_pesos,
+    renderizar_pdf,
+)
+
+
+def datos(lineas):
+    detalles = [(f"Producto {i} de ferretería", 1 + i % 5, Decimal("9.99"),
+                 Decimal("9.99") * (1 + i % 5)) for i in range(lineas)]
+    subtotal = sum((detalle[3] for detalle in detalles), Decimal("0"))
+    iva = (subtotal * Decimal("0.19")).quantize(Decimal("0.01"))
+    return {'id': 1, 'fecha': '01/01/2025', 'nombre': 'Bench Mark', 'email': 'bench@example.com',
+            'telefono': '900000000', 'rut': '11111111-1', 'detalles': detalles,
+            'subtotal': subtotal, 'iva': iva, 'total': subtotal + iva}
+
+
+def paginas(contenido):
+    return contenido.count(b'/Type /Page\n')
+
+
+def renderizar_una_tabla(datos):
+    """
+    Diseño anterior: todas las líneas de productos en una sola `Table`.
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    filas = [["Descripción", "Unidades", "Precio Unitario", "Precio Total"]]
+    filas += [[producto, cantidad, formato_pesos(precio_unitario), formato_pesos(precio_total)]
+              for producto, cantidad, precio_unitario, precio_total in datos['detalles']]
+    productos = Table(filas, colWidths=[200, 80, 100, 100])
+    productos.setStyle(ESTILO_PRODUCTOS)
+    doc.build([
+        Paragraph("<b>Cotización</b>", ESTILOS['Title']), Spacer(1, 12),
+        _crear_tabla_cliente(datos), Spacer(1, 20),
+        productos, Spacer(1, 20),
+        _crear_tabla_totales(datos), Spacer(1, 20),
+        Paragraph("Gracias por su compra!", ESTILOS['title']), Spacer(1, 20),
+    ])
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lineas", type=int, nargs="+", default=[10, 1000, 50000],
+                        help="Líneas de detalle de la cotización.")
+    parser.add_argument("--max-lineas-anterior", type=int, default=5000,
+                        help="Máximo de líneas con que se mide el diseño anterior.")
+    args = parser.parse_args()
+
+    print(f"{'motor':>12} {'líneas':>8} {'segundos':>9} {'páginas':>8} {'KB':>8} {'pico MB':>8}")
+    motores = [('una tabla', renderizar_una_tabla), ('por página', renderizar_pdf)]
+    for lineas in args.lineas:
+        cotizacion = datos(lineas)
+        for nombre, renderizar in motores:
+            if renderizar is renderizar_una_tabla and lineas > args.max_lineas_anterior:
+                print(f"{nombre:>12} {lineas:>8} {'omitido':>9}")
+                continue
+            with medir(memoria=False) as tiempo:
+                contenido = renderizar(cotizacion)
+            with medir(memoria=True) as memoria:
+                renderizar(cotizacion)
+            print(f"{nombre:>12} {lineas:>8} {tiempo['segundos']:>9.2f} "
+                  f"{paginas(contenido):>8} "
+                  f"{len(contenido) / 1024:>8.0f} {memoria['pico_mb']:>8.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark de los reportes de ventas.
+
+Compara la agregación de ventas por producto y por mes recorriendo todos los
+detalles con la lectura de los resúmenes diarios de `CotizadorApp.resumen_ventas`.
+Las cotizaciones se reparten en un año para que el resumen tenga filas por día.
+
+Uso:
+    python -m benchmarks.reportes_ventas --detalles 100000 1000000
+"""
+import argparse
+import datetime
+
+from benchmarks.entorno import base_de_datos_temporal, crear_usuario, medir, poblar
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from CotizadorApp import resumen_ventas
+from CotizadorApp.models import Cotizacion, DetalleFactura
+
+DETALLES_POR_COTIZACION = 10
+DIAS = 365
+
+
+def repartir_en_el_anio():
+    ultima = Cotizacion.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    ahora = timezone.now()
+    por_dia = ultima // DIAS + 1
+    for dia in range(DIAS):
+        Cotizacion.objects.filter(id__gt=dia * por_dia, id__lte=(dia + 1) * por_dia).update(
+            fecha=ahora - datetime.timedelta(days=dia))
+
+
+def desde_detalles():
+    monto = Sum(F('cantidad') * F('precio_unitario'),
+                output_field=DecimalField(max_digits=16, decimal_places=2))
+    productos = list(DetalleFactura.objects.values('producto').order_by()
+                     .annotate(cantidad_total=Sum('cantidad'), monto_total=monto,
+                               lineas_total=Count('id')))
+    meses = list(DetalleFactura.objects.annotate(mes=TruncMonth('cotizacion__fecha'))
+                 .values('mes').order_by('mes')
+                 .annotate(cantidad_total=Sum('cantidad'), monto_total=monto))
+    return productos, meses
+
+
+def desde_resumen():
+    return resumen_ventas.ventas_por_producto(), resumen_ventas.ventas_mensuales()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--detalles", type=int, nargs="+", default=[100000, 1000000],
+                        help="Cantidades de detalles a medir.")
+    args = parser.parse_args()
+
+    print(f"{'detalles':>10} {'reconstruir s':>14} {'detalles ms':>12} {'resumen ms':>11}")
+    for cantidad in args.detalles:
+        with base_de_datos_temporal():
+            poblar(crear_usuario(), cantidad // DETALLES_POR_COTIZACION, DETALLES_POR_COTIZACION)
+            repartir_en_el_anio()
+            with medir(memoria=False) as reconstruccion:
+                resumen_ventas.reconstruir()
+            with medir(memoria=False) as completo:
+                desde_detalles()
+            with medir(memoria=False) as resumen:
+                desde_resumen()
+            print(f"{cantidad:>10} {reconstruccion['segundos']:>14.2f} "
+                  f"{completo['segundos'] * 1000:>12.1f} {resumen['segundos'] * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
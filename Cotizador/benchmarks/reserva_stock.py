@@ -0,0 +1,120 @@
+"""
+Benchmark de concurrencia de la reserva de stock.
+
+Varios hilos crean cotizaciones a la vez con `CotizacionSerializer`, cada una
+con un producto "estrella" de stock limitado y algunos productos comunes. Se
+informa el rendimiento (cotizaciones/segundo) y se verifica que no haya sobreventa:
+el stock final nunca es negativo y lo reservado en los detalles coincide
+exactamente con lo descontado del stock.
+
+SQLite serializa las escrituras, así que el rendimiento mide sobre todo el
+costo de cada transacción; el objetivo principal es comprobar la corrección
+bajo contención.
+
+Uso:
+    python -m benchmarks.reserva_stock --hilos 1 4 8 --cotizaciones 200
+"""
+import argparse
+import random
+import threading
+from decimal import Decimal
+
+from benchmarks.entorno import base_de_datos_temporal, crear_usuario, medir
+from django.db import OperationalError, connections
+from django.db.models import Sum
+from rest_framework.exceptions import ValidationError
+from CotizadorApp.models import Cotizacion, DetalleFactura, Producto
+from CotizadorApp.serializers import CotizacionSerializer
+
+PRODUCTOS = 20
+STOCK_COMUN = 100000
+
+
+def preparar_catalogo(stock_estrella):
+    Cotizacion.objects.all().delete()
+    Producto.objects.all().delete()
+    estrella = Producto.objects.create(
+        nombre="Estrella", precio=Decimal("9.99"), stock=stock_estrella)
+    comunes = Producto.objects.bulk_create([
+        Producto(nombre=f"Común {i}", precio=Decimal("1.00"), stock=STOCK_COMUN)
+        for i in range(PRODUCTOS)
+    ])
+    return estrella, comunes
+
+
+def trabajar(user, estrella, comunes, cantidad, semilla, resultado):
+    azar = random.Random(semilla)
+    try:
+        for _ in range(cantidad):
+            lineas = [{'producto_id': estrella.id, 'cantidad': azar.randint(1, 3),
+                       'precio_unitario': '9.99'}]
+            lineas += [{'producto_id': producto.id, 'cantidad': azar.randint(1, 5),
+                        'precio_unitario': '1.00'}
+                       for producto in azar.sample(comunes, 3)]
+            serializer = CotizacionSerializer(data={'detalles': lineas})
+            serializer.is_valid(raise_exception=True)
+            try:
+                serializer.save(user=user)
+                resultado['creadas'] += 1
+            except OperationalError:
+                # SQLite: se agotó la espera por el bloqueo de escritura.
+                resultado['bloqueos'] += 1
+            except ValidationError:
+                # Stock insuficiente del producto estrella.
+                resultado['rechazadas'] += 1
+    finally:
+        connections.close_all()
+
+
+def ejecutar(user, hilos, cotizaciones, stock_estrella):
+    estrella, comunes = preparar_catalogo(stock_estrella)
+    stock_inicial = dict(Producto.objects.values_list('pk', 'stock'))
+    resultados = [{'creadas': 0, 'rechazadas': 0, 'bloqueos': 0} for _ in range(hilos)]
+    trabajadores = [
+        threading.Thread(target=trabajar, args=(
+            user, estrella, comunes, cotizaciones // hilos, semilla, resultados[semilla]))
+        for semilla in range(hilos)
+    ]
+    with medir(memoria=False) as tiempo:
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+
+    stock_final = dict(Producto.objects.values_list('pk', 'stock'))
+    reservado = dict(
+        DetalleFactura.objects.values('producto').annotate(total=Sum('cantidad'))
+        .order_by().values_list('producto', 'total'))
+    assert min(stock_final.values()) >= 0, "stock negativo"
+    for producto_id, inicial in stock_inicial.items():
+        assert inicial - stock_final[producto_id] == reservado.get(producto_id, 0), \
+            f"el producto {producto_id} no cuadra"
+
+    totales = {clave: sum(r[clave] for r in resultados) for clave in resultados[0]}
+    return totales, tiempo['segundos'], stock_final[estrella.pk]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 4, 8],
+                        help="Cantidades de hilos concurrentes a medir.")
+    parser.add_argument("--cotizaciones", type=int, default=200,
+                        help="Cotizaciones intentadas por corrida (en total).")
+    parser.add_argument("--stock-estrella", type=int, default=150,
+                        help="Stock inicial del producto con contención.")
+    args = parser.parse_args()
+
+    with base_de_datos_temporal():
+        user = crear_usuario()
+        print(f"{'hilos':>6} {'creadas':>8} {'rechaz.':>8} {'bloqueos':>9} "
+              f"{'cotiz/s':>9} {'estrella':>9}")
+        for hilos in args.hilos:
+            totales, segundos, estrella = ejecutar(
+                user, hilos, args.cotizaciones, args.stock_estrella)
+            print(f"{hilos:>6} {totales['creadas']:>8} {totales['rechazadas']:>8} "
+                  f"{totales['bloqueos']:>9} {totales['creadas'] / segundos:>9.1f} "
+                  f"{estrella:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark de throughput (filas/segundo) de los listados de la API.
+
+Compara los serializers de DRF con el camino rápido de `CotizadorApp.lectura`
+(diccionarios armados desde `values()`) para productos, usuarios y
+cotizaciones, incluyendo en ambos casos las consultas a la base de datos y el
+renderizado a JSON de una página.
+
+Uso:
+    python -m benchmarks.serializacion_listados --filas 50 500 --repeticiones 20
+"""
+import argparse
+from decimal import Decimal
+
+from benchmarks.entorno import base_de_datos_temporal, crear_usuario, medir, poblar
+from rest_framework.renderers import JSONRenderer
+from CotizadorApp.lectura import (
+    CAMPOS_COTIZACION, CAMPOS_PRODUCTO, CAMPOS_USUARIO,
+    listado_cotizaciones, listado_productos, listado_usuarios,
+)
+from CotizadorApp.models import Cotizacion, CustomUser, Producto
+from CotizadorApp.serializers import (
+    CotizacionSerializer, CustomUserSerializer, ProductoSerializer,
+)
+
+DETALLES_POR_COTIZACION = 5
+
+
+def casos(filas):
+    productos = Producto.objects.order_by('id')[:filas]
+    usuarios = CustomUser.objects.order_by('id')[:filas]
+    cotizaciones = Cotizacion.objects.order_by('id')[:filas]
+    return [
+        ("productos",
+         lambda: ProductoSerializer(productos.select_related('categoria'), many=True).data,
+         lambda: listado_productos(productos.values(*CAMPOS_PRODUCTO))),
+        ("usuarios",
+         lambda: CustomUserSerializer(usuarios, many=True).data,
+         lambda: listado_usuarios(usuarios.values(*CAMPOS_USUARIO))),
+        ("cotizaciones",
+         lambda: CotizacionSerializer(cotizaciones.con_detalles(), many=True).data,
+         lambda: listado_cotizaciones(cotizaciones.values(*CAMPOS_COTIZACION))),
+    ]
+
+
+def filas_por_segundo(generar, filas, repeticiones):
+    renderer = JSONRenderer()
+    with medir(memoria=False) as resultado:
+        for _ in range(repeticiones):
+            renderer.render(generar())
+    return filas * repeticiones / resultado['segundos']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, nargs="+", default=[50, 500],
+                        help="Tamaños de página a medir.")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    with base_de_datos_temporal():
+        maximo = max(args.filas)
+        user = crear_usuario()
+        poblar(user, maximo, DETALLES_POR_COTIZACION, productos=maximo)
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f"u{i}", email=f"u{i}@example.com", rut=f"{i}-0",
+                       telefono="900000000", first_name="Nombre", last_name="Apellido")
+            for i in range(maximo)
+        ])
+        Producto.objects.filter(id__gt=maximo // 2).update(precio=Decimal("1234.50"))
+
+        print(f"{'listado':>12} {'filas':>6} {'serializer f/s':>15} {'rápido f/s':>12} {'x':>6}")
+        for filas in sorted(args.filas):
+            for nombre, serializer, rapido in casos(filas):
+                lento = filas_por_segundo(serializer, filas, args.repeticiones)
+                veloz = filas_por_segundo(rapido, filas, args.repeticiones)
+                print(f"{nombre:>12} {filas:>6} {lento:>15.0f} {veloz:>12.0f} "
+                      f"{veloz / lento:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
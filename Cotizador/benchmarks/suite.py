@@ -0,0 +1,280 @@
+"""
+Suite de benchmarks de la API con umbrales de regresión.
+
+Para cada escala genera los datos con el comando `generar_datos` en una base
+temporal y mide, con un cliente autenticado como el usuario con más
+cotizaciones, el listado, el detalle, la creación, los PDF y todas las
+exportaciones. Por caso registra la latencia (mediana y máximo de
+`--repeticiones` corridas tras una de calentamiento), la cantidad de
+consultas SQL y el pico de memoria Python (en una corrida aparte con
+tracemalloc), y escribe un reporte JSON.
+
+Con `--baseline` compara contra un reporte anterior y termina con código 1
+si algún caso empeora más allá de las tolerancias: latencia y memoria
+relativas (con un mínimo absoluto para no fallar por ruido) y cualquier
+consulta de más. `--guardar-baseline` guarda la corrida como nueva base; las
+latencias dependen de la máquina, así que cada entorno guarda la suya.
+
+Uso:
+    python -m benchmarks.suite --escalas pequena mediana --reporte reporte.json
+    python -m benchmarks.suite --escalas pequena --baseline baseline.json --guardar-baseline
+    python -m benchmarks.suite --escalas pequena --baseline baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+
+from benchmarks.entorno import base_de_datos_temporal, medir
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from CotizadorApp import cache_catalogo, exportacion_columnar, exporters, pdf_cache
+from CotizadorApp.management.commands.generar_datos import ESCALAS
+from CotizadorApp.models import Cotizacion, CustomUser, Producto
+
+# Las cotizaciones se exportan también en los formatos columnares.
+FORMATOS = exporters.FORMATOS + exportacion_columnar.FORMATOS
+
+# Tolerancias por defecto frente a la base.
+TOLERANCIA_LATENCIA = 0.5
+MINIMO_LATENCIA_MS = 5
+TOLERANCIA_MEMORIA = 0.25
+MINIMO_MEMORIA_MB = 1
+
+
+class Caso:
+    """
+    Una petición medida. `preparar` se ejecuta antes de cada corrida (fuera
+    de la medición), p. ej. para vaciar la caché de PDF.
+    """
+
+    def __init__(self, nombre, metodo, url, datos=None, esperado=200, preparar=None):
+        self.nombre = nombre
+        self.metodo = metodo
+        self.url = url
+        self.datos = datos
+        self.esperado = esperado
+        self.preparar = preparar
+
+    def ejecutar(self, cliente):
+        if self.preparar:
+            self.preparar()
+        if self.metodo == 'post':
+            response = cliente.post(self.url, self.datos, format='json')
+        else:
+            response = cliente.get(self.url)
+        # Las respuestas en streaming se consumen completas.
+        if response.streaming:
+            contenido = b"".join(response.streaming_content)
+        else:
+            contenido = response.content
+        response.close()
+        return response.status_code, len(contenido)
+
+
+def _vaciar(directorio):
+    for entrada in os.scandir(directorio):
+        if entrada.is_dir():
+            shutil.rmtree(entrada.path)
+        else:
+            os.remove(entrada.path)
+
+
+def casos(user, directorio_pdf):
+    """
+    Casos medidos para `user`, sobre sus propias cotizaciones. Los PDF se
+    miden sin caché (se vacía `directorio_pdf` antes de cada corrida).
+    """
+    cotizacion = (Cotizacion.objects.del_usuario(user).annotate(lineas=Count('detalles'))
+                  .order_by('-lineas', 'id').first())
+    productos = list(Producto.objects.filter(stock__gte=1000).order_by('id')[:5])
+
+    def sin_pdf_en_cache():
+        pdf_cache.invalidar(cotizacion.id)
+
+    lista = [
+        Caso('cotizaciones_listado', 'get', reverse('cotizacion-list')),
+        Caso('cotizaciones_detalle', 'get', reverse('cotizacion-detail', args=[cotizacion.id])),
+        Caso('cotizaciones_crear', 'post', reverse('cotizacion-list'), esperado=201, datos={
+            'detalles': [{'producto_id': producto.id, 'cantidad': 1,
+                          'precio_unitario': str(producto.precio)} for producto in productos]}),
+        Caso('cotizacion_pdf', 'get', reverse('cotizacion-descargar-pdf', args=[cotizacion.id]),
+             preparar=sin_pdf_en_cache),
+        Caso('export_cotizacion_pdf', 'get',
+             reverse('export-cotizacion-pdf', kwargs={'pk': cotizacion.id}),
+             preparar=sin_pdf_en_cache),
+        Caso('cotizaciones_pdfs_zip', 'get', reverse('cotizacion-descargar-pdfs'),
+             preparar=lambda: _vaciar(directorio_pdf)),
+    ]
+    for formato in FORMATOS:
+        lista += [
+            Caso(f'exportar_cotizaciones_{formato}', 'get',
+                 f"{reverse('cotizacion-exportar-a-excel-cotizaciones')}?format={formato}"),
+            Caso(f'export_cotizaciones_{formato}', 'get',
+                 f"{reverse('export-cotizaciones')}?format={formato}"),
+        ]
+    for formato in exporters.FORMATOS:
+        lista += [
+            Caso(f'exportar_usuarios_{formato}', 'get',
+                 f"{reverse('usuario-exportar-a-excel-usuarios')}?format={formato}"),
+            Caso(f'exportar_productos_{formato}', 'get',
+                 f"{reverse('producto-exportar-a-excel-productos')}?format={formato}",
+                 preparar=cache_catalogo.invalidar),
+        ]
+    return lista
+
+
+def medir_caso(cliente, caso, repeticiones):
+    estado, _ = caso.ejecutar(cliente)  # Calentamiento.
+    latencias = []
+    for _ in range(repeticiones):
+        # Contador propio: el cliente dispara request_started, que vacía
+        # `connection.queries` (lo que usa CaptureQueriesContext).
+        consultas = []
+        with connection.execute_wrapper(
+                lambda execute, sql, *args: consultas.append(sql) or execute(sql, *args)), \
+                medir(memoria=False) as tiempo:
+            estado, tamano = caso.ejecutar(cliente)
+        latencias.append(tiempo['segundos'] * 1000)
+    with medir(memoria=True) as memoria:
+        caso.ejecutar(cliente)
+    return {
+        'estado': estado,
+        'mediana_ms': round(statistics.median(latencias), 2),
+        'maximo_ms': round(max(latencias), 2),
+        'consultas': len(consultas),
+        'pico_mb': round(memoria['pico_mb'], 2),
+        'bytes': tamano,
+    }
+
+
+def medir_escala(escala, repeticiones):
+    with base_de_datos_temporal(), tempfile.TemporaryDirectory() as directorio, \
+            override_settings(PDF_CACHE={'DIRECTORIO': directorio, 'MAX_BYTES': 256 * 1024 * 1024}):
+        salida = io.StringIO()
+        with medir(memoria=False) as generacion:
+            call_command('generar_datos', escala=escala, stdout=salida)
+        user = (CustomUser.objects.annotate(cantidad=Count('cotizacion'))
+                .order_by('-cantidad', 'id').first())
+        cliente = APIClient()
+        cliente.force_authenticate(user)
+
+        resultados = {}
+        for caso in casos(user, directorio):
+            resultados[caso.nombre] = medir_caso(cliente, caso, repeticiones)
+            if resultados[caso.nombre]['estado'] != caso.esperado:
+                resultados[caso.nombre]['error'] = (
+                    f"estado {resultados[caso.nombre]['estado']}, se esperaba {caso.esperado}")
+            imprimir_caso(escala, caso.nombre, resultados[caso.nombre])
+        return {
+            'datos': dict(zip(('usuarios', 'categorias', 'productos', 'cotizaciones', 'detalles'),
+                              ESCALAS[escala])),
+            'cotizaciones_del_usuario': Cotizacion.objects.del_usuario(user).count(),
+            'generacion_segundos': round(generacion['segundos'], 2),
+            'casos': resultados,
+        }
+
+
+def imprimir_caso(escala, nombre, resultado):
+    print(f"{escala:>8} {nombre:>30} {resultado['estado']:>6} {resultado['mediana_ms']:>10.1f} "
+          f"{resultado['maximo_ms']:>10.1f} {resultado['consultas']:>9} {resultado['pico_mb']:>8.1f}",
+          flush=True)
+
+
+def regresiones(reporte, base, tolerancia_latencia, tolerancia_memoria):
+    """
+    Lista de descripciones de los casos que empeoraron frente a `base`.
+    """
+    encontradas = []
+    for escala, datos in reporte['escalas'].items():
+        casos_base = base.get('escalas', {}).get(escala, {}).get('casos', {})
+        for nombre, actual in datos['casos'].items():
+            if 'error' in actual:
+                encontradas.append(f"{escala}/{nombre}: {actual['error']}")
+            anterior = casos_base.get(nombre)
+            if anterior is None:
+                continue
+            limite = max(anterior['mediana_ms'] * (1 + tolerancia_latencia),
+                         anterior['mediana_ms'] + MINIMO_LATENCIA_MS)
+            if actual['mediana_ms'] > limite:
+                encontradas.append(
+                    f"{escala}/{nombre}: latencia {actual['mediana_ms']} ms "
+                    f"(base {anterior['mediana_ms']} ms, límite {limite:.1f} ms)")
+            if actual['consultas'] > anterior['consultas']:
+                encontradas.append(
+                    f"{escala}/{nombre}: {actual['consultas']} consultas "
+                    f"(base {anterior['consultas']})")
+            limite = max(anterior['pico_mb'] * (1 + tolerancia_memoria),
+                         anterior['pico_mb'] + MINIMO_MEMORIA_MB)
+            if actual['pico_mb'] > limite:
+                encontradas.append(
+                    f"{escala}/{nombre}: pico de memoria {actual['pico_mb']} MB "
+                    f"(base {anterior['pico_mb']} MB, límite {limite:.1f} MB)")
+    return encontradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escalas", nargs="+", choices=ESCALAS, default=['pequena'],
+                        help="Escalas de `generar_datos` a medir.")
+    parser.add_argument("--repeticiones", type=int, default=5,
+                        help="Corridas medidas por caso (tras una de calentamiento).")
+    parser.add_argument("--reporte", help="Archivo JSON donde escribir el reporte.")
+    parser.add_argument("--baseline", help="Reporte JSON de referencia.")
+    parser.add_argument("--guardar-baseline", action="store_true",
+                        help="Guarda esta corrida en --baseline en vez de comparar.")
+    parser.add_argument("--tolerancia-latencia", type=float, default=TOLERANCIA_LATENCIA,
+                        help="Aumento relativo de la mediana admitido (0.5 = 50%%).")
+    parser.add_argument("--tolerancia-memoria", type=float, default=TOLERANCIA_MEMORIA,
+                        help="Aumento relativo del pico de memoria admitido.")
+    args = parser.parse_args()
+    if args.guardar_baseline and not args.baseline:
+        parser.error("--guardar-baseline requiere --baseline.")
+
+    # Como en las pruebas: acepta el host del cliente de pruebas y no envía correos.
+    setup_test_environment()
+    print(f"{'escala':>8} {'caso':>30} {'estado':>6} {'mediana ms':>10} {'máximo ms':>10} "
+          f"{'consultas':>9} {'pico MB':>8}")
+    reporte = {
+        'fecha': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'repeticiones': args.repeticiones,
+        'escalas': {escala: medir_escala(escala, args.repeticiones) for escala in args.escalas},
+    }
+    if args.reporte:
+        with open(args.reporte, 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+
+    base = {}
+    if args.baseline and not args.guardar_baseline:
+        with open(args.baseline, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+    # Sin base solo se informan los casos con un estado inesperado.
+    encontradas = regresiones(reporte, base, args.tolerancia_latencia, args.tolerancia_memoria)
+    if encontradas:
+        print("\nRegresiones:")
+        for descripcion in encontradas:
+            print(f"  - {descripcion}")
+        sys.exit(1)
+
+    if args.guardar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+        print(f"\nBase guardada en {args.baseline}.")
+    elif base:
+        print("\nSin regresiones frente a la base.")
+
+if __name__ == "__main__":
+    main()